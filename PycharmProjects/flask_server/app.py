@@ -2,54 +2,64 @@ from flask import Flask, render_template_string, request, redirect, url_for, mak
 from flask_socketio import SocketIO, emit, join_room
 import os
 import uuid
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
+
+from storage import create_stores
 
 app = Flask(__name__)
 app.secret_key = 'super-secret-key'
-socketio = SocketIO(app)
+# Очередь сообщений Socket.IO (SOCKETIO_MESSAGE_QUEUE, например redis://localhost:6379/0):
+# через нее уведомления и счетчики непрочитанных доходят до клиентов любого воркера
+socketio = SocketIO(app, message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None)
 
 UPLOAD_FOLDER = 'static/uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-profiles = []
-likes = defaultdict(list)
-matches = defaultdict(list)
-messages = defaultdict(list)
-notifications = defaultdict(list)
+# Хранилища: SQLite (STORAGE_PATH, по умолчанию cafe.db) или память - STORAGE_BACKEND.
+# Несколько воркеров с общей базой SQLite требуют и SOCKETIO_MESSAGE_QUEUE (см. выше),
+# иначе события Socket.IO получают только клиенты, подключенные к тому же процессу
+stores = create_stores()
+profiles, likes, matches, messages, notifications = stores
+
+# Размер страницы истории чата по умолчанию и максимальный
+HISTORY_PAGE = 50
+HISTORY_PAGE_MAX = 200
+
+def user_room(user_id):
+    # Личная комната Socket.IO: в нее входят все вкладки пользователя
+    return f'user:{user_id}'
 
 def add_notification(user_id, message):
-    notifications[user_id].append({
-        'id': str(uuid.uuid4()),
-        'message': message,
-        'timestamp': datetime.now()
-    })
+    notification = notifications.add(user_id, message)
+    socketio.emit('notification', {'id': notification['id'], 'message': message}, room=user_room(user_id))
+
+def push_unread_count(user_id):
+    socketio.emit('unread', {'count': messages.unread_count(user_id)}, room=user_room(user_id))
 
-def check_for_matches(user_id):
-    current_profile = next((p for p in profiles if p['user_id'] == user_id), None)
-    if not current_profile:
+def check_for_matches(user_id, liked_profile_id):
+    # Проверяем только новый лайк: взаимен ли он
+    current_profile = profiles.by_user(user_id)
+    liked_profile = profiles.get(liked_profile_id)
+    if not current_profile or not liked_profile:
         return
-    current_profile_id = profiles.index(current_profile)
-    for liked_profile_id in likes[user_id]:
-        liked_user_id = profiles[liked_profile_id]['user_id']
-        if current_profile_id in likes.get(liked_user_id, []):
-            if liked_user_id not in matches[user_id]:
-                matches[user_id].append(liked_user_id)
-                matches[liked_user_id].append(user_id)
-                user_name = current_profile['name']
-                matched_user_name = profiles[liked_profile_id]['name']
-                add_notification(user_id, f"✨ У вас мэтч с {matched_user_name}! Теперь вы можете общаться.")
-                add_notification(liked_user_id, f"✨ У вас мэтч с {user_name}! Теперь вы можете общаться.")
+    liked_user_id = liked_profile['user_id']
+    if likes.has_like(liked_user_id, current_profile['id']):
+        if matches.add(user_id, liked_user_id):
+            user_name = current_profile['name']
+            matched_user_name = liked_profile['name']
+            add_notification(user_id, f"✨ У вас мэтч с {matched_user_name}! Теперь вы можете общаться.")
+            add_notification(liked_user_id, f"✨ У вас мэтч с {user_name}! Теперь вы можете общаться.")
 
 def get_unread_messages_count(user_id):
-    count = 0
-    for chat_key, msgs in messages.items():
-        if user_id in chat_key:
-            for msg in msgs:
-                if msg['sender'] != user_id and not msg.get('read_by', {}).get(user_id, False):
-                    count += 1
-    return count
+    return messages.unread_count(user_id)
+
+def mark_chat_read(chat_key, user_id):
+    # Квитанция о прочтении уходит в комнату чата, только если отметка сдвинулась
+    read_upto = messages.mark_read(chat_key, user_id)
+    if read_upto is not None:
+        socketio.emit('read', {'reader': user_id, 'upto': read_upto}, room='_'.join(chat_key))
+        push_unread_count(user_id)
 
 def render_navbar(user_id, active=None, unread_messages=0):
     return render_template_string('''
@@ -59,23 +69,41 @@ def render_navbar(user_id, active=None, unread_messages=0):
         <a href="/my_matches" style="margin:0 10px;{{'font-weight:bold;color:#ff6b6b;' if active=='matches' else ''}}">🤝 Мэтчи</a>
         <a href="/my_messages" style="margin:0 10px;position:relative;{{'font-weight:bold;color:#ff6b6b;' if active=='messages' else ''}}">
             ✉️
-            {% if unread_messages > 0 %}
-                <span style="position:absolute;top:-8px;right:-8px;background:#ff6b6b;color:#fff;border-radius:50%;padding:2px 7px;font-size:0.8em;">{{ unread_messages }}</span>
-            {% endif %}
+            <span id="unread-badge" style="position:absolute;top:-8px;right:-8px;background:#ff6b6b;color:#fff;border-radius:50%;padding:2px 7px;font-size:0.8em;{{'' if unread_messages > 0 else 'display:none;'}}">{{ unread_messages }}</span>
         </a>
     </nav>
     <div style="height:48px"></div>
-    ''', active=active, unread_messages=unread_messages)
+    {% if user_id %}
+    <script src="https://cdn.socket.io/4.7.5/socket.io.min.js"></script>
+    <script>
+        // Одно соединение на страницу: личная комната пользователя, им же пользуется чат
+        window.cafeSocket = io();
+
+        cafeSocket.on('unread', function(data) {
+            const badge = document.getElementById('unread-badge');
+            badge.textContent = data.count;
+            badge.style.display = data.count > 0 ? '' : 'none';
+        });
+
+        cafeSocket.on('notification', function(data) {
+            const div = document.createElement('div');
+            div.textContent = data.message;
+            div.style.cssText = 'position:fixed;top:60px;left:50%;transform:translateX(-50%);background:#4CAF50;color:#fff;padding:15px 25px;border-radius:30px;z-index:101;transition:opacity 0.5s;';
+            document.body.appendChild(div);
+            setTimeout(() => { div.style.opacity = 0; }, 3500);
+            setTimeout(() => div.remove(), 4000);
+            // Показано вживую - на главной повторно не выводим
+            cafeSocket.emit('notification_seen', {id: data.id});
+        });
+    </script>
+    {% endif %}
+    ''', user_id=user_id, active=active, unread_messages=unread_messages)
 
 @app.route('/')
 def home():
     user_id = request.cookies.get('user_id')
-    has_profile = any(p.get('user_id') == user_id for p in profiles) if user_id else False
-    user_notifications = notifications.get(user_id, [])
-    unread_notifications = [
-        n for n in user_notifications
-        if datetime.now() - n['timestamp'] < timedelta(minutes=5)
-    ]
+    has_profile = profiles.has_user(user_id)
+    unread_notifications = notifications.unseen(user_id) if user_id else []
     navbar = render_navbar(user_id, active=None, unread_messages=get_unread_messages_count(user_id))
     return render_template_string('''
         <!DOCTYPE html>
@@ -139,7 +167,7 @@ def create_profile():
     user_id = request.cookies.get('user_id')
     if not user_id:
         user_id = str(uuid.uuid4())
-    if any(p.get('user_id') == user_id for p in profiles):
+    if profiles.has_user(user_id):
         return redirect(url_for('my_profile'))
     if request.method == 'POST':
         photo = request.files['photo']
@@ -148,7 +176,6 @@ def create_profile():
             photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
             photo.save(photo_path)
             profile = {
-                'id': len(profiles),
                 'user_id': user_id,
                 'name': request.form['name'],
                 'age': request.form['age'],
@@ -157,7 +184,7 @@ def create_profile():
                 'photo': filename,
                 'likes': 0
             }
-            profiles.append(profile)
+            profiles.add(profile)
             resp = make_response(redirect(url_for('view_profile', id=profile['id'])))
             resp.set_cookie('user_id', user_id)
             return resp
@@ -225,8 +252,8 @@ def create_profile():
 @app.route('/visitors')
 def view_visitors():
     user_id = request.cookies.get('user_id')
-    other_profiles = [p for p in profiles if p.get('user_id') != user_id]
-    liked_ids = set(likes.get(user_id, []))
+    other_profiles = profiles.others(user_id)
+    liked_ids = likes.liked_by(user_id)
     navbar = render_navbar(user_id, active='visitors', unread_messages=get_unread_messages_count(user_id))
     return render_template_string('''
         <!DOCTYPE html>
@@ -321,24 +348,34 @@ def view_visitors():
 @app.route('/toggle_like/<int:profile_id>', methods=['POST'])
 def toggle_like(profile_id):
     user_id = request.cookies.get('user_id')
-    if not user_id or profile_id >= len(profiles) or profiles[profile_id]['user_id'] == user_id:
+    profile = profiles.get(profile_id)
+    if not user_id or not profile or profile['user_id'] == user_id:
         return jsonify({'liked': False})
-    if profile_id in likes[user_id]:
-        likes[user_id].remove(profile_id)
-        profiles[profile_id]['likes'] = max(0, profiles[profile_id]['likes'] - 1)
+    if likes.unlike(user_id, profile_id):
+        profiles.change_likes(profile_id, -1)
         liked = False
     else:
-        likes[user_id].append(profile_id)
-        profiles[profile_id]['likes'] += 1
-        check_for_matches(user_id)
+        likes.like(user_id, profile_id)
+        profiles.change_likes(profile_id, 1)
+        check_for_matches(user_id, profile_id)
         liked = True
     return jsonify({'liked': liked})
+
+@app.route('/liked_me')
+def liked_me():
+    user_id = request.cookies.get('user_id')
+    profile = profiles.by_user(user_id)
+    if not profile:
+        return jsonify([])
+    liker_profiles = (profiles.by_user(uid) for uid in likes.likers(profile['id']))
+    return jsonify([{'id': p['id'], 'name': p['name'], 'age': p['age']} for p in liker_profiles if p])
+
 @app.route('/my_profile')
 def my_profile():
     user_id = request.cookies.get('user_id')
     if not user_id:
         return redirect(url_for('home'))
-    profile = next((p for p in profiles if p['user_id'] == user_id), None)
+    profile = profiles.by_user(user_id)
     if not profile:
         return redirect(url_for('create'))
     navbar = render_navbar(user_id, active=None, unread_messages=get_unread_messages_count(user_id))
@@ -411,9 +448,10 @@ def my_likes():
     if not user_id:
         return redirect(url_for('home'))
     liked_profiles = []
-    for profile_id in likes.get(user_id, []):
-        if profile_id < len(profiles):
-            liked_profiles.append(profiles[profile_id])
+    for profile_id in sorted(likes.liked_by(user_id)):
+        profile = profiles.get(profile_id)
+        if profile:
+            liked_profiles.append(profile)
     navbar = render_navbar(user_id, active='likes', unread_messages=get_unread_messages_count(user_id))
     return render_template_string('''
         <!DOCTYPE html>
@@ -467,10 +505,10 @@ def my_likes():
 
 @app.route('/profile/<int:id>')
 def view_profile(id):
-    if id >= len(profiles):
+    profile = profiles.get(id)
+    if not profile:
         return "Анкета не найдена", 404
     user_id = request.cookies.get('user_id')
-    profile = profiles[id]
     is_owner = profile.get('user_id') == user_id
     navbar = render_navbar(user_id, active=None, unread_messages=get_unread_messages_count(user_id))
     return render_template_string('''
@@ -545,40 +583,35 @@ def view_profile(id):
 
 @app.route('/like/<int:id>', methods=['POST'])
 def like_profile(id):
-    if id >= len(profiles):
+    profile = profiles.get(id)
+    if not profile:
         return "Анкета не найдена", 404
     user_id = request.cookies.get('user_id')
     if not user_id:
         return redirect(url_for('home'))
-    if profiles[id]['user_id'] == user_id:
+    if profile['user_id'] == user_id:
         return "Нельзя лайкнуть свою анкету", 400
-    if id not in likes[user_id]:
-        likes[user_id].append(id)
-        profiles[id]['likes'] += 1
-        check_for_matches(user_id)
+    if likes.like(user_id, id):
+        profiles.change_likes(id, 1)
+        check_for_matches(user_id, id)
     return redirect(url_for('view_profile', id=id))
 
 @app.route('/delete/<int:id>', methods=['POST'])
 def delete_profile(id):
-    if id >= len(profiles):
+    profile = profiles.get(id)
+    if not profile:
         return "Анкета не найдена", 404
     user_id = request.cookies.get('user_id')
     if not user_id:
         return redirect(url_for('home'))
-    if profiles[id]['user_id'] != user_id:
+    if profile['user_id'] != user_id:
         return "Нельзя удалить чужую анкету", 403
     try:
-        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], profiles[id]['photo']))
+        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], profile['photo']))
     except:
         pass
-    profiles.pop(id)
-    for user_likes in likes.values():
-        for i, liked_id in enumerate(user_likes):
-            if liked_id > id:
-                user_likes[i] = liked_id - 1
-            elif liked_id == id:
-                user_likes.remove(liked_id)
-                break
+    # ID не переиспользуются: убираем только связи самой анкеты
+    stores.delete_profile(id)
     return redirect(url_for('home'))
 
 @app.route('/my_matches')
@@ -587,8 +620,8 @@ def my_matches():
     if not user_id:
         return redirect(url_for('home'))
     matched_profiles = []
-    for matched_user_id in matches.get(user_id, []):
-        profile = next((p for p in profiles if p['user_id'] == matched_user_id), None)
+    for matched_user_id in matches.partners(user_id):
+        profile = profiles.by_user(matched_user_id)
         if profile:
             matched_profiles.append(profile)
     navbar = render_navbar(user_id, active='matches', unread_messages=get_unread_messages_count(user_id))
@@ -643,11 +676,12 @@ def my_messages():
     user_id = request.cookies.get('user_id')
     if not user_id:
         return redirect(url_for('home'))
-    chat_partners = set()
-    for chat_key in messages:
-        if user_id in chat_key:
-            chat_partners.add([uid for uid in chat_key if uid != user_id][0])
-    chat_profiles = [p for p in profiles if p['user_id'] in chat_partners]
+    # Диалоги из индекса пользователя, свежие сверху
+    chats = []
+    for conversation in messages.inbox(user_id):
+        profile = profiles.by_user(conversation['partner'])
+        if profile:
+            chats.append(dict(conversation, profile=profile))
     unread_messages = get_unread_messages_count(user_id)
     navbar = render_navbar(user_id, active='messages', unread_messages=unread_messages)
     return render_template_string('''
@@ -660,11 +694,12 @@ def my_messages():
         <body>
             {{ navbar|safe }}
             <h1>Мои сообщения</h1>
-            {% if chat_profiles %}
-                {% for profile in chat_profiles %}
+            {% if chats %}
+                {% for chat in chats %}
                     <div style="background:#fff;border-radius:10px;box-shadow:0 2px 10px rgba(0,0,0,0.1);padding:20px;margin-bottom:20px;">
-                        <h2>{{ profile.name }}, {{ profile.age }}</h2>
-                        <a href="/chat/{{ profile.user_id }}" class="modern-btn">Открыть чат</a>
+                        <h2>{{ chat.profile.name }}, {{ chat.profile.age }}{% if chat.unread %} <span style="color:#ff6b6b;">({{ chat.unread }})</span>{% endif %}</h2>
+                        <p style="color:#666;">{{ chat.preview }} <small>{{ chat.timestamp.strftime('%d.%m %H:%M') }}</small></p>
+                        <a href="/chat/{{ chat.profile.user_id }}" class="modern-btn">Открыть чат</a>
                     </div>
                 {% endfor %}
             {% else %}
@@ -672,34 +707,31 @@ def my_messages():
             {% endif %}
         </body>
         </html>
-    ''', chat_profiles=chat_profiles, navbar=navbar)
+    ''', chats=chats, navbar=navbar)
 
 @app.route('/chat/<string:other_user_id>', methods=['GET', 'POST'])
 def chat(other_user_id):
     user_id = request.cookies.get('user_id')
     if not user_id:
         return redirect(url_for('home'))
-    if other_user_id not in matches.get(user_id, []):
+    if not matches.is_match(user_id, other_user_id):
         return "Чат доступен только для мэтчей", 403
-    other_profile = next((p for p in profiles if p['user_id'] == other_user_id), None)
+    other_profile = profiles.by_user(other_user_id)
     if not other_profile:
         return "Пользователь не найден", 404
-    chat_key = tuple(sorted([user_id, other_user_id]))
+    chat_key = messages.chat_key(user_id, other_user_id)
     # Помечаем сообщения как прочитанные
-    for msg in messages[chat_key]:
-        if msg['sender'] != user_id:
-            if 'read_by' not in msg:
-                msg['read_by'] = {}
-            msg['read_by'][user_id] = True
+    mark_chat_read(chat_key, user_id)
     navbar = render_navbar(user_id, active='messages', unread_messages=get_unread_messages_count(user_id))
     if request.method == 'POST':
         message = request.form.get('message')
         if message:
-            messages[chat_key].append({
+            messages.append(chat_key, {
                 'sender': user_id,
                 'text': message,
                 'timestamp': datetime.now()
             })
+            push_unread_count(other_user_id)
     return render_template_string('''
         <!DOCTYPE html>
         <html>
@@ -740,11 +772,11 @@ def chat(other_user_id):
                     resize: none;
                 }
             </style>
-            <script src="https://cdn.socket.io/4.7.5/socket.io.min.js"></script>
         </head>
         <body>
             {{ navbar|safe }}
             <h1>Чат с {{ other_profile.name }}</h1>
+            <button id="older-btn" class="modern-btn" style="display:none;">Показать ранние сообщения</button>
             <div id="messages"></div>
             <form id="chat-form" autocomplete="off">
                 <textarea id="message-input" placeholder="Ваше сообщение..." required></textarea>
@@ -753,27 +785,80 @@ def chat(other_user_id):
             <script>
                 const user_id = "{{ user_id }}";
                 const chat_key = "{{ chat_key }}";
-                const socket = io();
+                const socket = window.cafeSocket;
+
+                let before = null;
 
-                function addMessage(msg, isMine) {
+                let partnerReadUpto = null;
+
+                function createMessage(msg, isMine, id) {
                     const div = document.createElement('div');
                     div.className = 'message ' + (isMine ? 'my-message' : 'their-message');
                     div.textContent = msg;
-                    document.getElementById('messages').appendChild(div);
+                    if (isMine) {
+                        div.dataset.id = id;
+                        const receipt = document.createElement('small');
+                        receipt.className = 'receipt';
+                        receipt.textContent = partnerReadUpto !== null && id <= partnerReadUpto ? ' ✓✓' : ' ✓';
+                        div.appendChild(receipt);
+                    }
+                    return div;
+                }
+
+                function addMessage(msg, isMine, id) {
+                    document.getElementById('messages').appendChild(createMessage(msg, isMine, id));
                     window.scrollTo(0, document.body.scrollHeight);
                 }
 
-                // Загрузка истории
-                fetch('/chat_history/{{ other_user_id }}')
-                    .then(r => r.json())
-                    .then(data => {
-                        data.forEach(m => addMessage(m.text, m.sender === user_id));
+                // Собеседник прочитал сообщения до upto включительно
+                function markReadUpto(upto) {
+                    partnerReadUpto = upto;
+                    document.querySelectorAll('.my-message').forEach(div => {
+                        if (Number(div.dataset.id) <= upto) {
+                            div.querySelector('.receipt').textContent = ' ✓✓';
+                        }
                     });
+                }
+
+                // Загрузка истории: последние сообщения, ранние - по кнопке
+                function loadHistory() {
+                    const url = '/chat_history/{{ other_profile.user_id }}' + (before !== null ? '?before=' + before : '');
+                    fetch(url)
+                        .then(r => r.json())
+                        .then(data => {
+                            const container = document.getElementById('messages');
+                            const first = before === null;
+                            const fragment = document.createDocumentFragment();
+                            if (first) {
+                                partnerReadUpto = data.partner_read_upto;
+                            }
+                            data.messages.forEach(m => fragment.appendChild(createMessage(m.text, m.sender === user_id, m.id)));
+                            container.insertBefore(fragment, container.firstChild);
+                            before = data.before;
+                            document.getElementById('older-btn').style.display = before !== null ? 'block' : 'none';
+                            if (first) {
+                                window.scrollTo(0, document.body.scrollHeight);
+                            }
+                        });
+                }
+
+                document.getElementById('older-btn').onclick = loadHistory;
+                loadHistory();
 
                 socket.emit('join', {room: chat_key});
 
                 socket.on('message', function(data) {
-                    addMessage(data.text, data.sender === user_id);
+                    addMessage(data.text, data.sender === user_id, data.id);
+                    if (data.sender !== user_id) {
+                        // Чат открыт - сообщение сразу прочитано
+                        socket.emit('mark_read', {room: chat_key});
+                    }
+                });
+
+                socket.on('read', function(data) {
+                    if (data.reader !== user_id) {
+                        markReadUpto(data.upto);
+                    }
                 });
 
                 document.getElementById('chat-form').onsubmit = function(e) {
@@ -793,8 +878,27 @@ def chat(other_user_id):
 @app.route('/chat_history/<string:other_user_id>')
 def chat_history(other_user_id):
     user_id = request.cookies.get('user_id')
-    chat_key = tuple(sorted([user_id, other_user_id]))
-    return jsonify(messages[chat_key]) if chat_key in messages else jsonify([])
+    if not user_id:
+        return jsonify({'messages': [], 'before': None})
+    chat_key = messages.chat_key(user_id, other_user_id)
+    # Страница последних сообщений; следующая - с курсором before = ID самого старого.
+    # Берется на одно сообщение больше: курсор отдается, только если оно нашлось
+    before = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE, type=int), HISTORY_PAGE_MAX))
+    page = messages.history(chat_key, before=before, limit=limit + 1)
+    has_more = len(page) > limit
+    page = page[-limit:]
+    return jsonify({
+        'messages': page,
+        'before': page[0]['id'] if has_more else None,
+        'partner_read_upto': messages.read_upto(chat_key, other_user_id)
+    })
+
+@socketio.on('connect')
+def on_connect(auth=None):
+    user_id = request.cookies.get('user_id')
+    if user_id:
+        join_room(user_room(user_id))
 
 @socketio.on('join')
 def on_join(data):
@@ -807,12 +911,28 @@ def handle_send_message(data):
     sender = data['sender']
     user_ids = room.split('_')
     chat_key = tuple(sorted(user_ids))
-    messages[chat_key].append({
+    message = messages.append(chat_key, {
         'sender': sender,
         'text': text,
         'timestamp': datetime.now()
     })
-    emit('message', {'text': text, 'sender': sender}, room=room)
+    emit('message', {'id': message['id'], 'text': text, 'sender': sender}, room=room)
+    for user_id in chat_key:
+        if user_id != sender:
+            push_unread_count(user_id)
+
+@socketio.on('mark_read')
+def handle_mark_read(data):
+    user_id = request.cookies.get('user_id')
+    chat_key = tuple(sorted(data['room'].split('_')))
+    if user_id in chat_key:
+        mark_chat_read(chat_key, user_id)
+
+@socketio.on('notification_seen')
+def handle_notification_seen(data):
+    user_id = request.cookies.get('user_id')
+    if user_id:
+        notifications.mark_seen(user_id, int(data['id']))
 
 if __name__ == '__main__':
     socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
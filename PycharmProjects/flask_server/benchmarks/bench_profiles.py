@@ -0,0 +1,99 @@
+"""
+Микробенчмарк стоимости запроса в зависимости от числа анкет
+
+Заполняет хранилище анкетами (без фото на диске) и замеряет среднее время
+запросов, которые ищут анкету текущего пользователя и его мэтчей, через
+тестовый клиент Flask. Для сравнения печатается стоимость прежнего поиска
+перебором списка (next(p for p in profiles if ...)) на тех же данных.
+
+Хранилище выбирается через STORAGE_BACKEND (sqlite пишет во временный файл).
+
+Запуск:
+    python benchmarks/bench_profiles.py [--sizes 10000,100000] [--requests 200] [--matches 10]
+                                        [--backend memory|sqlite]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+server = None
+
+
+def populate(size: int, matches: int) -> str:
+    """Заполнить хранилище, вернуть user_id пользователя с мэтчами (последняя анкета)"""
+    server.profiles.clear()
+    server.likes.clear()
+    server.matches.clear()
+    server.messages.clear()
+    server.notifications.clear()
+    for i in range(size):
+        server.profiles.add({
+            'user_id': f'user-{i}',
+            'name': f'Гость {i}',
+            'age': '30',
+            'hobbies': 'кофе',
+            'goal': 'общение',
+            'photo': 'cart_1.png',
+            'likes': 0
+        })
+    user_id = f'user-{size - 1}'
+    for i in range(matches):
+        server.matches.add(user_id, f'user-{i}')
+    return user_id
+
+
+def measure(client, path: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+    return (time.perf_counter() - start) / requests
+
+
+def list_scan(size: int, user_id: str, requests: int) -> float:
+    """Прежний поиск анкеты перебором списка"""
+    items = list(server.profiles)
+    start = time.perf_counter()
+    for _ in range(requests):
+        next((p for p in items if p['user_id'] == user_id), None)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--matches', type=int, default=10)
+    parser.add_argument('--backend', default='memory', choices=('memory', 'sqlite'))
+    args = parser.parse_args()
+
+    global server
+    os.environ['STORAGE_BACKEND'] = args.backend
+    os.environ['STORAGE_PATH'] = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    import app as server
+
+    report = []
+    for size in (int(value) for value in args.sizes.split(',')):
+        user_id = populate(size, args.matches)
+        client = server.app.test_client()
+        client.set_cookie('user_id', user_id)
+        row = {'backend': args.backend, 'profiles': size}
+        for name, path in (('home', '/'), ('my_profile', '/my_profile'), ('my_matches', '/my_matches'),
+                           ('chat', '/chat/user-0')):
+            row[f'{name}_ms'] = round(measure(client, path, args.requests) * 1000, 3)
+        row['lookup_scan_ms'] = round(list_scan(size, user_id, args.requests) * 1000, 3)
+        report.append(row)
+        print(json.dumps(row, ensure_ascii=False), file=sys.stderr)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Бенчмарк хранилищ состояния кафе (storage.py / sqlite_storage.py)
+
+Для каждого хранилища замеряет среднее время операций: создание анкет,
+лайки с проверкой мэтча, сообщения, чтение счетчика непрочитанных и списка
+диалогов, уведомления и выборку непросмотренных. Запись в SQLite
+дополнительно замеряется из нескольких потоков: так видно, сколько дает
+объединение операций в одну транзакцию.
+
+Запуск:
+    python benchmarks/bench_storage.py [--backends memory,sqlite] [--profiles 2000]
+                                       [--likes 5000] [--messages 5000] [--threads 8]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import create_stores
+
+
+def timed(operation, count: int) -> float:
+    """Среднее время операции в микросекундах"""
+    start = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return round((time.perf_counter() - start) / max(count, 1) * 1e6, 1)
+
+
+def run(backend: str, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    stores = create_stores(backend, path)
+    rng = random.Random(1)
+    users = [f'user-{i}' for i in range(args.profiles)]
+    profile_ids = []
+    row = {'backend': backend}
+
+    def add_profile(i):
+        profile = stores.profiles.add({'user_id': users[i], 'name': f'Гость {i}', 'age': '30',
+                                       'hobbies': 'кофе', 'goal': 'общение', 'photo': 'x.png', 'likes': 0})
+        profile_ids.append(profile['id'])
+
+    row['add_profile_us'] = timed(add_profile, args.profiles)
+
+    def like(i):
+        user, target = rng.randrange(args.profiles), rng.randrange(args.profiles)
+        if stores.likes.like(users[user], profile_ids[target]):
+            stores.profiles.change_likes(profile_ids[target], 1)
+            if stores.likes.has_like(users[target], profile_ids[user]):
+                stores.matches.add(users[user], users[target])
+
+    row['like_us'] = timed(like, args.likes)
+
+    def message(i):
+        sender, recipient = rng.sample(users, 2)
+        stores.messages.append(stores.messages.chat_key(sender, recipient),
+                               {'sender': sender, 'text': f'сообщение {i}', 'timestamp': datetime.now()})
+
+    row['append_message_us'] = timed(message, args.messages)
+    row['unread_count_us'] = timed(lambda i: stores.messages.unread_count(users[i % args.profiles]), args.messages)
+    row['inbox_us'] = timed(lambda i: stores.messages.inbox(users[i % args.profiles]), args.messages)
+    row['by_user_us'] = timed(lambda i: stores.profiles.by_user(users[i % args.profiles]), args.messages)
+    row['notify_us'] = timed(lambda i: stores.notifications.add(users[i % args.profiles], f'уведомление {i}'),
+                             args.messages)
+    row['unseen_us'] = timed(lambda i: stores.notifications.unseen(users[i % args.profiles]), args.messages)
+
+    # Параллельная запись: в SQLite операции потоков объединяются в общие транзакции
+    per_thread = args.messages // args.threads
+
+    def writer(number):
+        local = random.Random(number)
+        for i in range(per_thread):
+            sender, recipient = local.sample(users, 2)
+            stores.messages.append(stores.messages.chat_key(sender, recipient),
+                                   {'sender': sender, 'text': 'параллельно', 'timestamp': datetime.now()})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    row[f'append_message_{args.threads}_threads_us'] = round(
+        (time.perf_counter() - start) / max(per_thread * args.threads, 1) * 1e6, 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='memory,sqlite')
+    parser.add_argument('--profiles', type=int, default=2000)
+    parser.add_argument('--likes', type=int, default=5000)
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    report = []
+    for backend in args.backends.split(','):
+        row = run(backend, args)
+        report.append(row)
+        print(json.dumps(row, ensure_ascii=False), file=sys.stderr)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
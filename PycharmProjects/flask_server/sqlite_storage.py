@@ -0,0 +1,543 @@
+"""
+Хранилище состояния кафе в SQLite
+Те же методы, что у классов storage.py, но данные лежат в файле базы: они
+переживают перезапуск, и несколько процессов-воркеров видят общее состояние.
+
+Чтение идет через отдельное соединение на поток. Запись - через один поток
+записи на процесс: операции из разных запросов собираются в пачку и
+выполняются одной транзакцией (каждая в своем SAVEPOINT, ошибка одной не
+отменяет остальные), вызывающий поток ждет фиксации своей операции.
+
+Схема версионируется через PRAGMA user_version, миграции из MIGRATIONS
+применяются при открытии базы. Вручную:
+    python sqlite_storage.py [--path cafe.db]
+"""
+
+import argparse
+import atexit
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from storage import MessageStore, NotificationStore
+
+# Миграции схемы по порядку: версия базы = количество примененных.
+# Первая создает исходную схему; следующие добавляются только для изменений
+# схемы, уже выпущенной в базах пользователей
+MIGRATIONS = [
+    '''
+    CREATE TABLE profiles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        age TEXT NOT NULL,
+        hobbies TEXT NOT NULL,
+        goal TEXT NOT NULL,
+        photo TEXT NOT NULL,
+        likes INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE likes (
+        user_id TEXT NOT NULL,
+        profile_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, profile_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX likes_profile ON likes (profile_id, user_id);
+    CREATE TABLE matches (
+        user_id TEXT NOT NULL,
+        partner TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (user_id, partner)
+    ) WITHOUT ROWID;
+    CREATE TABLE messages (
+        id INTEGER PRIMARY KEY,
+        user_a TEXT NOT NULL,
+        user_b TEXT NOT NULL,
+        sender TEXT NOT NULL,
+        text TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX messages_chat ON messages (user_a, user_b, id);
+    -- Прочтение на участника: read_upto - ID последнего прочитанного сообщения,
+    -- непрочитанные - разность смещений received - read_offset
+    CREATE TABLE conversations (
+        user_id TEXT NOT NULL,
+        partner TEXT NOT NULL,
+        last_at REAL NOT NULL,
+        preview TEXT NOT NULL,
+        read_upto INTEGER,
+        received INTEGER NOT NULL DEFAULT 0,
+        read_offset INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, partner)
+    ) WITHOUT ROWID;
+    CREATE INDEX conversations_recent ON conversations (user_id, last_at);
+    CREATE TABLE user_offsets (
+        user_id TEXT PRIMARY KEY,
+        received INTEGER NOT NULL DEFAULT 0,
+        read_offset INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    -- Растущий ID уведомлений - курсор просмотренных, индекс сроков - для вытеснения по TTL
+    CREATE TABLE notifications (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX notifications_user ON notifications (user_id, id);
+    CREATE INDEX notifications_created ON notifications (created_at);
+    CREATE TABLE notification_cursors (
+        user_id TEXT PRIMARY KEY,
+        seen_upto INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    ''',
+]
+
+# Сколько операций записи максимум объединять в одну транзакцию
+WRITE_BATCH = 200
+
+_STOP = object()
+
+
+def _timestamp(value: float) -> datetime:
+    return datetime.fromtimestamp(value)
+
+
+class Database:
+    """Файл базы: соединения для чтения и поток пакетной записи"""
+
+    def __init__(self, path: str, batch_size: int = WRITE_BATCH):
+        """
+        Args:
+            path: Путь к файлу базы данных
+            batch_size: Сколько операций записи максимум объединять в транзакцию
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self.migrate()
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name='sqlite-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # Отдельное соединение на поток - sqlite3 не разрешает делить его между потоками
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def migrate(self) -> int:
+        """Применить недостающие миграции, вернуть версию схемы"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in script.split(';'):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {number}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(MIGRATIONS)
+
+    def read(self, sql: str, params=()) -> List[sqlite3.Row]:
+        return self._conn().execute(sql, params).fetchall()
+
+    def read_one(self, sql: str, params=()) -> Optional[sqlite3.Row]:
+        return self._conn().execute(sql, params).fetchone()
+
+    def write(self, operation: Callable[[sqlite3.Connection], object]):
+        """
+        Выполнить operation(conn) в потоке записи и дождаться фиксации
+
+        Операция выполняется атомарно и возвращает результат или пробрасывает
+        свое исключение.
+        """
+        if threading.current_thread() is self._writer:
+            return operation(self._conn())
+        future = Future()
+        self._queue.put((operation, future))
+        return future.result()
+
+    def execute(self, sql: str, params=()) -> int:
+        """Одна команда записи, возвращает количество измененных строк"""
+        return self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    def _write_loop(self):
+        conn = self._conn()
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._run_batch(conn, batch)
+            if stop:
+                return
+
+    @staticmethod
+    def _run_batch(conn: sqlite3.Connection, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                conn.execute('SAVEPOINT operation')
+                try:
+                    results.append((future, operation(conn), None))
+                    conn.execute('RELEASE operation')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO operation')
+                    conn.execute('RELEASE operation')
+                    results.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=5)
+
+
+class SqliteProfileRepository:
+    """Анкеты (ID - AUTOINCREMENT, не переиспользуются)"""
+
+    COLUMNS = ('user_id', 'name', 'age', 'hobbies', 'goal', 'photo', 'likes')
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def __len__(self):
+        return self.db.read_one('SELECT COUNT(*) FROM profiles')[0]
+
+    def __iter__(self):
+        return iter([dict(row) for row in self.db.read('SELECT * FROM profiles ORDER BY id')])
+
+    def add(self, profile: Dict) -> Dict:
+        values = [profile.get(column, 0 if column == 'likes' else '') for column in self.COLUMNS]
+        sql = f'INSERT INTO profiles ({", ".join(self.COLUMNS)}) VALUES ({", ".join("?" * len(self.COLUMNS))})'
+        profile['id'] = self.db.write(lambda conn: conn.execute(sql, values).lastrowid)
+        return profile
+
+    def get(self, profile_id: int) -> Optional[Dict]:
+        row = self.db.read_one('SELECT * FROM profiles WHERE id = ?', (profile_id,))
+        return dict(row) if row else None
+
+    def by_user(self, user_id: str) -> Optional[Dict]:
+        if not user_id:
+            return None
+        row = self.db.read_one('SELECT * FROM profiles WHERE user_id = ?', (user_id,))
+        return dict(row) if row else None
+
+    def has_user(self, user_id: str) -> bool:
+        return bool(user_id) and self.db.read_one('SELECT 1 FROM profiles WHERE user_id = ?', (user_id,)) is not None
+
+    def others(self, user_id: str) -> List[Dict]:
+        return [dict(row) for row in self.db.read('SELECT * FROM profiles WHERE user_id != ? ORDER BY id',
+                                                  (user_id or '',))]
+
+    def change_likes(self, profile_id: int, delta: int):
+        self.db.execute('UPDATE profiles SET likes = MAX(0, likes + ?) WHERE id = ?', (delta, profile_id))
+
+    def remove(self, profile_id: int) -> Optional[Dict]:
+        def operation(conn):
+            row = conn.execute('SELECT * FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM profiles WHERE id = ?', (profile_id,))
+            return dict(row)
+        return self.db.write(operation)
+
+    def remove_with_links(self, profile_id: int, likes=None, matches=None) -> Optional[Dict]:
+        # Лайки и мэтчи лежат в той же базе: все удаление - одна операция записи
+        def operation(conn):
+            row = conn.execute('SELECT * FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+            if row is None:
+                return None
+            user_id = row['user_id']
+            conn.execute('DELETE FROM profiles WHERE id = ?', (profile_id,))
+            conn.execute('DELETE FROM likes WHERE profile_id = ?', (profile_id,))
+            conn.execute('UPDATE profiles SET likes = MAX(0, likes - 1) '
+                         'WHERE id IN (SELECT profile_id FROM likes WHERE user_id = ?)', (user_id,))
+            conn.execute('DELETE FROM likes WHERE user_id = ?', (user_id,))
+            conn.execute('DELETE FROM matches WHERE user_id = ? OR partner = ?', (user_id, user_id))
+            return dict(row)
+        return self.db.write(operation)
+
+    def clear(self):
+        self.db.execute('DELETE FROM profiles')
+
+
+class SqliteLikeGraph:
+    """Лайки: первичный ключ (user_id, profile_id) - прямой индекс, likes_profile - обратный"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def like(self, user_id: str, profile_id: int) -> bool:
+        return self.db.execute('INSERT OR IGNORE INTO likes (user_id, profile_id) VALUES (?, ?)',
+                               (user_id, profile_id)) > 0
+
+    def unlike(self, user_id: str, profile_id: int) -> bool:
+        return self.db.execute('DELETE FROM likes WHERE user_id = ? AND profile_id = ?', (user_id, profile_id)) > 0
+
+    def has_like(self, user_id: str, profile_id: int) -> bool:
+        return self.db.read_one('SELECT 1 FROM likes WHERE user_id = ? AND profile_id = ?',
+                                (user_id, profile_id)) is not None
+
+    def liked_by(self, user_id: str) -> Set[int]:
+        return {row[0] for row in self.db.read('SELECT profile_id FROM likes WHERE user_id = ?', (user_id,))}
+
+    def likers(self, profile_id: int) -> Set[str]:
+        return {row[0] for row in self.db.read('SELECT user_id FROM likes WHERE profile_id = ?', (profile_id,))}
+
+    def remove_user(self, user_id: str) -> Set[int]:
+        def operation(conn):
+            liked = {row[0] for row in conn.execute('SELECT profile_id FROM likes WHERE user_id = ?', (user_id,))}
+            conn.execute('DELETE FROM likes WHERE user_id = ?', (user_id,))
+            return liked
+        return self.db.write(operation)
+
+    def remove_profile(self, profile_id: int) -> Set[str]:
+        def operation(conn):
+            likers = {row[0] for row in conn.execute('SELECT user_id FROM likes WHERE profile_id = ?', (profile_id,))}
+            conn.execute('DELETE FROM likes WHERE profile_id = ?', (profile_id,))
+            return likers
+        return self.db.write(operation)
+
+    def clear(self):
+        self.db.execute('DELETE FROM likes')
+
+
+class SqliteMatchStore:
+    """Мэтчи: строка на каждую сторону пары"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def add(self, user_id: str, other_user_id: str) -> bool:
+        def operation(conn):
+            now = datetime.now().timestamp()
+            added = conn.execute('INSERT OR IGNORE INTO matches (user_id, partner, created_at) VALUES (?, ?, ?)',
+                                 (user_id, other_user_id, now)).rowcount
+            conn.execute('INSERT OR IGNORE INTO matches (user_id, partner, created_at) VALUES (?, ?, ?)',
+                         (other_user_id, user_id, now))
+            return added > 0
+        return self.db.write(operation)
+
+    def is_match(self, user_id: str, other_user_id: str) -> bool:
+        return self.db.read_one('SELECT 1 FROM matches WHERE user_id = ? AND partner = ?',
+                                (user_id, other_user_id)) is not None
+
+    def partners(self, user_id: str) -> List[str]:
+        return [row[0] for row in self.db.read(
+            'SELECT partner FROM matches WHERE user_id = ? ORDER BY created_at', (user_id,))]
+
+    def remove_user(self, user_id: str) -> List[str]:
+        def operation(conn):
+            partners = [row[0] for row in conn.execute('SELECT partner FROM matches WHERE user_id = ?', (user_id,))]
+            conn.execute('DELETE FROM matches WHERE user_id = ? OR partner = ?', (user_id, user_id))
+            return partners
+        return self.db.write(operation)
+
+    def clear(self):
+        self.db.execute('DELETE FROM matches')
+
+
+class SqliteMessageStore:
+    """
+    Сообщения и индекс диалогов: последнее сообщение и смещения received /
+    read_offset на каждую сторону, суммы смещений пользователя - в user_offsets
+    """
+
+    PREVIEW_LENGTH = MessageStore.PREVIEW_LENGTH
+    chat_key = staticmethod(MessageStore.chat_key)
+    _partner = staticmethod(MessageStore._partner)
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    @staticmethod
+    def _message(row) -> Dict:
+        return {'id': row['id'], 'sender': row['sender'], 'text': row['text'],
+                'timestamp': _timestamp(row['created_at'])}
+
+    def history(self, chat_key: tuple, before: int = None, limit: int = None) -> List[Dict]:
+        """Сообщения чата от старых к новым (курсор before - ID, страница - limit последних)"""
+        rows = self.db.read(
+            'SELECT id, sender, text, created_at FROM messages WHERE user_a = ? AND user_b = ? AND id < ? '
+            'ORDER BY id DESC LIMIT ?',
+            (*chat_key, before if before is not None else 2 ** 63 - 1, limit if limit is not None else -1)
+        )
+        return [self._message(row) for row in reversed(rows)]
+
+    def append(self, chat_key: tuple, message: Dict) -> Dict:
+        sender = message['sender']
+        created_at = message['timestamp'].timestamp()
+        preview = message['text'][:self.PREVIEW_LENGTH]
+
+        def operation(conn):
+            message['id'] = conn.execute(
+                'INSERT INTO messages (user_a, user_b, sender, text, created_at) VALUES (?, ?, ?, ?, ?)',
+                (*chat_key, sender, message['text'], created_at)
+            ).lastrowid
+            for user_id in chat_key:
+                received = 0 if user_id == sender else 1
+                conn.execute(
+                    'INSERT INTO conversations (user_id, partner, last_at, preview, received) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (user_id, partner) DO UPDATE SET '
+                    'last_at = excluded.last_at, preview = excluded.preview, received = received + excluded.received',
+                    (user_id, self._partner(chat_key, user_id), created_at, preview, received)
+                )
+                if received:
+                    conn.execute(
+                        'INSERT INTO user_offsets (user_id, received) VALUES (?, 1) '
+                        'ON CONFLICT (user_id) DO UPDATE SET received = received + 1', (user_id,)
+                    )
+        self.db.write(operation)
+        return message
+
+    def mark_read(self, chat_key: tuple, user_id: str) -> Optional[int]:
+        """Подтянуть read_offset к received, вернуть новый read_upto (None - нечего было читать)"""
+        if not self.unread_in(chat_key, user_id):
+            return None
+        partner = self._partner(chat_key, user_id)
+
+        def operation(conn):
+            row = conn.execute('SELECT received, read_offset FROM conversations WHERE user_id = ? AND partner = ?',
+                               (user_id, partner)).fetchone()
+            if row is None or row['received'] == row['read_offset']:
+                return None
+            read_upto = conn.execute('SELECT MAX(id) FROM messages WHERE user_a = ? AND user_b = ?',
+                                     chat_key).fetchone()[0]
+            conn.execute('UPDATE conversations SET read_offset = received, read_upto = ? '
+                         'WHERE user_id = ? AND partner = ?', (read_upto, user_id, partner))
+            conn.execute('UPDATE user_offsets SET read_offset = read_offset + ? WHERE user_id = ?',
+                         (row['received'] - row['read_offset'], user_id))
+            return read_upto
+        return self.db.write(operation)
+
+    def read_upto(self, chat_key: tuple, user_id: str) -> Optional[int]:
+        row = self.db.read_one('SELECT read_upto FROM conversations WHERE user_id = ? AND partner = ?',
+                               (user_id, self._partner(chat_key, user_id)))
+        return row[0] if row else None
+
+    def inbox(self, user_id: str) -> List[Dict]:
+        rows = self.db.read('SELECT partner, last_at, preview, received - read_offset AS unread FROM conversations '
+                            'WHERE user_id = ? ORDER BY last_at DESC', (user_id,))
+        return [{'partner': row['partner'], 'timestamp': _timestamp(row['last_at']),
+                 'preview': row['preview'], 'unread': row['unread']} for row in rows]
+
+    def partners(self, user_id: str) -> Set[str]:
+        return {row[0] for row in self.db.read('SELECT partner FROM conversations WHERE user_id = ?', (user_id,))}
+
+    def unread_count(self, user_id: str) -> int:
+        if not user_id:
+            return 0
+        row = self.db.read_one('SELECT received - read_offset FROM user_offsets WHERE user_id = ?', (user_id,))
+        return row[0] if row else 0
+
+    def unread_in(self, chat_key: tuple, user_id: str) -> int:
+        row = self.db.read_one('SELECT received - read_offset FROM conversations WHERE user_id = ? AND partner = ?',
+                               (user_id, self._partner(chat_key, user_id)))
+        return row[0] if row else 0
+
+    def clear(self):
+        def operation(conn):
+            conn.execute('DELETE FROM messages')
+            conn.execute('DELETE FROM conversations')
+            conn.execute('DELETE FROM user_offsets')
+        self.db.write(operation)
+
+
+class SqliteNotificationStore:
+    """Уведомления: не больше max_per_user на пользователя, старше ttl удаляются при записи"""
+
+    TTL = NotificationStore.TTL
+    MAX_PER_USER = NotificationStore.MAX_PER_USER
+
+    def __init__(self, db: Database, ttl: timedelta = None, max_per_user: int = None):
+        self.db = db
+        self.ttl = ttl or self.TTL
+        self.max_per_user = max_per_user or self.MAX_PER_USER
+
+    def add(self, user_id: str, message: str) -> Dict:
+        now = datetime.now()
+
+        def operation(conn):
+            conn.execute('DELETE FROM notifications WHERE created_at <= ?', ((now - self.ttl).timestamp(),))
+            notification_id = conn.execute('INSERT INTO notifications (user_id, message, created_at) '
+                                           'VALUES (?, ?, ?)', (user_id, message, now.timestamp())).lastrowid
+            conn.execute('DELETE FROM notifications WHERE user_id = ? AND id < ('
+                         'SELECT id FROM notifications WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                         (user_id, user_id, self.max_per_user - 1))
+            return notification_id
+        return {'id': self.db.write(operation), 'message': message, 'timestamp': now}
+
+    def unseen(self, user_id: str, mark_seen: bool = True) -> List[Dict]:
+        rows = self.db.read('SELECT id, message, created_at FROM notifications '
+                            'WHERE user_id = ? AND created_at > ? AND id > COALESCE('
+                            '(SELECT seen_upto FROM notification_cursors WHERE user_id = ?), 0) ORDER BY id',
+                            (user_id, (datetime.now() - self.ttl).timestamp(), user_id))
+        if rows and mark_seen:
+            self.mark_seen(user_id, rows[-1]['id'])
+        return [{'id': row['id'], 'message': row['message'], 'timestamp': _timestamp(row['created_at'])}
+                for row in rows]
+
+    def mark_seen(self, user_id: str, upto: int):
+        self.db.execute('INSERT INTO notification_cursors (user_id, seen_upto) VALUES (?, ?) '
+                        'ON CONFLICT (user_id) DO UPDATE SET seen_upto = MAX(seen_upto, excluded.seen_upto)',
+                        (user_id, upto))
+
+    def clear(self):
+        def operation(conn):
+            conn.execute('DELETE FROM notifications')
+            conn.execute('DELETE FROM notification_cursors')
+        self.db.write(operation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Применить миграции схемы базы кафе')
+    parser.add_argument('--path', default='cafe.db')
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.path)
+    before = conn.execute('PRAGMA user_version').fetchone()[0]
+    conn.close()
+    db = Database(args.path)
+    print(f"✅ {args.path}: схема версии {before} -> {db.migrate()}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+"""
+Хранилище состояния кафе: анкеты, лайки, мэтчи, сообщения и уведомления
+Классы этого модуля держат данные в памяти процесса; sqlite_storage.py
+реализует те же методы поверх SQLite. Какие хранилища использовать, решает
+create_stores() по переменной окружения STORAGE_BACKEND=sqlite|memory.
+Если воркеров несколько, им нужна и общая очередь Socket.IO
+(SOCKETIO_MESSAGE_QUEUE в app.py), иначе уведомления не доходят до клиентов
+других процессов.
+
+Анкеты лежат в словаре по ID, рядом поддерживается индекс user_id -> анкета,
+поэтому поиск анкеты текущего пользователя не перебирает всех посетителей.
+ID анкет выдаются счетчиком и не переиспользуются: удаление анкеты не сдвигает
+чужие ID, а ссылки на удаленную анкету просто перестают находиться.
+"""
+
+import itertools
+import os
+import threading
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+
+class ProfileRepository:
+    """Анкеты с индексами по ID и по user_id"""
+
+    def __init__(self):
+        self._by_id: Dict[int, Dict] = {}
+        self._by_user: Dict[str, Dict] = {}
+        self._ids = itertools.count()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def add(self, profile: Dict) -> Dict:
+        """Добавить анкету с новым ID"""
+        with self._lock:
+            profile['id'] = next(self._ids)
+            self._by_id[profile['id']] = profile
+            self._by_user[profile['user_id']] = profile
+            return profile
+
+    def get(self, profile_id: int) -> Optional[Dict]:
+        return self._by_id.get(profile_id)
+
+    def by_user(self, user_id: str) -> Optional[Dict]:
+        if not user_id:
+            return None
+        return self._by_user.get(user_id)
+
+    def has_user(self, user_id: str) -> bool:
+        return bool(user_id) and user_id in self._by_user
+
+    def others(self, user_id: str) -> List[Dict]:
+        """Все анкеты, кроме анкеты пользователя"""
+        return [p for p in list(self._by_id.values()) if p['user_id'] != user_id]
+
+    def change_likes(self, profile_id: int, delta: int):
+        """Изменить счетчик лайков анкеты (не меньше нуля)"""
+        with self._lock:
+            profile = self._by_id.get(profile_id)
+            if profile is not None:
+                profile['likes'] = max(0, profile['likes'] + delta)
+
+    def remove(self, profile_id: int) -> Optional[Dict]:
+        """Удалить анкету (ID остальных анкет не меняются)"""
+        with self._lock:
+            profile = self._by_id.pop(profile_id, None)
+            if profile is not None:
+                self._by_user.pop(profile['user_id'], None)
+            return profile
+
+    def remove_with_links(self, profile_id: int, likes: 'LikeGraph', matches: 'MatchStore') -> Optional[Dict]:
+        """
+        Удалить анкету вместе с ее лайками и мэтчами владельца
+
+        Лайки, которые ставил владелец, снимаются, счетчики лайкнутых анкет
+        уменьшаются. Все делается под блокировками трех хранилищ сразу, поэтому
+        другие запросы не видят анкету удаленной наполовину.
+        """
+        with self._lock, likes._lock, matches._lock:
+            profile = self.remove(profile_id)
+            if profile is None:
+                return None
+            likes.remove_profile(profile_id)
+            for liked_id in likes.remove_user(profile['user_id']):
+                self.change_likes(liked_id, -1)
+            matches.remove_user(profile['user_id'])
+            return profile
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_user.clear()
+
+
+class LikeGraph:
+    """
+    Лайки: прямые (пользователь -> ID анкет) и обратные (ID анкеты -> пользователи)
+    множества смежности. Проверка взаимного лайка и список "кто меня лайкнул"
+    не требуют перебора.
+    """
+
+    def __init__(self):
+        self._liked: Dict[str, Set[int]] = {}   # user_id -> ID лайкнутых анкет
+        self._likers: Dict[int, Set[str]] = {}  # ID анкеты -> user_id лайкнувших
+        self._lock = threading.RLock()
+
+    def like(self, user_id: str, profile_id: int) -> bool:
+        """Поставить лайк, False - лайк уже был"""
+        with self._lock:
+            liked = self._liked.setdefault(user_id, set())
+            if profile_id in liked:
+                return False
+            liked.add(profile_id)
+            self._likers.setdefault(profile_id, set()).add(user_id)
+            return True
+
+    def unlike(self, user_id: str, profile_id: int) -> bool:
+        """Снять лайк, False - лайка не было"""
+        with self._lock:
+            liked = self._liked.get(user_id)
+            if not liked or profile_id not in liked:
+                return False
+            liked.discard(profile_id)
+            self._likers.get(profile_id, set()).discard(user_id)
+            return True
+
+    def has_like(self, user_id: str, profile_id: int) -> bool:
+        return profile_id in self._liked.get(user_id, ())
+
+    def liked_by(self, user_id: str) -> Set[int]:
+        """ID анкет, которые лайкнул пользователь"""
+        return set(self._liked.get(user_id, ()))
+
+    def likers(self, profile_id: int) -> Set[str]:
+        """Пользователи, лайкнувшие анкету"""
+        return set(self._likers.get(profile_id, ()))
+
+    def remove_user(self, user_id: str) -> Set[int]:
+        """Удалить лайки пользователя, вернуть ID анкет, которые он лайкал"""
+        with self._lock:
+            liked = self._liked.pop(user_id, set())
+            for profile_id in liked:
+                self._likers.get(profile_id, set()).discard(user_id)
+            return liked
+
+    def remove_profile(self, profile_id: int) -> Set[str]:
+        """Удалить лайки анкеты, вернуть пользователей, которые ее лайкали"""
+        with self._lock:
+            likers = self._likers.pop(profile_id, set())
+            for user_id in likers:
+                self._liked.get(user_id, set()).discard(profile_id)
+            return likers
+
+    def clear(self):
+        with self._lock:
+            self._liked.clear()
+            self._likers.clear()
+
+
+class MatchStore:
+    """Мэтчи: пользователь -> собеседники в порядке появления мэтча"""
+
+    def __init__(self):
+        self._partners: Dict[str, Dict[str, None]] = {}
+        self._lock = threading.RLock()
+
+    def add(self, user_id: str, other_user_id: str) -> bool:
+        """Записать мэтч в обе стороны, False - мэтч уже был"""
+        with self._lock:
+            if other_user_id in self._partners.get(user_id, ()):
+                return False
+            self._partners.setdefault(user_id, {})[other_user_id] = None
+            self._partners.setdefault(other_user_id, {})[user_id] = None
+            return True
+
+    def is_match(self, user_id: str, other_user_id: str) -> bool:
+        return other_user_id in self._partners.get(user_id, ())
+
+    def partners(self, user_id: str) -> List[str]:
+        return list(self._partners.get(user_id, ()))
+
+    def remove_user(self, user_id: str) -> List[str]:
+        """Удалить мэтчи пользователя, вернуть бывших собеседников"""
+        with self._lock:
+            partners = list(self._partners.pop(user_id, ()))
+            for partner in partners:
+                self._partners.get(partner, {}).pop(user_id, None)
+            return partners
+
+    def clear(self):
+        with self._lock:
+            self._partners.clear()
+
+
+class MessageStore:
+    """
+    Переписки по ключу чата (отсортированная пара user_id) и индекс диалогов
+    пользователь -> {собеседник: время и текст последнего сообщения, смещения}.
+
+    ID сообщения - его позиция в переписке, он же курсор для постраничной
+    истории. Прочтение хранится не флагом в каждом сообщении, а смещениями на
+    участника: received - сколько сообщений он получил в чате, read - сколько
+    из них прочитал, read_upto - ID последнего прочитанного сообщения.
+    Непрочитанные - разность смещений, общий счетчик пользователя - разность
+    сумм, поэтому все операции O(1).
+    """
+
+    PREVIEW_LENGTH = 50
+
+    def __init__(self):
+        self._chats: Dict[tuple, List[Dict]] = {}
+        self._conversations: Dict[str, Dict[str, Dict]] = {}
+        self._received_total: Dict[str, int] = {}
+        self._read_total: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def chat_key(user_id: str, other_user_id: str) -> tuple:
+        return tuple(sorted([user_id, other_user_id]))
+
+    @staticmethod
+    def _partner(chat_key: tuple, user_id: str) -> str:
+        return chat_key[1] if user_id == chat_key[0] else chat_key[0]
+
+    def _conversation(self, user_id: str, partner: str) -> Dict:
+        conversations = self._conversations.setdefault(user_id, {})
+        conversation = conversations.get(partner)
+        if conversation is None:
+            conversation = conversations[partner] = {'timestamp': None, 'preview': '', 'received': 0,
+                                                     'read': 0, 'read_upto': None}
+        return conversation
+
+    def history(self, chat_key: tuple, before: int = None, limit: int = None) -> List[Dict]:
+        """
+        Сообщения чата от старых к новым
+
+        Args:
+            before: Только сообщения с ID меньше этого (курсор предыдущей страницы)
+            limit: Не больше стольких последних сообщений
+        """
+        chat = self._chats.get(chat_key, ())
+        end = len(chat) if before is None else max(0, min(before, len(chat)))
+        start = 0 if limit is None else max(0, end - limit)
+        return list(chat[start:end])
+
+    def append(self, chat_key: tuple, message: Dict) -> Dict:
+        """Добавить сообщение, у получателя сдвигается смещение received"""
+        with self._lock:
+            chat = self._chats.setdefault(chat_key, [])
+            message['id'] = len(chat)
+            chat.append(message)
+            preview = message['text'][:self.PREVIEW_LENGTH]
+            for user_id in chat_key:
+                conversation = self._conversation(user_id, self._partner(chat_key, user_id))
+                conversation['timestamp'] = message['timestamp']
+                conversation['preview'] = preview
+                if user_id != message['sender']:
+                    conversation['received'] += 1
+                    self._received_total[user_id] = self._received_total.get(user_id, 0) + 1
+            return message
+
+    def mark_read(self, chat_key: tuple, user_id: str) -> Optional[int]:
+        """
+        Отметить чат прочитанным: подтянуть смещение read к received
+
+        Returns:
+            Новый read_upto, если отметка сдвинулась (None - нечего было читать)
+        """
+        with self._lock:
+            conversation = self._conversations.get(user_id, {}).get(self._partner(chat_key, user_id))
+            if conversation is None or conversation['read'] == conversation['received']:
+                return None
+            unread = conversation['received'] - conversation['read']
+            self._read_total[user_id] = self._read_total.get(user_id, 0) + unread
+            conversation['read'] = conversation['received']
+            conversation['read_upto'] = len(self._chats[chat_key]) - 1
+            return conversation['read_upto']
+
+    def read_upto(self, chat_key: tuple, user_id: str) -> Optional[int]:
+        """ID последнего прочитанного участником сообщения (None - не читал)"""
+        conversation = self._conversations.get(user_id, {}).get(self._partner(chat_key, user_id))
+        return conversation['read_upto'] if conversation else None
+
+    def inbox(self, user_id: str) -> List[Dict]:
+        """Диалоги пользователя от последнего сообщения к первому"""
+        inbox = [
+            {'partner': partner, 'timestamp': item['timestamp'], 'preview': item['preview'],
+             'unread': item['received'] - item['read']}
+            for partner, item in list(self._conversations.get(user_id, {}).items())
+            if item['timestamp'] is not None
+        ]
+        inbox.sort(key=lambda item: item['timestamp'], reverse=True)
+        return inbox
+
+    def partners(self, user_id: str) -> Set[str]:
+        return set(self._conversations.get(user_id, ()))
+
+    def unread_count(self, user_id: str) -> int:
+        """Всего непрочитанных сообщений пользователя"""
+        if not user_id:
+            return 0
+        return self._received_total.get(user_id, 0) - self._read_total.get(user_id, 0)
+
+    def unread_in(self, chat_key: tuple, user_id: str) -> int:
+        conversation = self._conversations.get(user_id, {}).get(self._partner(chat_key, user_id))
+        return conversation['received'] - conversation['read'] if conversation else 0
+
+    def clear(self):
+        with self._lock:
+            self._chats.clear()
+            self._conversations.clear()
+            self._received_total.clear()
+            self._read_total.clear()
+
+
+class NotificationStore:
+    """
+    Уведомления пользователей
+
+    На пользователя - очередь не длиннее MAX_PER_USER в порядке появления,
+    уведомления старше TTL вытесняются. Общая очередь сроков (время, user_id)
+    позволяет удалять устаревшие без обхода всех пользователей. ID уведомления
+    растет со временем, курсор seen - ID последнего показанного, поэтому
+    unseen() идет с конца очереди и читает только новые.
+    """
+
+    TTL = timedelta(days=1)
+    MAX_PER_USER = 50
+
+    def __init__(self, ttl: timedelta = None, max_per_user: int = None):
+        self.ttl = ttl or self.TTL
+        self.max_per_user = max_per_user or self.MAX_PER_USER
+        self._items: Dict[str, deque] = {}
+        self._seen: Dict[str, int] = {}
+        self._expiry: deque = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def _evict(self, now: datetime):
+        """Удалить уведомления старше TTL"""
+        cutoff = now - self.ttl
+        while self._expiry and self._expiry[0][0] <= cutoff:
+            _, user_id = self._expiry.popleft()
+            items = self._items.get(user_id)
+            # Уведомление могло уже уйти из очереди по MAX_PER_USER
+            if items and items[0]['timestamp'] <= cutoff:
+                items.popleft()
+            if not items:
+                self._items.pop(user_id, None)
+                self._seen.pop(user_id, None)
+
+    def add(self, user_id: str, message: str) -> Dict:
+        now = datetime.now()
+        with self._lock:
+            self._evict(now)
+            notification = {'id': next(self._ids), 'message': message, 'timestamp': now}
+            items = self._items.get(user_id)
+            if items is None:
+                items = self._items[user_id] = deque(maxlen=self.max_per_user)
+            items.append(notification)
+            self._expiry.append((now, user_id))
+        return notification
+
+    def unseen(self, user_id: str, mark_seen: bool = True) -> List[Dict]:
+        """
+        Уведомления, которые пользователь еще не видел, от старых к новым
+
+        Args:
+            user_id: ID пользователя
+            mark_seen: Сдвинуть курсор - следующий вызов их уже не вернет
+        """
+        with self._lock:
+            self._evict(datetime.now())
+            items = self._items.get(user_id)
+            if not items:
+                return []
+            cursor = self._seen.get(user_id, 0)
+            fresh = []
+            for notification in reversed(items):
+                if notification['id'] <= cursor:
+                    break
+                fresh.append(notification)
+            fresh.reverse()
+            if fresh and mark_seen:
+                self.mark_seen(user_id, fresh[-1]['id'])
+            return fresh
+
+    def mark_seen(self, user_id: str, upto: int):
+        """Пользователь видел уведомления до upto включительно"""
+        with self._lock:
+            if user_id in self._items:
+                self._seen[user_id] = max(self._seen.get(user_id, 0), upto)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._seen.clear()
+            self._expiry.clear()
+
+
+class Stores(namedtuple('Stores', 'profiles likes matches messages notifications')):
+    """Хранилища приложения и операции, затрагивающие несколько из них"""
+
+    __slots__ = ()
+
+    def delete_profile(self, profile_id: int) -> Optional[Dict]:
+        """Удалить анкету, ее лайки и мэтчи владельца одной операцией, вернуть удаленную анкету"""
+        return self.profiles.remove_with_links(profile_id, self.likes, self.matches)
+
+
+def create_stores(backend: str = None, path: str = None) -> Stores:
+    """
+    Хранилища приложения
+
+    Args:
+        backend: sqlite (по умолчанию) или memory; по умолчанию из STORAGE_BACKEND
+        path: Файл базы SQLite; по умолчанию из STORAGE_PATH (cafe.db)
+    """
+    backend = (backend or os.environ.get('STORAGE_BACKEND', 'sqlite')).lower()
+    if backend == 'memory':
+        return Stores(ProfileRepository(), LikeGraph(), MatchStore(), MessageStore(), NotificationStore())
+    if backend == 'sqlite':
+        import sqlite_storage
+        database = sqlite_storage.Database(path or os.environ.get('STORAGE_PATH', 'cafe.db'))
+        return Stores(
+            sqlite_storage.SqliteProfileRepository(database),
+            sqlite_storage.SqliteLikeGraph(database),
+            sqlite_storage.SqliteMatchStore(database),
+            sqlite_storage.SqliteMessageStore(database),
+            sqlite_storage.SqliteNotificationStore(database)
+        )
+    raise ValueError(f'Неизвестный STORAGE_BACKEND: {backend} (доступны: sqlite, memory)')
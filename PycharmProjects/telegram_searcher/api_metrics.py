@@ -0,0 +1,386 @@
+"""
+Метрики вызовов Telegram API
+Каждый вызов клиента (запросы client(...) и методы get_entity, send_message,
+iter_dialogs и т.д.) записывается с типом запроса, временем, результатом,
+FloodWait и повторами. Данные агрегируются в гистограммы - общие (для
+/api/metrics в формате Prometheus) и по задачам (для статуса задачи)
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from telethon.errors import RPCError
+
+from rate_governor import SHORT_FLOOD_RETRIES, SHORT_FLOOD_WAIT, TokenBucket, request_class
+from telegram_errors import is_flood
+
+
+# Границы корзин гистограммы задержек, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Высокоуровневые методы клиента, которые учитываются как вызовы API
+COROUTINE_METHODS = ('start', 'connect', 'get_me', 'get_entity', 'send_message', 'send_file')
+ITERATOR_METHODS = ('iter_dialogs', 'iter_participants')
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как histogram в Prometheus)"""
+
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self) -> List[int]:
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля по корзинам (линейная интерполяция внутри корзины, не больше максимума)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        seen = 0
+        for i, count in enumerate(self.counts):
+            upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+            if count and seen + count >= rank:
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = upper
+        return self.max
+
+
+class RequestStats:
+    """Статистика по одному типу запроса"""
+
+    __slots__ = ('histogram', 'outcomes', 'flood_waits', 'flood_wait_seconds', 'retries')
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.outcomes: Dict[str, int] = {}
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0
+        self.retries = 0
+
+    def record(self, latency: float, outcome: str, flood_seconds: int, retry: bool):
+        self.histogram.observe(latency)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if flood_seconds:
+            self.flood_waits += 1
+            self.flood_wait_seconds += flood_seconds
+        if retry:
+            self.retries += 1
+
+    def summary(self) -> Dict:
+        histogram = self.histogram
+        p50 = histogram.quantile(0.5)
+        p95 = histogram.quantile(0.95)
+        return {
+            'count': histogram.count,
+            'errors': histogram.count - self.outcomes.get('ok', 0),
+            'outcomes': dict(self.outcomes),
+            'total_s': round(histogram.sum, 3),
+            'avg_ms': round(histogram.sum / histogram.count * 1000, 1) if histogram.count else None,
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'flood_waits': self.flood_waits,
+            'flood_wait_seconds': self.flood_wait_seconds,
+            'retries': self.retries
+        }
+
+
+def classify_outcome(error: Optional[BaseException]) -> str:
+    """Результат вызова для метрик: ok / flood_wait / rpc_error / error"""
+    if error is None:
+        return 'ok'
+    if is_flood(error):
+        return 'flood_wait'
+    if isinstance(error, RPCError):
+        return 'rpc_error'
+    return 'error'
+
+
+class MetricsRegistry:
+    """Хранилище метрик: общие по типам запросов и по отдельным задачам"""
+
+    def __init__(self, max_jobs: int = 200):
+        """
+        Args:
+            max_jobs: Сколько последних задач хранить (старые вытесняются)
+        """
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._totals: Dict[str, RequestStats] = {}
+        self._jobs: OrderedDict = OrderedDict()  # {job_id: {request: RequestStats}}
+
+    def record(self, request: str, latency: float, error: BaseException = None,
+               job_id: str = None, retry: bool = False):
+        outcome = classify_outcome(error)
+        flood_seconds = getattr(error, 'seconds', 0) if outcome == 'flood_wait' else 0
+        with self._lock:
+            self._totals.setdefault(request, RequestStats()).record(latency, outcome, flood_seconds, retry)
+            if job_id:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    job = self._jobs[job_id] = {}
+                    while len(self._jobs) > self.max_jobs:
+                        self._jobs.popitem(last=False)
+                job.setdefault(request, RequestStats()).record(latency, outcome, flood_seconds, retry)
+
+    def job_summary(self, job_id: str) -> Optional[Dict]:
+        """Сводка по вызовам API одной задачи (None, если вызовов не было)"""
+        if not job_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            requests = {name: stats.summary() for name, stats in job.items()}
+        return {
+            'requests': requests,
+            'total_calls': sum(item['count'] for item in requests.values()),
+            'total_api_time_s': round(sum(item['total_s'] for item in requests.values()), 3),
+            'flood_wait_seconds': sum(item['flood_wait_seconds'] for item in requests.values())
+        }
+
+    def average_latency(self, request: str) -> Optional[float]:
+        """Средняя задержка запроса по всем задачам, секунды (None - вызовов не было)"""
+        with self._lock:
+            stats = self._totals.get(request)
+            if stats is None or not stats.histogram.count:
+                return None
+            return stats.histogram.sum / stats.histogram.count
+
+    def prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = [
+            '# HELP telegram_api_request_duration_seconds Latency of Telegram API calls',
+            '# TYPE telegram_api_request_duration_seconds histogram'
+        ]
+        with self._lock:
+            totals = sorted(self._totals.items())
+            for name, stats in totals:
+                cumulative = stats.histogram.cumulative()
+                for bound, count in zip(BUCKETS, cumulative):
+                    lines.append(f'telegram_api_request_duration_seconds_bucket{{request="{name}",le="{bound}"}} {count}')
+                lines.append(f'telegram_api_request_duration_seconds_bucket{{request="{name}",le="+Inf"}} {cumulative[-1]}')
+                lines.append(f'telegram_api_request_duration_seconds_sum{{request="{name}"}} {stats.histogram.sum:.6f}')
+                lines.append(f'telegram_api_request_duration_seconds_count{{request="{name}"}} {stats.histogram.count}')
+
+            lines += [
+                '# HELP telegram_api_requests_total Telegram API calls by outcome',
+                '# TYPE telegram_api_requests_total counter'
+            ]
+            for name, stats in totals:
+                for outcome, count in sorted(stats.outcomes.items()):
+                    lines.append(f'telegram_api_requests_total{{request="{name}",outcome="{outcome}"}} {count}')
+
+            lines += [
+                '# HELP telegram_api_flood_wait_seconds_total Seconds of FloodWait imposed by Telegram',
+                '# TYPE telegram_api_flood_wait_seconds_total counter'
+            ]
+            for name, stats in totals:
+                lines.append(f'telegram_api_flood_wait_seconds_total{{request="{name}"}} {stats.flood_wait_seconds}')
+
+            lines += [
+                '# HELP telegram_api_retries_total Calls repeating a previously failed call',
+                '# TYPE telegram_api_retries_total counter'
+            ]
+            for name, stats in totals:
+                lines.append(f'telegram_api_retries_total{{request="{name}"}} {stats.retries}')
+        return '\n'.join(lines) + '\n'
+
+
+# Общий реестр процесса
+registry = MetricsRegistry()
+
+
+def _request_key(name: str, args: tuple, kwargs: Dict) -> tuple:
+    """Ключ вызова для определения повторов: тип запроса + цель"""
+    target = args[0] if args else None
+    if target is not None and not isinstance(target, (str, int)):
+        target = (
+            getattr(target, 'channel', None) or getattr(target, 'chat_id', None)
+            or getattr(target, 'q', None) or getattr(target, 'id', None) or target
+        )
+        target = getattr(target, 'id', target)
+    try:
+        hash(target)
+    except TypeError:
+        target = id(target)
+    return name, target
+
+
+class InstrumentedClient:
+    """
+    Обертка клиента Telegram, записывающая каждый вызов в MetricsRegistry
+
+    Все остальные атрибуты проксируются в исходный клиент без изменений.
+    Повтором считается вызов, совпадающий (тип запроса и цель) с предыдущим
+    неудачным вызовом. Если передан budget (TimeBudget), время вызовов
+    учитывается в нем как сетевое. Если передан governor (RateGovernor), каждый
+    вызов сначала ждет его разрешения, а результат сообщается ему. Интервалы
+    самой задачи (pace) действуют только на ее вызовы, не на общий регулятор.
+
+    Клиент создается с flood_sleep_threshold = 0, поэтому короткий FloodWait
+    (не дольше SHORT_FLOOD_WAIT) повторяется здесь: пауза выдерживается через
+    регулятор и учитывается как server_wait. Перебор iter_* после FloodWait
+    начинается заново, уже отданные элементы пропускаются.
+    """
+
+    def __init__(self, client, registry: MetricsRegistry = registry, job_id: str = None, budget=None,
+                 governor=None):
+        self._client = client
+        self._registry = registry
+        self.job_id = job_id
+        self.budget = budget
+        self.governor = governor
+        self._pacing: Dict[str, TokenBucket] = {}  # Интервалы задачи по классам запросов
+        self._last_failed = None
+
+    def pace(self, request_cls: str, interval: float):
+        """Минимальный интервал между запросами класса в этой задаче (например, задержка поиска)"""
+        if interval > 0:
+            self._pacing[request_cls] = TokenBucket(interval)
+        else:
+            self._pacing.pop(request_cls, None)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in COROUTINE_METHODS:
+            return self._wrap_coroutine(name, attr)
+        if name in ITERATOR_METHODS:
+            return self._wrap_iterator(name, attr)
+        return attr
+
+    async def _throttle(self, name: str, target=None):
+        """Дождаться разрешения регулятора частоты и интервала задачи"""
+        wait, kind = 0.0, 'delay'
+        if self.governor is not None:
+            wait, kind = self.governor.acquire(name, target)
+        bucket = self._pacing.get(request_class(name, target))
+        if bucket is not None:
+            own_wait = bucket.reserve(time.monotonic())
+            if own_wait > wait:
+                wait, kind = own_wait, 'delay'
+        if wait > 0:
+            if self.budget is not None:
+                await self.budget.sleep(wait, kind)
+            else:
+                await asyncio.sleep(wait)
+
+    async def _retry_flood(self, error: BaseException, attempt: int) -> bool:
+        """Повторять ли вызов после ошибки (пауза выдерживается перед повтором в _throttle)"""
+        if attempt >= SHORT_FLOOD_RETRIES or not is_flood(error) or error.seconds > SHORT_FLOOD_WAIT:
+            return False
+        if self.governor is None:
+            # Без регулятора паузу некому запомнить - ждем сами
+            if self.budget is not None:
+                await self.budget.sleep(error.seconds, 'server_wait')
+            else:
+                await asyncio.sleep(error.seconds)
+        return True
+
+    def _finish(self, name: str, key: tuple, started: float, error: BaseException = None, target=None):
+        retry = self._last_failed == key
+        self._last_failed = key if error is not None else None
+        latency = time.perf_counter() - started
+        self._registry.record(name, latency, error, self.job_id, retry)
+        if self.budget is not None:
+            self.budget.add('network', latency)
+        if self.governor is not None:
+            self.governor.report(name, error, target)
+
+    async def __call__(self, request, *args, **kwargs):
+        name = type(request).__name__
+        key = _request_key(name, (request,), kwargs)
+        for attempt in itertools.count():
+            await self._throttle(name)
+            started = time.perf_counter()
+            try:
+                result = await self._client(request, *args, **kwargs)
+            except BaseException as e:
+                self._finish(name, key, started, e)
+                if await self._retry_flood(e, attempt):
+                    continue
+                raise
+            self._finish(name, key, started)
+            return result
+
+    def _wrap_coroutine(self, name, method):
+        async def wrapper(*args, **kwargs):
+            key = _request_key(name, args, kwargs)
+            target = args[0] if args else None
+            for attempt in itertools.count():
+                await self._throttle(name, target)
+                started = time.perf_counter()
+                try:
+                    result = await method(*args, **kwargs)
+                except BaseException as e:
+                    self._finish(name, key, started, e, target)
+                    if await self._retry_flood(e, attempt):
+                        continue
+                    raise
+                self._finish(name, key, started, target=target)
+                return result
+        return wrapper
+
+    def _wrap_iterator(self, name, method):
+        async def wrapper(*args, **kwargs):
+            # Учитывается только время ожидания следующего элемента, не обработка у вызывающего
+            key = _request_key(name, args, kwargs)
+            delivered = 0  # Сколько элементов уже получил вызывающий (при повторе они пропускаются)
+            for attempt in itertools.count():
+                await self._throttle(name)
+                waited = 0.0
+                skip = delivered
+                iterator = method(*args, **kwargs).__aiter__()
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            item = await iterator.__anext__()
+                        finally:
+                            waited += time.perf_counter() - started
+                        if skip:
+                            skip -= 1
+                            continue
+                        delivered += 1
+                        yield item
+                except StopAsyncIteration:
+                    self._finish(name, key, time.perf_counter() - waited)
+                    return
+                except GeneratorExit:
+                    # Вызывающий прекратил перебор досрочно - это не ошибка
+                    self._finish(name, key, time.perf_counter() - waited)
+                    raise
+                except BaseException as e:
+                    self._finish(name, key, time.perf_counter() - waited, e)
+                    if await self._retry_flood(e, attempt):
+                        continue
+                    raise
+        return wrapper
@@ -3,34 +3,45 @@ Flask веб-приложение для Telegram Searcher
 Графический интерфейс для управления поиском групп и каналов
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, session
-from flask_session import Session
+from flask import Flask, render_template, request, jsonify, send_file, session, Response
 import os
 import json
 import asyncio
 import threading
 from datetime import datetime
 from pathlib import Path
-import importlib.util
 from typing import List, Dict
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill
 
 # Импорт основного класса поисковика
 from telegram_searcher import TelegramSearcher
+from config_store import ConfigStore
+from job_scheduler import JobScheduler
+from results_index import ResultsIndex
+from query_matrix import QueryMatrix
+from time_budget import budget_snapshot
+from telegram_errors import ErrorKind, classify
+from rate_governor import FloodPause
+import session_backend
+import api_metrics
+import rate_governor
+import job_profiler
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.urandom(24)
-app.config['SESSION_TYPE'] = 'filesystem'
-app.config['SESSION_FILE_DIR'] = 'flask_session'
+# Серверные сессии: 'memory' (LRU с TTL), 'sqlite' или 'redis'
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'memory')
+app.config['SESSION_TTL'] = 7 * 24 * 3600
+app.config['SESSION_SQLITE_PATH'] = 'sessions.sqlite3'
+app.config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
 app.config['UPLOAD_FOLDER'] = 'results'
-Session(app)
+session_backend.init_app(app)
 
 # Глобальные переменные для хранения состояния
 search_tasks = {}  # {session_id: {'status': 'running'/'completed'/'error', 'results': {...}}}
-search_configs = {}  # {session_id: {'keywords': [], 'cities': [], 'delay': 5.0}}
 search_stop_flags = {}  # {session_id: threading.Event()} - флаги для остановки поиска
-config_file_lock = threading.Lock()  # Блокировка для безопасной записи в config.py
+config_store = ConfigStore('search_config.json')  # Ключевые слова, города и задержка
 
 # Переменные для проверки групп
 check_groups_tasks = {}  # {session_id: {'status': 'running'/'completed'/'error', 'progress': {...}}}
@@ -40,11 +51,29 @@ check_groups_stop_flags = {}  # {session_id: threading.Event()}
 process_pending_tasks = {}  # {session_id: {'status': 'running'/'completed'/'error', 'progress': {...}}}
 process_pending_stop_flags = {}  # {session_id: threading.Event()}
 
+# Все задачи используют один аккаунт Telegram, поэтому запускаются через общий планировщик:
+# ограниченное число одновременных задач и честная очередь между сессиями
+job_scheduler = JobScheduler(
+    ['search', 'check', 'pending', 'sending'],
+    max_concurrent=int(os.environ.get('TELEGRAM_MAX_CONCURRENT_JOBS', 2)),
+    per_session_limit=int(os.environ.get('TELEGRAM_JOBS_PER_SESSION', 1))
+)
+ACTIVE_STATUSES = ('queued', 'starting', 'running')
+
+# Схемы транслитерации для поисковых запросов (через запятую, см. transliteration.py)
+TRANSLIT_SCHEMES = tuple(
+    scheme.strip() for scheme in os.environ.get('TRANSLIT_SCHEMES', 'telegram').split(',') if scheme.strip()
+)
+
 # Создаем папку для результатов
 os.makedirs('results', exist_ok=True)
 os.makedirs('templates', exist_ok=True)
 os.makedirs('static', exist_ok=True)
 
+# Индекс строк из results/*.xlsx для постраничного API результатов
+results_index = ResultsIndex(os.path.join('results', 'results_index.sqlite3'), 'results')
+results_index.start()
+
 
 def get_session_id():
     """Получить или создать session ID"""
@@ -53,6 +82,67 @@ def get_session_id():
     return session['session_id']
 
 
+def get_api_credentials():
+    """
+    Получить API_ID и API_HASH из config.py
+
+    Returns:
+        Кортеж (api_id, api_hash)
+    """
+    import config as app_config
+    return app_config.API_ID, app_config.API_HASH
+
+
+def index_saved_results(job_id, saved_files):
+    """
+    Проиндексировать только что сохраненные файлы результатов
+    
+    Args:
+        job_id: Задача, создавшая файлы
+        saved_files: Список (путь, записи) в порядке строк файла
+    """
+    for path, records in saved_files:
+        if not records:
+            continue
+        try:
+            results_index.add_records(path, records, job_id=job_id)
+        except Exception as e:
+            app.logger.warning(f"⚠️ Не удалось проиндексировать {path}: {e}")
+
+
+def get_profile_mode(value):
+    """
+    Режим профилирования задачи из параметров запуска
+    
+    Returns:
+        'cprofile', 'sampling' или None (без профилирования)
+    
+    Raises:
+        ValueError: неизвестный режим
+    """
+    mode = (value or '').strip() or None
+    if mode is not None and mode not in job_profiler.MODES:
+        raise ValueError(f'Неизвестный режим профилирования: {mode} (доступны: {", ".join(job_profiler.MODES)})')
+    return mode
+
+
+def get_queue_position(task: Dict):
+    """Позиция задачи в очереди планировщика (None, если задача не в очереди)"""
+    if not task or task.get('status') != 'queued' or not task.get('job_id'):
+        return None
+    return job_scheduler.queue_position(task['job_id'])
+
+
+def cancel_queued_task(task: Dict) -> bool:
+    """Отменить задачу, которая еще ждет в очереди"""
+    if not task or task.get('status') != 'queued' or not task.get('job_id'):
+        return False
+    if job_scheduler.cancel(task['job_id']):
+        task['status'] = 'stopped'
+        return True
+    return False
+
+
 def parse_groups_from_text(text: str) -> List[Dict]:
     """
     Парсинг списка групп из текста
@@ -100,189 +190,7 @@ def parse_groups_from_text(text: str) -> List[Dict]:
     return groups
 
 
-def save_config_to_file(keywords, cities, delay):
-    """Сохранить конфигурацию в config.py"""
-    # Используем блокировку для предотвращения одновременных записей
-    with config_file_lock:
-        try:
-            import re
-            import time
-            config_path = 'config.py'
-            
-            # Небольшая задержка, чтобы избежать конфликтов при перезапуске Flask
-            time.sleep(0.1)
-            
-            # Читаем текущий config.py (пробуем несколько раз, если файл пустой)
-            content = None
-            file_not_found = False
-            for attempt in range(3):
-                try:
-                    with open(config_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    if content.strip() and 'KEYWORDS' in content:
-                        break
-                    elif attempt < 2:
-                        app.logger.warning(f"⚠️ Попытка {attempt + 1}: config.py пустой, ждем...")
-                        time.sleep(0.2)
-                except FileNotFoundError:
-                    file_not_found = True
-                    if attempt < 2:
-                        time.sleep(0.2)
-                    break
-            
-            # Если файл не существует или пустой, создаем базовую структуру
-            if file_not_found or not content or not content.strip() or 'KEYWORDS' not in content:
-                if file_not_found:
-                    app.logger.warning("⚠️ config.py не найден, создаем новый файл")
-                else:
-                    app.logger.warning("⚠️ config.py пустой или поврежден, восстанавливаем структуру")
-                
-                # Пытаемся сохранить API_ID и API_HASH из старого файла
-                api_id = '27375139'
-                api_hash = '66e1bc627b8dda02e2bb35ea44fde4cf'
-                if content:
-                    api_id_match = re.search(r'API_ID\s*=\s*(\d+)', content)
-                    api_hash_match = re.search(r'API_HASH\s*=\s*["\']([^"\']+)["\']', content)
-                    if api_id_match:
-                        api_id = api_id_match.group(1)
-                    if api_hash_match:
-                        api_hash = api_hash_match.group(1)
-                
-                # Создаем новую структуру
-                content = f'''"""
-Файл конфигурации
-"""
-
-# Получите эти данные на https://my.telegram.org
-API_ID = {api_id}
-API_HASH = "{api_hash}"
-
-# Ключевые слова для поиска
-KEYWORDS = [
-]
-
-# Города для комбинаций с ключевыми словами
-CITIES = [
-]
-
-# Максимальное количество результатов на одно ключевое слово
-LIMIT_PER_KEYWORD = 50
-
-# Использовать транслитерацию (русские -> английские буквы)
-USE_TRANSLITERATION = True
-
-# Использовать комбинации с городами
-USE_CITY_COMBINATIONS = True
-
-# Задержка между поисковыми запросами в секундах
-SEARCH_DELAY = 5.0
-'''
-            
-            # Формируем строку для KEYWORDS
-            keywords_str = 'KEYWORDS = [\n'
-            if keywords:
-                for kw in keywords:
-                    # Экранируем кавычки и обратные слеши
-                    kw_escaped = kw.replace("\\", "\\\\").replace("'", "\\'").replace('"', '\\"')
-                    keywords_str += f"    '{kw_escaped}',\n"
-            keywords_str += ']'
-            
-            # Формируем строку для CITIES
-            cities_str = 'CITIES = [\n'
-            if cities:
-                for city in cities:
-                    # Экранируем кавычки и обратные слеши
-                    city_escaped = city.replace("\\", "\\\\").replace('"', '\\"')
-                    cities_str += f'    "{city_escaped}",\n'
-            cities_str += ']'
-            
-            # Заменяем KEYWORDS - используем нежадный квантификатор для многострочных списков
-            # Паттерн ищет KEYWORDS = [ и все до первой закрывающей скобки ], включая переносы строк
-            keywords_pattern = r'KEYWORDS\s*=\s*\[.*?\]'
-            if re.search(keywords_pattern, content, flags=re.DOTALL):
-                content = re.sub(keywords_pattern, keywords_str, content, flags=re.DOTALL)
-                app.logger.info(f"✅ KEYWORDS заменен в config.py: {len(keywords)} слов")
-            else:
-                app.logger.warning("⚠️ Не удалось найти KEYWORDS в config.py для замены")
-            
-            # Заменяем CITIES - аналогично
-            cities_pattern = r'CITIES\s*=\s*\[.*?\]'
-            if re.search(cities_pattern, content, flags=re.DOTALL):
-                content = re.sub(cities_pattern, cities_str, content, flags=re.DOTALL)
-                app.logger.info(f"✅ CITIES заменен в config.py: {len(cities)} городов")
-            else:
-                app.logger.warning("⚠️ Не удалось найти CITIES в config.py для замены")
-            
-            # Заменяем SEARCH_DELAY
-            delay_pattern = r'SEARCH_DELAY\s*=\s*[\d.]+'
-            content = re.sub(delay_pattern, f'SEARCH_DELAY = {delay}', content)
-            
-            # Сохраняем файл
-            try:
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                # Принудительно сбрасываем буфер
-                import os
-                os.fsync(f.fileno()) if hasattr(f, 'fileno') else None
-            except Exception as e:
-                app.logger.error(f"❌ Ошибка записи в config.py: {e}")
-                return False
-            
-            # Проверяем, что сохранение прошло успешно (пробуем несколько раз)
-            for check_attempt in range(3):
-                try:
-                    time.sleep(0.05)  # Небольшая задержка для файловой системы
-                    with open(config_path, 'r', encoding='utf-8') as f:
-                        saved_content = f.read()
-                    
-                    if not saved_content.strip():
-                        if check_attempt < 2:
-                            app.logger.warning(f"⚠️ Проверка {check_attempt + 1}: файл пустой, повторяем...")
-                            continue
-                        else:
-                            app.logger.error("❌ Файл остался пустым после сохранения!")
-                            return False
-                    
-                    # Проверяем наличие KEYWORDS в файле
-                    if 'KEYWORDS' not in saved_content:
-                        app.logger.error("❌ KEYWORDS не найден в сохраненном файле!")
-                        return False
-                    
-                    # Проверяем наличие ключевых слов
-                    if keywords:
-                        found_count = 0
-                        for kw in keywords:
-                            # Ищем слово в файле (может быть с экранированием)
-                            kw_escaped = kw.replace("'", "\\'")
-                            if kw in saved_content or kw_escaped in saved_content:
-                                found_count += 1
-                        
-                        if found_count == 0:
-                            app.logger.error(f"❌ Ключевые слова не найдены в сохраненном файле! Ожидалось: {keywords}")
-                            return False
-                        elif found_count < len(keywords):
-                            app.logger.warning(f"⚠️ Найдено только {found_count} из {len(keywords)} ключевых слов")
-                    
-                    app.logger.info(f"✅ config.py успешно сохранен. KEYWORDS: {len(keywords)}, CITIES: {len(cities)}")
-                    return True
-                    
-                except Exception as e:
-                    if check_attempt < 2:
-                        app.logger.warning(f"⚠️ Ошибка проверки сохранения (попытка {check_attempt + 1}): {e}")
-                        time.sleep(0.1)
-                    else:
-                        app.logger.error(f"❌ Ошибка проверки сохранения: {e}")
-                        return False
-            
-            return False
-        except Exception as e:
-            app.logger.error(f"Ошибка сохранения config.py: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-
-
-def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
+def run_search_async(session_id, keywords, cities, delay, api_id, api_hash, profile=None, job_id=None):
     """Асинхронный запуск поиска в отдельном потоке"""
     try:
         app.logger.info(f"🚀 Запуск поиска: keywords={keywords}, cities={cities}, delay={delay}")
@@ -308,11 +216,12 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
         
         # Создаем экземпляр поисковика
         app.logger.info("📱 Создание экземпляра TelegramSearcher...")
-        searcher = TelegramSearcher(api_id, api_hash, search_delay=delay)
+        searcher = TelegramSearcher(api_id, api_hash, search_delay=delay, job_id=job_id)
+        search_tasks[session_id]['time_budget'] = searcher.budget
         
         # Генерируем поисковые запросы
         app.logger.info(f"🔍 Генерация поисковых запросов из {len(keywords)} ключевых слов и {len(cities) if cities else 0} городов...")
-        search_queries = TelegramSearcher.generate_search_queries(keywords, cities)
+        search_queries = TelegramSearcher.generate_search_queries(keywords, cities, TRANSLIT_SCHEMES)
         app.logger.info(f"✅ Сгенерировано {len(search_queries)} поисковых запросов")
         
         # Запускаем поиск используя оригинальный метод класса
@@ -338,7 +247,7 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
                         from telethon.tl.functions.contacts import SearchRequest
                         from telethon.tl.types import Channel, Chat
                         
-                        results = await searcher.client(SearchRequest(
+                        results = await searcher.request_with_retry(SearchRequest(
                             q=keyword,
                             limit=50
                         ))
@@ -394,23 +303,19 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
                         progress = (i + 1) / len(search_queries) * 100
                         found_total = len(all_groups) + len(all_channels)
                         search_tasks[session_id]['message'] = f'Поиск... {i+1}/{len(search_queries)} ({progress:.1f}%) | Найдено: {found_total}'
-                        
-                        # Задержка
-                        if delay > 0 and not stop_event.is_set():
-                            await asyncio.sleep(delay)
-                            
+                    
+                    except FloodPause as pause:
+                        # Долгая пауза FloodWait: остальные запросы завершились бы так же - останавливаем
+                        # поиск, найденное сохраняется как при остановке пользователем
+                        searcher.flood_pause = pause
+                        stop_event.set()
+                        break
                     except Exception as e:
-                        error_msg = str(e)
-                        # Обрабатываем flood wait
-                        if "wait of" in error_msg and "seconds" in error_msg:
-                            try:
-                                wait_seconds = int(error_msg.split("wait of")[1].split("seconds")[0].strip())
-                                wait_hours = wait_seconds / 3600
-                                if wait_seconds > 3600:
-                                    search_tasks[session_id]['message'] = f'⚠️ Flood wait: пропускаю "{keyword}" (ожидание ~{wait_hours:.1f}ч)'
-                                    continue
-                            except:
-                                pass
+                        error = classify(e)
+                        # Flood wait: повтор уже был, пропускаем запрос
+                        if error.kind is ErrorKind.FLOOD:
+                            search_tasks[session_id]['message'] = f'⚠️ Flood wait: пропускаю "{keyword}" (ожидание ~{error.retry_after / 60:.0f} мин)'
+                            continue
                         
                         # Логируем другие ошибки, но продолжаем
                         if not stop_event.is_set():
@@ -421,6 +326,7 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
                 
                 # Проверяем, был ли остановлен поиск
                 if stop_event.is_set():
+                    stopped_message = f'Поиск остановлен: {searcher.flood_pause}' if searcher.flood_pause else 'Поиск остановлен'
                     saved_results = searcher.current_results
                     if saved_results['groups'] or saved_results['channels']:
                         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -433,18 +339,24 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
                             groups_file,
                             channels_file
                         )
+                        index_saved_results(job_id, [
+                            (groups_file, saved_results['groups']),
+                            (channels_file, saved_results['channels'])
+                        ])
                         
                         search_tasks[session_id]['status'] = 'stopped'
-                        search_tasks[session_id]['message'] = f'Поиск остановлен. Найдено: {len(saved_results["groups"])} групп, {len(saved_results["channels"])} каналов'
+                        search_tasks[session_id]['message'] = f'{stopped_message}. Найдено: {len(saved_results["groups"])} групп, {len(saved_results["channels"])} каналов'
                         search_tasks[session_id]['results'] = {
+                            'job_id': job_id,
                             'groups_file': groups_file,
                             'channels_file': channels_file,
                             'groups_count': len(saved_results['groups']),
-                            'channels_count': len(saved_results['channels'])
+                            'channels_count': len(saved_results['channels']),
+                            'time_budget': searcher.budget.snapshot()
                         }
                     else:
                         search_tasks[session_id]['status'] = 'stopped'
-                        search_tasks[session_id]['message'] = 'Поиск остановлен. Результаты не найдены'
+                        search_tasks[session_id]['message'] = f'{stopped_message}. Результаты не найдены'
                 else:
                     # Поиск завершен успешно
                     results = {'groups': all_groups, 'channels': all_channels}
@@ -459,14 +371,20 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
                         groups_file,
                         channels_file
                     )
+                    index_saved_results(job_id, [
+                        (groups_file, results['groups']),
+                        (channels_file, results['channels'])
+                    ])
                     
                     search_tasks[session_id]['status'] = 'completed'
                     search_tasks[session_id]['message'] = f'Поиск завершен! Найдено: {len(results["groups"])} групп, {len(results["channels"])} каналов'
                     search_tasks[session_id]['results'] = {
+                        'job_id': job_id,
                         'groups_file': groups_file,
                         'channels_file': channels_file,
                         'groups_count': len(results['groups']),
-                        'channels_count': len(results['channels'])
+                        'channels_count': len(results['channels']),
+                        'time_budget': searcher.budget.snapshot()
                     }
                 
                 await searcher.disconnect()
@@ -510,9 +428,14 @@ def run_search_async(session_id, keywords, cities, delay, api_id, api_hash):
                     pass
         
         app.logger.info("🔄 Запуск event loop...")
-        loop.run_until_complete(search())
+        with job_profiler.profile_job(job_id, profile, loop):
+            loop.run_until_complete(search())
         loop.close()
-        app.logger.info("✅ Event loop завершен")
+        searcher.budget.finish()
+        app.logger.info(f"✅ Event loop завершен. Время поиска: {searcher.budget.summary_line()}")
+        # Итоговая разбивка времени - в результатах задачи (до этого там снимок на момент сохранения файлов)
+        if search_tasks[session_id].get('results'):
+            search_tasks[session_id]['results']['time_budget'] = searcher.budget.snapshot()
         
     except Exception as e:
         error_msg = f'Ошибка запуска: {str(e)}'
@@ -528,30 +451,6 @@ def index():
     """Главная страница"""
     session_id = get_session_id()
     
-    # Загружаем данные из config.py
-    try:
-        import config as app_config
-        keywords = getattr(app_config, 'KEYWORDS', [])
-        cities = getattr(app_config, 'CITIES', [])
-        delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-    except:
-        keywords = []
-        cities = []
-        delay = 5.0
-    
-    # Инициализируем конфигурацию для сессии из config.py
-    if session_id not in search_configs:
-        search_configs[session_id] = {
-            'keywords': keywords,
-            'cities': cities,
-            'delay': delay
-        }
-    else:
-        # Обновляем из config.py если там есть изменения
-        search_configs[session_id]['keywords'] = keywords
-        search_configs[session_id]['cities'] = cities
-        search_configs[session_id]['delay'] = delay
-    
     # Инициализируем задачу поиска
     if session_id not in search_tasks:
         search_tasks[session_id] = {
@@ -560,7 +459,7 @@ def index():
             'results': None
         }
     
-    config = search_configs[session_id]
+    config = config_store.get()
     return render_template('index.html', 
                          keywords=config['keywords'],
                          cities=config['cities'],
@@ -572,62 +471,20 @@ def send_messages_page():
     return render_template('send_messages.html')
 
 
+
 @app.route('/api/add_keyword', methods=['POST'])
 def add_keyword():
     """Добавить ключевое слово"""
-    session_id = get_session_id()
     data = request.json
     keyword = data.get('keyword', '').strip()
     
-    app.logger.info(f"➕ Добавление ключевого слова: '{keyword}' для сессии {session_id}")
-    
     if not keyword:
         return jsonify({'success': False, 'message': 'Ключевое слово не может быть пустым'})
     
-    # Если сессия не найдена, загружаем данные из config.py
-    if session_id not in search_configs:
-        app.logger.info(f"📝 Сессия не найдена, загружаем данные из config.py")
-        try:
-            import config as app_config
-            keywords = getattr(app_config, 'KEYWORDS', [])
-            cities = getattr(app_config, 'CITIES', [])
-            delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-            search_configs[session_id] = {
-                'keywords': keywords.copy(),
-                'cities': cities.copy(),
-                'delay': delay
-            }
-            app.logger.info(f"✅ Данные загружены из config.py: {len(keywords)} ключевых слов, {len(cities)} городов")
-        except Exception as e:
-            app.logger.error(f"❌ Ошибка загрузки из config.py: {e}")
-            search_configs[session_id] = {'keywords': [], 'cities': [], 'delay': 5.0}
-    
-    if keyword not in search_configs[session_id]['keywords']:
-        search_configs[session_id]['keywords'].append(keyword)
-        app.logger.info(f"✅ Ключевое слово добавлено. Всего: {len(search_configs[session_id]['keywords'])}")
-        app.logger.info(f"📋 Текущие ключевые слова: {search_configs[session_id]['keywords']}")
-        
-        # Сохраняем в config.py
-        save_result = save_config_to_file(
-            search_configs[session_id]['keywords'],
-            search_configs[session_id]['cities'],
-            search_configs[session_id]['delay']
-        )
-        if save_result:
-            app.logger.info("💾 config.py успешно обновлен")
-            # Проверяем, что данные действительно сохранились
-            try:
-                import config as test_config
-                saved_keywords = getattr(test_config, 'KEYWORDS', [])
-                app.logger.info(f"🔍 Проверка сохранения: в config.py найдено {len(saved_keywords)} ключевых слов")
-                if len(saved_keywords) != len(search_configs[session_id]['keywords']):
-                    app.logger.warning(f"⚠️ Несоответствие: в памяти {len(search_configs[session_id]['keywords'])}, в файле {len(saved_keywords)}")
-            except Exception as e:
-                app.logger.error(f"❌ Ошибка при проверке сохранения: {e}")
-        else:
-            app.logger.error("❌ Не удалось сохранить в config.py!")
-        
-        return jsonify({'success': True, 'keywords': search_configs[session_id]['keywords']})
+    if config_store.add('keywords', keyword):
+        keywords = config_store.get()['keywords']
+        app.logger.info(f"➕ Ключевое слово '{keyword}' добавлено. Всего: {len(keywords)}")
+        return jsonify({'success': True, 'keywords': keywords})
     else:
         app.logger.warning(f"⚠️ Ключевое слово '{keyword}' уже существует")
         return jsonify({'success': False, 'message': 'Ключевое слово уже добавлено'})
@@ -636,47 +493,13 @@ def add_keyword():
 @app.route('/api/remove_keyword', methods=['POST'])
 def remove_keyword():
     """Удалить ключевое слово"""
-    session_id = get_session_id()
     data = request.json
     keyword = data.get('keyword', '').strip()
     
-    app.logger.info(f"➖ Удаление ключевого слова: '{keyword}' для сессии {session_id}")
-    
-    # Если сессия не найдена, загружаем данные из config.py
-    if session_id not in search_configs:
-        app.logger.info(f"📝 Сессия не найдена, загружаем данные из config.py")
-        try:
-            import config as app_config
-            keywords = getattr(app_config, 'KEYWORDS', [])
-            cities = getattr(app_config, 'CITIES', [])
-            delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-            search_configs[session_id] = {
-                'keywords': keywords.copy(),
-                'cities': cities.copy(),
-                'delay': delay
-            }
-            app.logger.info(f"✅ Данные загружены из config.py: {len(keywords)} ключевых слов, {len(cities)} городов")
-        except Exception as e:
-            app.logger.error(f"❌ Ошибка загрузки из config.py: {e}")
-            search_configs[session_id] = {'keywords': [], 'cities': [], 'delay': 5.0}
-    
-    app.logger.info(f"📋 Текущие ключевые слова: {search_configs[session_id]['keywords']}")
-    
-    if keyword in search_configs[session_id]['keywords']:
-        search_configs[session_id]['keywords'].remove(keyword)
-        app.logger.info(f"✅ Ключевое слово удалено. Осталось: {len(search_configs[session_id]['keywords'])}")
-        
-        # Сохраняем в config.py
-        if save_config_to_file(
-            search_configs[session_id]['keywords'],
-            search_configs[session_id]['cities'],
-            search_configs[session_id]['delay']
-        ):
-            app.logger.info("💾 config.py обновлен")
-        else:
-            app.logger.warning("⚠️ Не удалось сохранить в config.py")
-        
-        return jsonify({'success': True, 'keywords': search_configs[session_id]['keywords']})
+    if config_store.remove('keywords', keyword):
+        keywords = config_store.get()['keywords']
+        app.logger.info(f"➖ Ключевое слово '{keyword}' удалено. Осталось: {len(keywords)}")
+        return jsonify({'success': True, 'keywords': keywords})
     else:
         app.logger.warning(f"⚠️ Ключевое слово '{keyword}' не найдено в списке")
         return jsonify({'success': False, 'message': f'Ключевое слово "{keyword}" не найдено'})
@@ -685,51 +508,16 @@ def remove_keyword():
 @app.route('/api/add_city', methods=['POST'])
 def add_city():
     """Добавить город"""
-    session_id = get_session_id()
     data = request.json
     city = data.get('city', '').strip()
     
-    app.logger.info(f"➕ Добавление города: '{city}' для сессии {session_id}")
-    
     if not city:
         return jsonify({'success': False, 'message': 'Город не может быть пустым'})
     
-    # Если сессия не найдена, загружаем данные из config.py
-    if session_id not in search_configs:
-        app.logger.info(f"📝 Сессия не найдена, загружаем данные из config.py")
-        try:
-            import config as app_config
-            keywords = getattr(app_config, 'KEYWORDS', [])
-            cities = getattr(app_config, 'CITIES', [])
-            delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-            search_configs[session_id] = {
-                'keywords': keywords.copy(),
-                'cities': cities.copy(),
-                'delay': delay
-            }
-            app.logger.info(f"✅ Данные загружены из config.py: {len(keywords)} ключевых слов, {len(cities)} городов")
-        except Exception as e:
-            app.logger.error(f"❌ Ошибка загрузки из config.py: {e}")
-            search_configs[session_id] = {'keywords': [], 'cities': [], 'delay': 5.0}
-    
-    if city not in search_configs[session_id]['cities']:
-        search_configs[session_id]['cities'].append(city)
-        app.logger.info(f"✅ Город добавлен. Всего: {len(search_configs[session_id]['cities'])}")
-        app.logger.info(f"📋 Текущие города: {search_configs[session_id]['cities']}")
-        app.logger.info(f"📋 Текущие ключевые слова: {search_configs[session_id]['keywords']}")
-        
-        # Сохраняем в config.py (с текущими ключевыми словами!)
-        save_result = save_config_to_file(
-            search_configs[session_id]['keywords'],
-            search_configs[session_id]['cities'],
-            search_configs[session_id]['delay']
-        )
-        if save_result:
-            app.logger.info("💾 config.py успешно обновлен")
-        else:
-            app.logger.error("❌ Не удалось сохранить в config.py!")
-        
-        return jsonify({'success': True, 'cities': search_configs[session_id]['cities']})
+    if config_store.add('cities', city):
+        cities = config_store.get()['cities']
+        app.logger.info(f"➕ Город '{city}' добавлен. Всего: {len(cities)}")
+        return jsonify({'success': True, 'cities': cities})
     else:
         app.logger.warning(f"⚠️ Город '{city}' уже существует")
         return jsonify({'success': False, 'message': 'Город уже добавлен'})
@@ -738,164 +526,118 @@ def add_city():
 @app.route('/api/remove_city', methods=['POST'])
 def remove_city():
     """Удалить город"""
-    session_id = get_session_id()
     data = request.json
     city = data.get('city', '').strip()
     
-    app.logger.info(f"➖ Удаление города: '{city}' для сессии {session_id}")
-    
-    # Если сессия не найдена, загружаем данные из config.py
-    if session_id not in search_configs:
-        app.logger.info(f"📝 Сессия не найдена, загружаем данные из config.py")
-        try:
-            import config as app_config
-            keywords = getattr(app_config, 'KEYWORDS', [])
-            cities = getattr(app_config, 'CITIES', [])
-            delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-            search_configs[session_id] = {
-                'keywords': keywords.copy(),
-                'cities': cities.copy(),
-                'delay': delay
-            }
-            app.logger.info(f"✅ Данные загружены из config.py: {len(keywords)} ключевых слов, {len(cities)} городов")
-        except Exception as e:
-            app.logger.error(f"❌ Ошибка загрузки из config.py: {e}")
-            search_configs[session_id] = {'keywords': [], 'cities': [], 'delay': 5.0}
-    
-    app.logger.info(f"📋 Текущие города: {search_configs[session_id]['cities']}")
-    
-    if city in search_configs[session_id]['cities']:
-        search_configs[session_id]['cities'].remove(city)
-        app.logger.info(f"✅ Город удален. Осталось: {len(search_configs[session_id]['cities'])}")
-        
-        # Сохраняем в config.py
-        if save_config_to_file(
-            search_configs[session_id]['keywords'],
-            search_configs[session_id]['cities'],
-            search_configs[session_id]['delay']
-        ):
-            app.logger.info("💾 config.py обновлен")
-        else:
-            app.logger.warning("⚠️ Не удалось сохранить в config.py")
-        
-        return jsonify({'success': True, 'cities': search_configs[session_id]['cities']})
+    if config_store.remove('cities', city):
+        cities = config_store.get()['cities']
+        app.logger.info(f"➖ Город '{city}' удален. Осталось: {len(cities)}")
+        return jsonify({'success': True, 'cities': cities})
     else:
         app.logger.warning(f"⚠️ Город '{city}' не найден в списке")
         return jsonify({'success': False, 'message': f'Город "{city}" не найден'})
 
 
+@app.route('/api/batch_update_lists', methods=['POST'])
+def batch_update_lists():
+    """
+    Пакетное изменение ключевых слов и городов за один запрос
+    
+    Тело запроса: {"keywords": {"add": [...], "remove": [...]}, "cities": {"add": [...], "remove": [...]}}
+    """
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        result = config_store.apply_batch(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    app.logger.info(f"📝 Пакетное изменение: добавлено {result['added']}, удалено {result['removed']}")
+    
+    return jsonify({'success': True, **result})
+
+
 @app.route('/api/set_delay', methods=['POST'])
 def set_delay():
     """Установить задержку"""
-    session_id = get_session_id()
     data = request.json
     delay = float(data.get('delay', 5.0))
     
-    app.logger.info(f"⏱️ Установка задержки: {delay} секунд для сессии {session_id}")
-    
     if delay < 0:
         return jsonify({'success': False, 'message': 'Задержка не может быть отрицательной'})
     
-    # Если сессия не найдена, загружаем данные из config.py
-    if session_id not in search_configs:
-        app.logger.info(f"📝 Сессия не найдена, загружаем данные из config.py")
-        try:
-            import config as app_config
-            keywords = getattr(app_config, 'KEYWORDS', [])
-            cities = getattr(app_config, 'CITIES', [])
-            current_delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-            search_configs[session_id] = {
-                'keywords': keywords.copy(),
-                'cities': cities.copy(),
-                'delay': current_delay
-            }
-            app.logger.info(f"✅ Данные загружены из config.py: {len(keywords)} ключевых слов, {len(cities)} городов")
-        except Exception as e:
-            app.logger.error(f"❌ Ошибка загрузки из config.py: {e}")
-            search_configs[session_id] = {'keywords': [], 'cities': [], 'delay': 5.0}
-    
-    search_configs[session_id]['delay'] = delay
-    app.logger.info(f"📋 Текущие ключевые слова: {search_configs[session_id]['keywords']}")
-    app.logger.info(f"📋 Текущие города: {search_configs[session_id]['cities']}")
-    
-    # Сохраняем в config.py (с текущими ключевыми словами и городами!)
-    save_result = save_config_to_file(
-        search_configs[session_id]['keywords'],
-        search_configs[session_id]['cities'],
-        delay
-    )
-    if save_result:
-        app.logger.info("💾 config.py успешно обновлен")
-    else:
-        app.logger.error("❌ Не удалось сохранить в config.py!")
+    config_store.update(delay=delay)
+    app.logger.info(f"⏱️ Установлена задержка: {delay} секунд")
     
     return jsonify({'success': True, 'delay': delay})
 
 
+@app.route('/api/search/estimate', methods=['GET'])
+def search_estimate():
+    """Количество поисковых запросов и примерная длительность поиска до запуска"""
+    config = config_store.get()
+    matrix = QueryMatrix(config['keywords'], config['cities'], TRANSLIT_SCHEMES)
+    queries = matrix.count()
+    latency = api_metrics.registry.average_latency('SearchRequest')
+    # Запросы идут не чаще раза в delay секунд и не быстрее, чем отвечает Telegram
+    per_query = max(config['delay'], latency or 0.0)
+    return jsonify({
+        'queries': queries,
+        'keyword_forms': len(matrix.keyword_forms),
+        'city_forms': len(matrix.city_forms),
+        'delay': config['delay'],
+        'avg_latency_s': round(latency, 3) if latency is not None else None,
+        'estimated_seconds': round(queries * per_query, 1)
+    })
+
+
 @app.route('/api/start_search', methods=['POST'])
 def start_search():
     """Запустить поиск"""
     session_id = get_session_id()
     app.logger.info(f"🔍 Запрос на запуск поиска от сессии {session_id}")
     
-    # Если сессия не найдена, загружаем данные из config.py
-    if session_id not in search_configs:
-        app.logger.info(f"📝 Сессия не найдена, загружаем данные из config.py")
-        try:
-            import config as app_config
-            keywords = getattr(app_config, 'KEYWORDS', [])
-            cities = getattr(app_config, 'CITIES', [])
-            delay = getattr(app_config, 'SEARCH_DELAY', 5.0)
-            search_configs[session_id] = {
-                'keywords': keywords.copy(),
-                'cities': cities.copy(),
-                'delay': delay
-            }
-            app.logger.info(f"✅ Данные загружены из config.py: {len(keywords)} ключевых слов, {len(cities)} городов")
-        except Exception as e:
-            app.logger.error(f"❌ Ошибка загрузки из config.py: {e}")
-            search_configs[session_id] = {'keywords': [], 'cities': [], 'delay': 5.0}
+    config = config_store.get()
+    app.logger.info(f"📋 Конфигурация: keywords={len(config['keywords'])}, cities={len(config['cities'])}, delay={config['delay']}")
     
-    config = search_configs[session_id]
-    app.logger.info(f"📋 Конфигурация: keywords={len(config.get('keywords', []))}, cities={len(config.get('cities', []))}, delay={config.get('delay', 5.0)}")
+    try:
+        profile = get_profile_mode((request.get_json(silent=True) or {}).get('profile'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
     
-    if not config.get('keywords'):
+    if not config['keywords']:
         app.logger.warning("⚠️ Ключевые слова не указаны")
         return jsonify({'success': False, 'message': 'Добавьте хотя бы одно ключевое слово'})
     
     # Проверяем API credentials
     try:
-        import config as app_config
-        api_id = app_config.API_ID
-        api_hash = app_config.API_HASH
-        app.logger.info("✅ API credentials загружены")
+        api_id, api_hash = get_api_credentials()
     except Exception as e:
         app.logger.error(f"❌ Ошибка загрузки API credentials: {e}")
         return jsonify({'success': False, 'message': 'API_ID и API_HASH не настроены в config.py'})
     
     # Проверяем, не запущен ли уже поиск
-    if session_id in search_tasks and search_tasks[session_id]['status'] == 'running':
+    if session_id in search_tasks and search_tasks[session_id]['status'] in ACTIVE_STATUSES:
         app.logger.warning("⚠️ Поиск уже запущен")
         return jsonify({'success': False, 'message': 'Поиск уже запущен'})
     
-    # Инициализируем задачу
+    # Инициализируем задачу: job_id известен до постановки в очередь
+    job_id = job_scheduler.new_job_id('search')
     search_tasks[session_id] = {
-        'status': 'starting',
-        'message': 'Запуск поиска...',
-        'results': None
+        'status': 'queued',
+        'message': 'В очереди...',
+        'results': None,
+        'job_id': job_id
     }
     
-    # Запускаем поиск в отдельном потоке
-    app.logger.info("🚀 Создание потока для поиска...")
-    thread = threading.Thread(
-        target=run_search_async,
-        args=(session_id, config['keywords'], config.get('cities', []), config.get('delay', 5.0), api_id, api_hash)
+    # Ставим поиск в очередь планировщика
+    job = job_scheduler.submit(
+        'search', session_id, run_search_async,
+        session_id, config['keywords'], config['cities'], config['delay'], api_id, api_hash, profile, job_id,
+        job_id=job_id
     )
-    thread.daemon = True
-    thread.start()
-    app.logger.info("✅ Поток запущен")
+    app.logger.info(f"✅ Поиск поставлен в очередь: {job.job_id}")
     
-    return jsonify({'success': True, 'message': 'Поиск запущен'})
+    return jsonify({'success': True, 'message': 'Поиск запущен', 'queue_position': job_scheduler.queue_position(job.job_id)})
 
 
 @app.route('/api/stop_search', methods=['POST'])
@@ -903,6 +645,10 @@ def stop_search():
     """Остановить поиск"""
     session_id = get_session_id()
     
+    if cancel_queued_task(search_tasks.get(session_id)):
+        search_tasks[session_id]['message'] = 'Поиск отменен'
+        return jsonify({'success': True, 'message': 'Поиск удален из очереди'})
+    
     if session_id in search_stop_flags:
         search_stop_flags[session_id].set()
         search_tasks[session_id]['message'] = 'Остановка поиска...'
@@ -924,13 +670,60 @@ def get_status():
         })
     
     task = search_tasks[session_id]
+    position = get_queue_position(task)
     return jsonify({
         'status': task['status'],
-        'message': task.get('message', ''),
-        'results': task.get('results')
+        'message': f'В очереди: позиция {position}' if position else task.get('message', ''),
+        'results': task.get('results'),
+        'queue_position': position,
+        'api_metrics': api_metrics.registry.job_summary(task.get('job_id')),
+        'time_budget': budget_snapshot(task.get('time_budget')),
+        'profile': job_profiler.status(task.get('job_id'))
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Метрики вызовов Telegram API и очереди задач в формате Prometheus"""
+    stats = job_scheduler.stats()
+    lines = [
+        '# HELP telegram_jobs_running Jobs currently running',
+        '# TYPE telegram_jobs_running gauge',
+        f"telegram_jobs_running {stats['running']}",
+        '# HELP telegram_jobs_queued Jobs waiting in the scheduler queue',
+        '# TYPE telegram_jobs_queued gauge'
+    ]
+    lines += [f'telegram_jobs_queued{{type="{job_type}"}} {count}' for job_type, count in stats['queued'].items()]
+    lines += [
+        '# HELP telegram_rate_interval_seconds Current interval between requests of a class',
+        '# TYPE telegram_rate_interval_seconds gauge'
+    ]
+    governors = rate_governor.all_governors()
+    snapshots = {account: governor.snapshot() for account, governor in governors.items()}
+    for account, snapshot in snapshots.items():
+        for request_cls, state in snapshot['classes'].items():
+            lines.append(f'telegram_rate_interval_seconds{{account="{account}",class="{request_cls}"}} {state["interval_s"]}')
+    lines += [
+        '# HELP telegram_rate_paused_seconds Remaining FloodWait pause of a request class for all jobs of an account',
+        '# TYPE telegram_rate_paused_seconds gauge'
+    ]
+    for account, snapshot in snapshots.items():
+        for request_cls, state in snapshot['classes'].items():
+            lines.append(f'telegram_rate_paused_seconds{{account="{account}",class="{request_cls}"}} {state["paused_for_s"]}')
+    body = api_metrics.registry.prometheus() + '\n'.join(lines) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/profile/tasks', methods=['GET'])
+def profile_tasks():
+    """Текущие стеки asyncio-задач профилируемой задачи (параметр job_id)"""
+    job_id = request.args.get('job_id', '').strip()
+    dump = job_profiler.task_dump(job_id)
+    if dump is None:
+        return jsonify({'error': 'Задача не профилируется'}), 404
+    return Response(dump + '\n', mimetype='text/plain; charset=utf-8')
+
+
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """Скачать файл результата"""
@@ -951,6 +744,54 @@ def download_file(filename):
         return jsonify({'error': 'Файл не найден'}), 404
 
 
+@app.route('/api/results', methods=['GET'])
+def get_results():
+    """
+    Постраничный просмотр результатов из индекса
+    
+    Параметры запроса: file, job_id, type (group/channel), min_members, max_members,
+    keyword, status, sort, order (asc/desc), page, per_page
+    """
+    args = request.args
+    filename = args.get('file', '').strip() or None
+    if filename and ('..' in filename or '/' in filename or '\\' in filename):
+        return jsonify({'error': 'Недопустимое имя файла'}), 400
+    
+    try:
+        min_members = args.get('min_members', type=int)
+        max_members = args.get('max_members', type=int)
+        page = args.get('page', 1, type=int)
+        per_page = args.get('per_page', 50, type=int)
+        
+        result = results_index.query(
+            file=filename,
+            job_id=args.get('job_id') or None,
+            entity_type=args.get('type') or None,
+            min_members=min_members,
+            max_members=max_members,
+            keyword=args.get('keyword', '').strip() or None,
+            status=args.get('status') or None,
+            sort=args.get('sort', 'row_num'),
+            order=args.get('order', 'asc'),
+            page=page,
+            per_page=per_page
+        )
+        return jsonify(result)
+    except Exception as e:
+        app.logger.error(f"❌ Ошибка запроса результатов: {e}", exc_info=True)
+        return jsonify({'error': f'Ошибка: {str(e)}'}), 500
+
+
+@app.route('/api/results/files', methods=['GET'])
+def get_results_files():
+    """Проиндексированные файлы результатов (можно отфильтровать по job_id)"""
+    try:
+        return jsonify({'files': results_index.files(request.args.get('job_id') or None)})
+    except Exception as e:
+        app.logger.error(f"❌ Ошибка чтения индекса результатов: {e}", exc_info=True)
+        return jsonify({'error': f'Ошибка: {str(e)}'}), 500
+
+
 @app.route('/api/get_files', methods=['GET'])
 def get_files():
     """Получить список доступных файлов результатов"""
@@ -974,14 +815,15 @@ def get_files():
     return jsonify({'files': files, 'file_names': file_names})
 
 
-def run_check_groups_async(session_id, filename, api_id, api_hash):
-    """Запуск проверки групп в отдельном потоке"""
+def run_check_groups_async(session_id, filename, api_id, api_hash, profile=None, job_id=None):
+    """Постановка проверки групп в очередь планировщика"""
     def run():
         try:
             check_groups_tasks[session_id] = {
                 'status': 'running',
                 'progress': {'current': 0, 'total': 0, 'message': 'Инициализация...'},
-                'result_file': None
+                'result_file': None,
+                'job_id': job_id
             }
             
             # Создаем новый event loop для этого потока
@@ -991,7 +833,8 @@ def run_check_groups_async(session_id, filename, api_id, api_hash):
             async def check_groups():
                 try:
                     # Инициализация клиента
-                    searcher = TelegramSearcher(api_id, api_hash, search_delay=2.0)
+                    searcher = TelegramSearcher(api_id, api_hash, search_delay=2.0, job_id=job_id)
+                    check_groups_tasks[session_id]['time_budget'] = searcher.budget
                     await searcher.connect()
                     
                     # Читаем группы из файла
@@ -1006,7 +849,9 @@ def run_check_groups_async(session_id, filename, api_id, api_hash):
                         check_groups_tasks[session_id] = {
                             'status': 'error',
                             'progress': {'current': 0, 'total': 0, 'message': 'Группы не найдены в файле'},
-                            'result_file': None
+                            'result_file': None,
+                            'job_id': job_id,
+                            'time_budget': check_groups_tasks[session_id].get('time_budget')
                         }
                         await searcher.disconnect()
                         return
@@ -1045,7 +890,19 @@ def run_check_groups_async(session_id, filename, api_id, api_hash):
                         app.logger.info(f"🔍 Проверка группы {i+1}/{len(groups)}: {group_title}")
                         
                         # Проверяем доступ
-                        result = await searcher.check_group_access(group, stop_event)
+                        try:
+                            result = await searcher.check_group_access(group, stop_event)
+                        except FloodPause as pause:
+                            # Долгая пауза FloodWait: непроверенные группы уходят в pending (их можно
+                            # обработать позже), а не отмечаются ошибкой одна за другой
+                            searcher.flood_pause = pause
+                            for unchecked in groups[i:]:
+                                unchecked['check_status'] = 'pending'
+                                unchecked['check_message'] = f'Не проверена: {pause}'
+                                unchecked['check_action'] = 'none'
+                                checked_groups.append(unchecked)
+                                pending_count += 1
+                            break
                         
                         group['check_status'] = result.get('status', 'error')
                         group['check_message'] = result.get('message', '')
@@ -1059,10 +916,6 @@ def run_check_groups_async(session_id, filename, api_id, api_hash):
                             pending_count += 1
                         else:
                             unavailable_count += 1
-                        
-                        # Задержка между проверками
-                        if i < len(groups) - 1:  # Не ждем после последней группы
-                            await asyncio.sleep(2.0)  # Задержка 2 секунды
                     
                     # Сохраняем результаты в два файла
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -1076,33 +929,51 @@ def run_check_groups_async(session_id, filename, api_id, api_hash):
                         ready_file, 
                         pending_file
                     )
+                    # Порядок строк в файлах: готовые; затем pending и остальные (см. save_check_results)
+                    ready_records = [g for g in checked_groups if g.get('check_status') == 'ready']
+                    index_saved_results(job_id, [
+                        (ready_file, ready_records),
+                        (pending_file,
+                         [g for g in checked_groups if g.get('check_status') == 'pending'] +
+                         [g for g in checked_groups if g.get('check_status') not in ('ready', 'pending')])
+                    ])
                     
+                    await searcher.disconnect()
+                    searcher.budget.finish()
                     check_groups_tasks[session_id] = {
-                        'status': 'completed',
+                        'status': 'stopped' if searcher.flood_pause else 'completed',
                         'progress': {
                             'current': len(checked_groups),
                             'total': len(groups),
-                            'message': 'Проверка завершена'
+                            'message': f'Проверка остановлена: {searcher.flood_pause}' if searcher.flood_pause else 'Проверка завершена'
                         },
                         'ready_file': ready_filename if saved_ready > 0 else None,
                         'pending_file': pending_filename if saved_pending > 0 else None,
                         'ready_count': ready_count,
                         'pending_count': pending_count,
-                        'unavailable_count': unavailable_count
+                        'unavailable_count': unavailable_count,
+                        'flood_pause': str(searcher.flood_pause) if searcher.flood_pause else None,
+                        'job_id': job_id,
+                        'time_budget': searcher.budget.snapshot()
                     }
                     
-                    await searcher.disconnect()
                     app.logger.info(f"✅ Проверка завершена. Готовых: {ready_count}, Требуют действий: {pending_count}, Недоступных: {unavailable_count}")
+                    app.logger.info(f"⏱️ Время проверки: {searcher.budget.summary_line()}")
+                    searcher.events.summary('check.summary', ready=ready_count, pending=pending_count,
+                                            unavailable=unavailable_count)
                     
                 except Exception as e:
                     app.logger.error(f"❌ Ошибка при проверке групп: {e}", exc_info=True)
                     check_groups_tasks[session_id] = {
                         'status': 'error',
                         'progress': {'current': 0, 'total': 0, 'message': f'Ошибка: {str(e)}'},
-                        'result_file': None
+                        'result_file': None,
+                        'job_id': job_id,
+                        'time_budget': check_groups_tasks[session_id].get('time_budget')
                     }
             
-            loop.run_until_complete(check_groups())
+            with job_profiler.profile_job(job_id, profile, loop):
+                loop.run_until_complete(check_groups())
             loop.close()
             
         except Exception as e:
@@ -1113,9 +984,7 @@ def run_check_groups_async(session_id, filename, api_id, api_hash):
                 'result_file': None
             }
     
-    thread = threading.Thread(target=run)
-    thread.daemon = True
-    thread.start()
+    return job_scheduler.submit('check', session_id, run, job_id=job_id)
 
 
 @app.route('/api/check_groups', methods=['POST'])
@@ -1130,28 +999,38 @@ def check_groups():
     if not filename:
         return jsonify({'success': False, 'message': 'Не указан файл'})
     
+    try:
+        profile = get_profile_mode(data.get('profile'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    
     # Проверяем API credentials
     try:
-        import config as app_config
-        api_id = app_config.API_ID
-        api_hash = app_config.API_HASH
+        api_id, api_hash = get_api_credentials()
     except Exception as e:
         app.logger.error(f"❌ Ошибка загрузки API credentials: {e}")
         return jsonify({'success': False, 'message': 'Ошибка загрузки API credentials'})
     
     # Проверяем, не запущена ли уже проверка
-    if session_id in check_groups_tasks and check_groups_tasks[session_id]['status'] == 'running':
+    if session_id in check_groups_tasks and check_groups_tasks[session_id]['status'] in ACTIVE_STATUSES:
         return jsonify({'success': False, 'message': 'Проверка уже запущена'})
     
     # Создаем флаг остановки
     check_groups_stop_flags[session_id] = threading.Event()
     
-    # Запускаем проверку в отдельном потоке
-    app.logger.info("🚀 Создание потока для проверки групп...")
-    run_check_groups_async(session_id, filename, api_id, api_hash)
-    app.logger.info("✅ Поток запущен")
+    job_id = job_scheduler.new_job_id('check')
+    check_groups_tasks[session_id] = {
+        'status': 'queued',
+        'progress': {'current': 0, 'total': 0, 'message': 'В очереди...'},
+        'result_file': None,
+        'job_id': job_id
+    }
+    
+    # Ставим проверку в очередь планировщика
+    job = run_check_groups_async(session_id, filename, api_id, api_hash, profile, job_id)
+    app.logger.info(f"✅ Проверка поставлена в очередь: {job.job_id}")
     
-    return jsonify({'success': True, 'message': 'Проверка запущена'})
+    return jsonify({'success': True, 'message': 'Проверка запущена', 'queue_position': job_scheduler.queue_position(job.job_id)})
 
 
 @app.route('/api/stop_check_groups', methods=['POST'])
@@ -1159,6 +1038,10 @@ def stop_check_groups():
     """Остановить проверку групп"""
     session_id = get_session_id()
     
+    if cancel_queued_task(check_groups_tasks.get(session_id)):
+        check_groups_tasks[session_id]['progress']['message'] = 'Удалено из очереди'
+        return jsonify({'success': True, 'message': 'Задача удалена из очереди'})
+    
     if session_id in check_groups_stop_flags:
         check_groups_stop_flags[session_id].set()
         if session_id in check_groups_tasks:
@@ -1184,34 +1067,43 @@ def check_groups_status():
     
     task = check_groups_tasks[session_id]
     progress = task.get('progress', {})
+    position = get_queue_position(task)
     
     response = {
         'status': task.get('status', 'idle'),
         'current': progress.get('current', 0),
         'total': progress.get('total', 0),
-        'message': progress.get('message', ''),
-        'current_group': progress.get('current_group', '')
+        'message': f'В очереди: позиция {position}' if position else progress.get('message', ''),
+        'current_group': progress.get('current_group', ''),
+        'queue_position': position,
+        'api_metrics': api_metrics.registry.job_summary(task.get('job_id')),
+        'time_budget': budget_snapshot(task.get('time_budget')),
+        'profile': job_profiler.status(task.get('job_id'))
     }
     
-    if task.get('status') == 'completed':
+    if task.get('status') == 'completed' or task.get('flood_pause'):
+        # Остановка из-за долгой паузы FloodWait: результаты обработанной части тоже сохранены
+        response['flood_pause'] = task.get('flood_pause')
         response['ready_file'] = task.get('ready_file')
         response['pending_file'] = task.get('pending_file')
         response['ready_count'] = task.get('ready_count', 0)
         response['pending_count'] = task.get('pending_count', 0)
         response['unavailable_count'] = task.get('unavailable_count', 0)
+        response['job_id'] = task.get('job_id')
     
     return jsonify(response)
 
 
-def run_process_pending_async(session_id, filename, api_id, api_hash):
-    """Запуск обработки pending групп в отдельном потоке"""
+def run_process_pending_async(session_id, filename, api_id, api_hash, profile=None, job_id=None):
+    """Постановка обработки pending групп в очередь планировщика"""
     def run():
         try:
             process_pending_tasks[session_id] = {
                 'status': 'running',
                 'progress': {'current': 0, 'total': 0, 'message': 'Инициализация...'},
                 'new_ready_file': None,
-                'updated_pending_file': None
+                'updated_pending_file': None,
+                'job_id': job_id
             }
             
             # Создаем новый event loop для этого потока
@@ -1221,7 +1113,8 @@ def run_process_pending_async(session_id, filename, api_id, api_hash):
             async def process_pending():
                 try:
                     # Инициализация клиента
-                    searcher = TelegramSearcher(api_id, api_hash, search_delay=2.0)
+                    searcher = TelegramSearcher(api_id, api_hash, search_delay=2.0, job_id=job_id)
+                    process_pending_tasks[session_id]['time_budget'] = searcher.budget
                     await searcher.connect()
                     
                     # Читаем pending группы из файла
@@ -1237,7 +1130,9 @@ def run_process_pending_async(session_id, filename, api_id, api_hash):
                             'status': 'error',
                             'progress': {'current': 0, 'total': 0, 'message': 'Группы не найдены в файле'},
                             'new_ready_file': None,
-                            'updated_pending_file': None
+                            'updated_pending_file': None,
+                            'job_id': job_id,
+                            'time_budget': process_pending_tasks[session_id].get('time_budget')
                         }
                         await searcher.disconnect()
                         return
@@ -1286,6 +1181,7 @@ def run_process_pending_async(session_id, filename, api_id, api_hash):
                         if os.path.exists(temp_file):
                             os.remove(temp_file)
                         new_ready_file = new_ready_filename
+                        index_saved_results(job_id, [(new_ready_file_path, results['ready_groups'])])
                     
                     # Сохраняем обновленный pending файл
                     if results['still_pending']:
@@ -1331,22 +1227,32 @@ def run_process_pending_async(session_id, filename, api_id, api_hash):
                             ws.column_dimensions[column_letter].width = adjusted_width
                         wb.save(updated_pending_file_path)
                         updated_pending_file = updated_pending_filename
+                        index_saved_results(job_id, [
+                            (updated_pending_file_path,
+                             [dict(g, check_status=g.get('check_status') if g.get('check_status') == 'error' else 'pending')
+                              for g in results['still_pending']])
+                        ])
                     
+                    await searcher.disconnect()
+                    searcher.budget.finish()
                     process_pending_tasks[session_id] = {
-                        'status': 'completed',
+                        'status': 'stopped' if searcher.flood_pause else 'completed',
                         'progress': {
                             'current': len(pending_groups),
                             'total': len(pending_groups),
-                            'message': 'Обработка завершена'
+                            'message': f'Обработка остановлена: {searcher.flood_pause}' if searcher.flood_pause else 'Обработка завершена'
                         },
                         'new_ready_file': new_ready_file,
                         'updated_pending_file': updated_pending_file,
                         'new_ready_count': len(results['ready_groups']),
-                        'still_pending_count': len(results['still_pending'])
+                        'still_pending_count': len(results['still_pending']),
+                        'flood_pause': str(searcher.flood_pause) if searcher.flood_pause else None,
+                        'job_id': job_id,
+                        'time_budget': searcher.budget.snapshot()
                     }
                     
-                    await searcher.disconnect()
                     app.logger.info(f"✅ Обработка завершена. Новых готовых: {len(results['ready_groups'])}, Все еще pending: {len(results['still_pending'])}")
+                    app.logger.info(f"⏱️ Время обработки: {searcher.budget.summary_line()}")
                     
                 except Exception as e:
                     app.logger.error(f"❌ Ошибка при обработке pending групп: {e}", exc_info=True)
@@ -1354,10 +1260,13 @@ def run_process_pending_async(session_id, filename, api_id, api_hash):
                         'status': 'error',
                         'progress': {'current': 0, 'total': 0, 'message': f'Ошибка: {str(e)}'},
                         'new_ready_file': None,
-                        'updated_pending_file': None
+                        'updated_pending_file': None,
+                        'job_id': job_id,
+                        'time_budget': process_pending_tasks[session_id].get('time_budget')
                     }
             
-            loop.run_until_complete(process_pending())
+            with job_profiler.profile_job(job_id, profile, loop):
+                loop.run_until_complete(process_pending())
             loop.close()
             
         except Exception as e:
@@ -1369,9 +1278,7 @@ def run_process_pending_async(session_id, filename, api_id, api_hash):
                 'updated_pending_file': None
             }
     
-    thread = threading.Thread(target=run)
-    thread.daemon = True
-    thread.start()
+    return job_scheduler.submit('pending', session_id, run, job_id=job_id)
 
 
 @app.route('/api/process_pending_groups', methods=['POST'])
@@ -1389,28 +1296,39 @@ def process_pending_groups():
     if 'pending' not in filename:
         return jsonify({'success': False, 'message': 'Выберите файл с pending группами'})
     
+    try:
+        profile = get_profile_mode(data.get('profile'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    
     # Проверяем API credentials
     try:
-        import config as app_config
-        api_id = app_config.API_ID
-        api_hash = app_config.API_HASH
+        api_id, api_hash = get_api_credentials()
     except Exception as e:
         app.logger.error(f"❌ Ошибка загрузки API credentials: {e}")
         return jsonify({'success': False, 'message': 'Ошибка загрузки API credentials'})
     
     # Проверяем, не запущена ли уже обработка
-    if session_id in process_pending_tasks and process_pending_tasks[session_id]['status'] == 'running':
+    if session_id in process_pending_tasks and process_pending_tasks[session_id]['status'] in ACTIVE_STATUSES:
         return jsonify({'success': False, 'message': 'Обработка уже запущена'})
     
     # Создаем флаг остановки
     process_pending_stop_flags[session_id] = threading.Event()
     
-    # Запускаем обработку в отдельном потоке
-    app.logger.info("🚀 Создание потока для обработки pending групп...")
-    run_process_pending_async(session_id, filename, api_id, api_hash)
-    app.logger.info("✅ Поток запущен")
+    job_id = job_scheduler.new_job_id('pending')
+    process_pending_tasks[session_id] = {
+        'status': 'queued',
+        'progress': {'current': 0, 'total': 0, 'message': 'В очереди...'},
+        'new_ready_file': None,
+        'updated_pending_file': None,
+        'job_id': job_id
+    }
+    
+    # Ставим обработку в очередь планировщика
+    job = run_process_pending_async(session_id, filename, api_id, api_hash, profile, job_id)
+    app.logger.info(f"✅ Обработка поставлена в очередь: {job.job_id}")
     
-    return jsonify({'success': True, 'message': 'Обработка запущена'})
+    return jsonify({'success': True, 'message': 'Обработка запущена', 'queue_position': job_scheduler.queue_position(job.job_id)})
 
 
 @app.route('/api/stop_process_pending', methods=['POST'])
@@ -1418,6 +1336,10 @@ def stop_process_pending():
     """Остановить обработку pending групп"""
     session_id = get_session_id()
     
+    if cancel_queued_task(process_pending_tasks.get(session_id)):
+        process_pending_tasks[session_id]['progress']['message'] = 'Удалено из очереди'
+        return jsonify({'success': True, 'message': 'Задача удалена из очереди'})
+    
     if session_id in process_pending_stop_flags:
         process_pending_stop_flags[session_id].set()
         if session_id in process_pending_tasks:
@@ -1443,20 +1365,28 @@ def process_pending_status():
     
     task = process_pending_tasks[session_id]
     progress = task.get('progress', {})
+    position = get_queue_position(task)
     
     response = {
         'status': task.get('status', 'idle'),
         'current': progress.get('current', 0),
         'total': progress.get('total', 0),
-        'message': progress.get('message', ''),
-        'current_group': progress.get('current_group', '')
+        'message': f'В очереди: позиция {position}' if position else progress.get('message', ''),
+        'current_group': progress.get('current_group', ''),
+        'queue_position': position,
+        'api_metrics': api_metrics.registry.job_summary(task.get('job_id')),
+        'time_budget': budget_snapshot(task.get('time_budget')),
+        'profile': job_profiler.status(task.get('job_id'))
     }
     
-    if task.get('status') == 'completed':
+    if task.get('status') == 'completed' or task.get('flood_pause'):
+        # Остановка из-за долгой паузы FloodWait: результаты обработанной части тоже сохранены
+        response['flood_pause'] = task.get('flood_pause')
         response['new_ready_file'] = task.get('new_ready_file')
         response['updated_pending_file'] = task.get('updated_pending_file')
         response['new_ready_count'] = task.get('new_ready_count', 0)
         response['still_pending_count'] = task.get('still_pending_count', 0)
+        response['job_id'] = task.get('job_id')
     
     return jsonify(response)
 
@@ -1548,6 +1478,7 @@ def merge_ready_groups():
             ws.column_dimensions[column_letter].width = adjusted_width
         
         wb.save(result_file)
+        results_index.schedule_sync(result_filename)
         
         app.logger.info(f"✅ Объединено {len(ready_files)} файлов, всего {len(all_groups)} групп в {result_filename}")
         
@@ -1726,6 +1657,7 @@ def merge_uploaded_files():
             ws.column_dimensions[column_letter].width = adjusted_width
         
         wb.save(result_file)
+        results_index.schedule_sync(result_filename)
         
         # Проверяем, что файл действительно создан
         if not os.path.exists(result_file):
@@ -1765,6 +1697,7 @@ def start_sending():
         message_text = request.form.get('message_text', '')
         message_limit = int(request.form.get('message_limit', 50))
         send_delay = float(request.form.get('send_delay', 5.0))
+        profile = get_profile_mode(request.form.get('profile'))
         
         # Получаем файлы
         photo_file = request.files.get('photo')
@@ -1778,6 +1711,7 @@ def start_sending():
             uploaded_filepath = os.path.join('results', uploaded_filename)
             os.makedirs('results', exist_ok=True)
             uploaded_file.save(uploaded_filepath)
+            results_index.schedule_sync(uploaded_filename)
             filename = uploaded_filename  # Используем загруженный файл
             app.logger.info(f"📁 Загружен файл пользователя: {uploaded_filename}")
         elif groups_text:
@@ -1814,6 +1748,7 @@ def start_sending():
                 app.logger.info(f"  📝 Добавлена группа: id={group_id}, username={username}, title={title}")
             
             wb.save(temp_filepath)
+            results_index.schedule_sync(temp_filename)
             filename = temp_filename
             app.logger.info(f"📝 Создан файл из текстового списка: {temp_filename} ({len(groups_list)} групп)")
         elif not filename:
@@ -1823,12 +1758,7 @@ def start_sending():
             return jsonify({'success': False, 'message': 'Не указан текст сообщения или не загружены файлы'})
         
         # Загружаем API credentials из config.py
-        spec = importlib.util.spec_from_file_location("config", "config.py")
-        config = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(config)
-        
-        api_id = config.API_ID
-        api_hash = config.API_HASH
+        api_id, api_hash = get_api_credentials()
         
         # Сохраняем загруженные файлы
         photo_path = None
@@ -1849,12 +1779,14 @@ def start_sending():
         sending_stop_flags[session_id] = stop_event
         
         # Инициализируем задачу
+        job_id = job_scheduler.new_job_id('sending')
         sending_tasks[session_id] = {
-            'status': 'running',
+            'job_id': job_id,
+            'status': 'queued',
             'progress': {
                 'current': 0,
                 'total': 0,
-                'message': 'Инициализация...',
+                'message': 'В очереди...',
                 'current_group': ''
             },
             'sent_count': 0,
@@ -1864,15 +1796,14 @@ def start_sending():
             'logs': []
         }
         
-        # Запускаем рассылку в отдельном потоке
-        thread = threading.Thread(
-            target=run_sending_async,
-            args=(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event)
+        # Ставим рассылку в очередь планировщика
+        job = job_scheduler.submit(
+            'sending', session_id, run_sending_async,
+            session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event, profile, job_id,
+            job_id=job_id
         )
-        thread.daemon = True
-        thread.start()
         
-        return jsonify({'success': True, 'message': 'Рассылка запущена'})
+        return jsonify({'success': True, 'message': 'Рассылка запущена', 'queue_position': job_scheduler.queue_position(job.job_id)})
         
     except Exception as e:
         app.logger.error(f"Ошибка при запуске рассылки: {e}", exc_info=True)
@@ -1884,6 +1815,10 @@ def stop_sending():
     session_id = get_session_id()
     stop_event = sending_stop_flags.get(session_id)
     
+    if cancel_queued_task(sending_tasks.get(session_id)):
+        sending_tasks[session_id]['progress']['message'] = 'Удалено из очереди'
+        return jsonify({'success': True, 'message': 'Рассылка удалена из очереди'})
+    
     if stop_event:
         stop_event.set()
         if session_id in sending_tasks:
@@ -1898,13 +1833,18 @@ def sending_status():
     session_id = get_session_id()
     task = sending_tasks.get(session_id, {})
     progress = task.get('progress', {})
+    position = get_queue_position(task)
     
     response = {
         'status': task.get('status', 'idle'),
         'current': progress.get('current', 0),
         'total': progress.get('total', 0),
-        'message': progress.get('message', ''),
+        'message': f'В очереди: позиция {position}' if position else progress.get('message', ''),
         'current_group': progress.get('current_group', ''),
+        'queue_position': position,
+        'api_metrics': api_metrics.registry.job_summary(task.get('job_id')),
+        'time_budget': budget_snapshot(task.get('time_budget')),
+        'profile': job_profiler.status(task.get('job_id')),
         'sent_count': task.get('sent_count', 0),
         'error_count': task.get('error_count', 0),
         'blocked_count': task.get('blocked_count', 0),
@@ -1922,15 +1862,20 @@ def sending_status():
     
     return jsonify(response)
 
-def run_sending_async(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event):
-    """Запуск рассылки в отдельном потоке"""
+def run_sending_async(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event, profile=None, job_id=None):
+    """Запуск рассылки в потоке воркера планировщика"""
+    if session_id in sending_tasks:
+        sending_tasks[session_id]['status'] = 'running'
+        sending_tasks[session_id]['progress']['message'] = 'Инициализация...'
+    
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     
     try:
-        loop.run_until_complete(
-            send_messages_to_groups(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event)
-        )
+        with job_profiler.profile_job(job_id, profile, loop):
+            loop.run_until_complete(
+                send_messages_to_groups(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event, job_id)
+            )
     except Exception as e:
         app.logger.error(f"Ошибка в run_sending_async: {e}", exc_info=True)
         if session_id in sending_tasks:
@@ -1939,7 +1884,7 @@ def run_sending_async(session_id, filename, message_text, message_limit, send_de
     finally:
         loop.close()
 
-async def send_messages_to_groups(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event):
+async def send_messages_to_groups(session_id, filename, message_text, message_limit, send_delay, photo_path, video_path, api_id, api_hash, stop_event, job_id=None):
     """Асинхронная функция рассылки сообщений"""
     try:
         # Используем уникальное имя сессии для каждой рассылки, чтобы избежать блокировки БД
@@ -1967,7 +1912,11 @@ async def send_messages_to_groups(session_id, filename, message_text, message_li
                     else:
                         app.logger.warning(f"⚠️ Не удалось скопировать сессию после 3 попыток: {e}, использую новую сессию")
         
-        searcher = TelegramSearcher(api_id, api_hash, session_name, send_delay)
+        searcher = TelegramSearcher(api_id, api_hash, session_name, send_delay, job_id=job_id)
+        if session_id in sending_tasks:
+            sending_tasks[session_id]['time_budget'] = searcher.budget
+        # Задержка рассылки - интервал между отправками только этой задачи
+        searcher.client.pace('send', send_delay)
         
         # Пробуем подключиться с таймаутом и повторными попытками
         connected = False
@@ -1980,7 +1929,7 @@ async def send_messages_to_groups(session_id, filename, message_text, message_li
             except asyncio.TimeoutError:
                 if attempt < 2:
                     app.logger.warning(f"⏳ Таймаут подключения (попытка {attempt + 1}), повторяю...")
-                    await asyncio.sleep(2)
+                    await searcher.budget.sleep(2)
                 else:
                     sending_tasks[session_id]['status'] = 'error'
                     sending_tasks[session_id]['progress']['message'] = 'Таймаут подключения к Telegram после 3 попыток'
@@ -1989,7 +1938,7 @@ async def send_messages_to_groups(session_id, filename, message_text, message_li
                 error_msg = str(e).lower()
                 if 'database is locked' in error_msg and attempt < 2:
                     app.logger.warning(f"⏳ БД заблокирована (попытка {attempt + 1}), жду и повторяю...")
-                    await asyncio.sleep(3)
+                    await searcher.budget.sleep(3)
                 else:
                     app.logger.error(f"Ошибка подключения к Telegram: {e}")
                     sending_tasks[session_id]['status'] = 'error'
@@ -2116,6 +2065,11 @@ async def send_messages_to_groups(session_id, filename, message_text, message_li
                 if len(sending_tasks[session_id]['logs']) > 100:
                     sending_tasks[session_id]['logs'].pop(0)
                 
+            except FloodPause as pause:
+                # Долгая пауза FloodWait: остальные отправки завершились бы так же - останавливаем рассылку
+                searcher.flood_pause = pause
+                sending_tasks[session_id]['logs'].append({'message': f'⏸️ Рассылка остановлена: {pause}', 'type': 'error'})
+                break
             except Exception as e:
                 error_count += 1
                 error_msg = str(e)
@@ -2136,24 +2090,25 @@ async def send_messages_to_groups(session_id, filename, message_text, message_li
             sending_tasks[session_id]['error_count'] = error_count
             sending_tasks[session_id]['blocked_count'] = blocked_count
             sending_tasks[session_id]['skipped_count'] = skipped_count
-            
-            # Задержка между отправками
-            if i < len(groups) - 1:
-                await asyncio.sleep(send_delay)
+        
+        searcher.budget.finish()
+        app.logger.info(f"⏱️ Рассылка: {searcher.budget.summary_line()}")
         
         # Сохраняем отчет
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_filename = f'sending_report_{timestamp}.xlsx'
         report_file = os.path.join('results', report_filename)
         
-        searcher.save_sending_report(results, report_file, sent_count, error_count, blocked_count, skipped_count)
+        searcher.save_sending_report(results, report_file, sent_count, error_count, blocked_count, skipped_count,
+                                     time_budget=searcher.budget.snapshot())
+        results_index.schedule_sync(report_filename)
         
         # Завершаем
-        sending_tasks[session_id]['status'] = 'completed'
+        sending_tasks[session_id]['status'] = 'stopped' if searcher.flood_pause else 'completed'
         sending_tasks[session_id]['progress'] = {
             'current': total_groups,
             'total': total_groups,
-            'message': 'Рассылка завершена',
+            'message': f'Рассылка остановлена: {searcher.flood_pause}' if searcher.flood_pause else 'Рассылка завершена',
             'current_group': ''
         }
         sending_tasks[session_id]['report_file'] = report_filename
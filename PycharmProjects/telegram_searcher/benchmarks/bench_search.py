@@ -0,0 +1,119 @@
+"""
+Бенчмарк поиска, обогащения и экспорта на локальной имитации Telegram
+
+Использует FakeTelegramClient (fake_telegram.py), поэтому не требует аккаунта
+и сети. Результаты детерминированы при одинаковых параметрах.
+
+Этапы:
+    search - SearchRequest + количество участников (GetFullChannelRequest/GetFullChatRequest)
+    check  - check_group_access для найденных групп
+    export - save_to_excel
+
+Ожидания регулятора частоты (rate_governor.py) и прочие паузы через budget.sleep
+по умолчанию пропускаются, чтобы измерять стоимость самих запросов и обработки;
+--real-pauses оставляет их.
+
+Запуск:
+    python benchmarks/bench_search.py [--queries 200] [--latency 0.0] [--error-rate 0.0] [--flood-rate 0.0]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time_budget
+from fake_telegram import FakeTelegramClient
+from telegram_searcher import TelegramSearcher
+
+
+class _NoPauseAsyncio:
+    """Модуль asyncio без asyncio.sleep (для замера без фиксированных пауз)"""
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+    @staticmethod
+    async def sleep(delay, result=None):
+        return result
+
+
+async def run(args) -> dict:
+    client = FakeTelegramClient(
+        entities=args.entities,
+        results_per_query=args.results,
+        seed=args.seed,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        flood_rate=args.flood_rate,
+        flood_seconds=0
+    )
+    searcher = TelegramSearcher(0, '', search_delay=0, client=client)
+    await searcher.connect()
+    queries = [f'запрос {i}' for i in range(args.queries)]
+    timings = {}
+
+    start = time.perf_counter()
+    results = await searcher.search_channels_and_groups(queries, limit_per_keyword=args.results)
+    timings['search'] = time.perf_counter() - start
+
+    groups = results['groups'][:args.check_limit]
+    start = time.perf_counter()
+    for group in groups:
+        await searcher.check_group_access(group)
+    timings['check'] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        searcher.save_to_excel(
+            results['groups'], results['channels'],
+            os.path.join(workdir, 'groups.xlsx'), os.path.join(workdir, 'channels.xlsx')
+        )
+        timings['export'] = time.perf_counter() - start
+
+    await searcher.disconnect()
+    return {
+        'timings': timings,
+        'found': len(results['groups']) + len(results['channels']),
+        'checked': len(groups),
+        'calls': dict(client.calls)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--entities', type=int, default=5000)
+    parser.add_argument('--results', type=int, default=20, help='Чатов на один поисковый запрос')
+    parser.add_argument('--check-limit', type=int, default=50, help='Сколько групп проверять')
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа имитации, сек')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--flood-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real-pauses', action='store_true', help='Не пропускать паузы в TelegramSearcher')
+    args = parser.parse_args()
+
+    if not args.real_pauses:
+        time_budget.asyncio = _NoPauseAsyncio()
+
+    # Поиск и проверка печатают каждый результат - в замер это не должно попадать
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = asyncio.run(run(args))
+
+    print(f"Найдено: {report['found']}, проверено: {report['checked']}")
+    print(f"{'этап':<10}{'сек':>10}")
+    for stage, seconds in report['timings'].items():
+        print(f"{stage:<10}{seconds:>10.3f}")
+    print("Вызовы API:")
+    for name, count in sorted(report['calls'].items(), key=lambda item: -item[1]):
+        print(f"  {name:<28}{count:>8}")
+
+
+if __name__ == '__main__':
+    main()
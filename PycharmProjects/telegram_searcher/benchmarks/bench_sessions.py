@@ -0,0 +1,94 @@
+"""
+Бенчмарк накладных расходов на сессию за один запрос
+
+Сравнивает Flask-Session (filesystem, как было раньше) с бэкендами из
+session_backend.py на запросе, похожем на опрос /api/status: чтение session_id.
+
+Запуск:
+    python benchmarks/bench_sessions.py [--requests 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session
+
+import session_backend
+
+
+def make_app(backend: str, workdir: str) -> Flask:
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench'
+
+    if backend == 'filesystem':
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        app.config['SESSION_FILE_DIR'] = os.path.join(workdir, 'flask_session')
+        Session(app)
+    elif backend != 'cookie':
+        app.config['SESSION_BACKEND'] = backend
+        app.config['SESSION_SQLITE_PATH'] = os.path.join(workdir, 'sessions.sqlite3')
+        app.config['SESSION_REDIS_URL'] = 'fake://'
+        session_backend.init_app(app)
+
+    @app.route('/status')
+    def status():
+        if 'session_id' not in session:
+            session['session_id'] = 'session_bench'
+        return 'ok'
+
+    return app
+
+
+def bench(backend: str, requests: int) -> float:
+    """
+    Среднее время open_session + save_session в микросекундах
+
+    Измеряется только интерфейс сессий, без накладных расходов тестового клиента.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        app = make_app(backend, workdir)
+        client = app.test_client()
+        client.get('/status')  # Первый запрос создает сессию
+        cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME'])
+        headers = {'Cookie': f"{cookie.key}={cookie.value}"} if cookie else {}
+        interface = app.session_interface
+        response = app.response_class('ok')
+
+        with app.test_request_context('/status', headers=headers) as ctx:
+            start = time.perf_counter()
+            for _ in range(requests):
+                sess = interface.open_session(app, ctx.request)
+                if 'session_id' not in sess:
+                    sess['session_id'] = 'session_bench'
+                interface.save_session(app, sess, response)
+            elapsed = time.perf_counter() - start
+    return elapsed / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    # 'cookie' - стандартная подписанная cookie-сессия Flask, для сравнения;
+    # 'redis' - через локальную заглушку fake_redis.py (без сетевых задержек)
+    backends = ['cookie', 'memory', 'sqlite', 'redis']
+    try:
+        import flask_session  # noqa: F401
+        backends.insert(1, 'filesystem')
+    except ImportError:
+        print("⚠️ Flask-Session не установлен, бэкенд 'filesystem' пропущен")
+
+    print(f"{'backend':<12}{'мкс/запрос':>12}")
+    for backend in backends:
+        print(f"{backend:<12}{bench(backend, args.requests):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
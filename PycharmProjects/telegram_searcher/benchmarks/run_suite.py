@@ -0,0 +1,336 @@
+"""
+Набор бенчмарков конвейера поиск -> экспорт
+
+Работает без сети: поиск идет через FakeTelegramClient (fake_telegram.py),
+xlsx файлы генерируются синтетически. Каждый замер запускается в отдельном
+процессе, поэтому пиковая память (peak RSS) относится только к этому замеру;
+подготовка файлов выполняется в еще одном отдельном процессе и в замер не входит.
+
+Сценарии:
+    query_generation       generate_search_queries для матрицы ключевые слова x города
+    search                 search_channels_and_groups с получением количества участников
+    save_to_excel          TelegramSearcher.save_to_excel
+    read_groups_from_excel TelegramSearcher.read_groups_from_excel
+    save_check_results     TelegramSearcher.save_check_results
+    merge_ready_groups     POST /api/merge_ready_groups
+    merge_uploaded_files   POST /api/merge_uploaded_files
+
+Запуск:
+    python benchmarks/run_suite.py [--sizes 1000,10000,100000] [--cases search,save_to_excel]
+                                   [--output report.json]
+                                   [--save-baseline benchmarks/baseline.json]
+                                   [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+
+Отчет в JSON печатается в stdout (или пишется в --output). При сравнении с
+базовой линией код возврата 1 означает, что найдены регрессии.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+SEARCH_RESULTS_PER_QUERY = 50
+
+
+def make_groups(count: int, start: int = 0, seed: int = 0):
+    """Синтетические записи групп в формате TelegramSearcher"""
+    rng = random.Random(f'{seed}:{start}:{count}')
+    groups = []
+    for i in range(start, start + count):
+        groups.append({
+            'id': 1000000 + i,
+            'title': f'Группа {i}',
+            'username': f'group_{i}' if rng.random() < 0.7 else None,
+            'members_count': int(rng.paretovariate(1.2) * 50),
+            'keyword': f'ключ {i % 50}'
+        })
+    return groups
+
+
+def make_checked_groups(count: int, start: int = 0):
+    """Записи с результатами проверки (как после check_group_access)"""
+    statuses = ['ready', 'ready', 'pending', 'unavailable', 'error']
+    groups = make_groups(count, start)
+    for i, group in enumerate(groups):
+        group['check_status'] = statuses[i % len(statuses)]
+        group['check_message'] = 'Готово к рассылке' if group['check_status'] == 'ready' else 'Требуется вступление'
+        group['check_action'] = 'none'
+    return groups
+
+
+def _searcher(client=None):
+    """TelegramSearcher без сети (для сценариев экспорта - пустая имитация)"""
+    from fake_telegram import FakeTelegramClient
+    from telegram_searcher import TelegramSearcher
+    return TelegramSearcher(0, '', search_delay=0, client=client or FakeTelegramClient(entities=0))
+
+
+# --- Сценарии: prepare(size, workdir) готовит файлы, run(size, workdir) - то, что измеряется ---
+
+def run_query_generation(size, workdir):
+    from telegram_searcher import TelegramSearcher
+    # Для русских слов каждая пара (слово, город) дает ~8 запросов
+    side = max(1, int(math.sqrt(size / 8)))
+    keywords = [f'кафе{i}' for i in range(side)]
+    cities = [f'город{i}' for i in range(side)]
+    start = time.perf_counter()
+    queries = TelegramSearcher.generate_search_queries(keywords, cities)
+    return time.perf_counter() - start, {'items': len(queries)}
+
+
+def run_search(size, workdir):
+    from fake_telegram import FakeTelegramClient
+    client = FakeTelegramClient(entities=size * 2, results_per_query=SEARCH_RESULTS_PER_QUERY)
+    searcher = _searcher(client)
+    queries = [f'запрос {i}' for i in range(max(1, size // SEARCH_RESULTS_PER_QUERY))]
+
+    async def search():
+        await searcher.connect()
+        return await searcher.search_channels_and_groups(queries, limit_per_keyword=SEARCH_RESULTS_PER_QUERY)
+
+    start = time.perf_counter()
+    results = asyncio.run(search())
+    elapsed = time.perf_counter() - start
+    return elapsed, {
+        'items': len(results['groups']) + len(results['channels']),
+        'api_calls': dict(client.calls)
+    }
+
+
+def run_save_to_excel(size, workdir):
+    groups = make_groups(size)
+    searcher = _searcher()
+    start = time.perf_counter()
+    searcher.save_to_excel(groups, [], os.path.join(workdir, 'groups.xlsx'), os.path.join(workdir, 'channels.xlsx'))
+    return time.perf_counter() - start, {'items': size}
+
+
+def prepare_read_groups_from_excel(size, workdir):
+    _searcher().save_to_excel(make_groups(size), [], os.path.join(workdir, 'groups.xlsx'), os.path.join(workdir, 'channels.xlsx'))
+
+
+def run_read_groups_from_excel(size, workdir):
+    from telegram_searcher import TelegramSearcher
+    start = time.perf_counter()
+    groups = TelegramSearcher.read_groups_from_excel(os.path.join(workdir, 'groups.xlsx'))
+    return time.perf_counter() - start, {'items': len(groups)}
+
+
+def run_save_check_results(size, workdir):
+    groups = make_checked_groups(size)
+    searcher = _searcher()
+    start = time.perf_counter()
+    searcher.save_check_results(groups, os.path.join(workdir, 'ready.xlsx'), os.path.join(workdir, 'pending.xlsx'))
+    return time.perf_counter() - start, {'items': size}
+
+
+def _write_ready_files(size, directory, prefix):
+    """Два файла готовых групп по size/2 строк с 10% пересечением"""
+    os.makedirs(directory, exist_ok=True)
+    half = size // 2
+    overlap = half // 10
+    searcher = _searcher()
+    paths = []
+    for n, start in enumerate((0, half - overlap)):
+        groups = make_checked_groups(half, start)
+        for group in groups:
+            group['check_status'] = 'ready'
+        ready = os.path.join(directory, f'{prefix}{n}.xlsx')
+        searcher.save_check_results(groups, ready, os.path.join(directory, f'unused_{n}.xlsx'))
+        paths.append(ready)
+    return paths
+
+
+def prepare_merge_ready_groups(size, workdir):
+    _write_ready_files(size, os.path.join(workdir, 'results'), 'ready_groups_20240101_00000')
+
+
+def run_merge_ready_groups(size, workdir):
+    os.chdir(workdir)
+    import app as web_app
+    client = web_app.app.test_client()
+    start = time.perf_counter()
+    response = client.post('/api/merge_ready_groups')
+    elapsed = time.perf_counter() - start
+    data = response.get_json()
+    if not data.get('success'):
+        raise RuntimeError(data.get('message'))
+    return elapsed, {'items': data['total_groups']}
+
+
+def prepare_merge_uploaded_files(size, workdir):
+    _write_ready_files(size, os.path.join(workdir, 'upload_src'), 'upload_')
+
+
+def run_merge_uploaded_files(size, workdir):
+    os.chdir(workdir)
+    import app as web_app
+    client = web_app.app.test_client()
+    src = os.path.join(workdir, 'upload_src')
+    names = sorted(name for name in os.listdir(src) if name.startswith('upload_'))
+    handles = [open(os.path.join(src, name), 'rb') for name in names]
+    try:
+        start = time.perf_counter()
+        response = client.post(
+            '/api/merge_uploaded_files',
+            data={'files': [(handle, name) for handle, name in zip(handles, names)]},
+            content_type='multipart/form-data'
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        for handle in handles:
+            handle.close()
+    data = response.get_json()
+    if not data.get('success'):
+        raise RuntimeError(data.get('message'))
+    return elapsed, {'items': data['total_after']}
+
+
+CASES = {
+    'query_generation': (None, run_query_generation),
+    'search': (None, run_search),
+    'save_to_excel': (None, run_save_to_excel),
+    'read_groups_from_excel': (prepare_read_groups_from_excel, run_read_groups_from_excel),
+    'save_check_results': (None, run_save_check_results),
+    'merge_ready_groups': (prepare_merge_ready_groups, run_merge_ready_groups),
+    'merge_uploaded_files': (prepare_merge_uploaded_files, run_merge_uploaded_files),
+}
+
+
+def peak_rss_mb():
+    """Пиковая память процесса в МБ (None, если модуль resource недоступен)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def child(mode, case, size, workdir):
+    """Выполнение одного шага в отдельном процессе"""
+    prepare, run = CASES[case]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if mode == 'prepare':
+            if prepare:
+                prepare(size, workdir)
+            return
+        elapsed, extra = run(size, workdir)
+    result = {'wall_time_s': round(elapsed, 4), 'peak_rss_mb': peak_rss_mb()}
+    result.update(extra)
+    print(json.dumps(result))
+
+
+def run_in_subprocess(mode, case, size, workdir):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, case, str(size), workdir],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'{case} ({size}, {mode}) завершился с ошибкой:\n{proc.stderr}')
+    lines = proc.stdout.strip().splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+def compare(results, baseline, tolerance):
+    """Сравнение с базовой линией: список регрессий по времени и памяти"""
+    base = {(item['case'], item['size']): item for item in baseline.get('results', [])}
+    regressions = []
+    for item in results:
+        previous = base.get((item['case'], item['size']))
+        if not previous:
+            continue
+        item['baseline_wall_time_s'] = previous['wall_time_s']
+        item['time_ratio'] = round(item['wall_time_s'] / previous['wall_time_s'], 3) if previous['wall_time_s'] else None
+        # Короткие замеры шумят, поэтому учитываем и абсолютную разницу
+        if item['time_ratio'] and item['time_ratio'] > 1 + tolerance and item['wall_time_s'] - previous['wall_time_s'] > 0.05:
+            regressions.append(f"{item['case']}[{item['size']}]: время {previous['wall_time_s']}с -> {item['wall_time_s']}с")
+        if item.get('peak_rss_mb') and previous.get('peak_rss_mb'):
+            if item['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(f"{item['case']}[{item['size']}]: память {previous['peak_rss_mb']}МБ -> {item['peak_rss_mb']}МБ")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--output', help='Файл для JSON отчета (по умолчанию stdout)')
+    parser.add_argument('--baseline', help='JSON отчет для сравнения')
+    parser.add_argument('--save-baseline', help='Сохранить отчет как базовую линию')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Допустимое ухудшение (0.25 = 25%%)')
+    parser.add_argument('--child', nargs=4, metavar=('MODE', 'CASE', 'SIZE', 'WORKDIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, case, size, workdir = args.child
+        child(mode, case, int(size), workdir)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    cases = [case for case in args.cases.split(',') if case]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+    results = []
+    for case in cases:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as workdir:
+                run_in_subprocess('prepare', case, size, workdir)
+                result = run_in_subprocess('run', case, size, workdir)
+            result = {'case': case, 'size': size, **result}
+            results.append(result)
+            print(f"{case:<24}{size:>8}{result['wall_time_s']:>10.3f}с{result['peak_rss_mb'] or 0:>10.1f}МБ", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"✅ Базовая линия сохранена: {args.save_baseline}", file=sys.stderr)
+
+    if regressions:
+        print("❌ Регрессии:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,10 @@
 API_ID = 12345678  # Замените на ваш API ID
 API_HASH = 'your_api_hash_here'  # Замените на ваш API Hash
 
+# Начальные ключевые слова, города и задержка.
+# При первом запуске они переносятся в search_config.json, дальше список
+# редактируется через веб-интерфейс (config.py при этом не перезаписывается)
+
 # Ключевые слова для поиска
 KEYWORDS = [
     'python',
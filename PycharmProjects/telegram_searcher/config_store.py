@@ -0,0 +1,218 @@
+"""
+Хранилище настроек поиска (ключевые слова, города, задержка)
+Данные хранятся в JSON-файле и кэшируются в памяти, вместо перезаписи config.py
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+
+DEFAULT_DELAY = 5.0
+
+
+def normalize_items(items) -> List[str]:
+    """
+    Нормализация списка ключевых слов или городов
+
+    Принимает список строк или текст (разделители - запятая и перевод строки),
+    обрезает пробелы, убирает пустые значения и дубликаты с сохранением порядка.
+    """
+    if items is None:
+        return []
+    if isinstance(items, str):
+        items = re.split(r'[,\n]', items)
+    return list(dict.fromkeys(str(item).strip() for item in items if str(item).strip()))
+
+
+class ConfigStore:
+    """
+    Настройки поиска в JSON-файле с кэшированной копией в памяти
+
+    Чтение отдает кэш (проверяется только mtime файла, чтобы подхватить ручные
+    правки). Запись идет во временный файл с последующим атомарным os.replace,
+    поэтому читатели никогда не видят пустой или недописанный файл, а изменение
+    не затрагивает .py файлы и не перезапускает dev-сервер Flask.
+    """
+
+    FIELDS = ('keywords', 'cities')
+
+    def __init__(self, path: str = 'search_config.json', legacy_module: str = 'config'):
+        """
+        Args:
+            path: Путь к JSON-файлу с настройками
+            legacy_module: Модуль со старыми настройками (KEYWORDS, CITIES, SEARCH_DELAY),
+                из которого данные переносятся при первом запуске
+        """
+        self.path = path
+        self.legacy_module = legacy_module
+        self._lock = threading.RLock()
+        self._data: Optional[Dict] = None
+        self._mtime_ns = None
+
+    def _load_legacy(self) -> Dict:
+        """Перенос настроек из config.py (однократно, если JSON еще не создан)"""
+        try:
+            legacy = __import__(self.legacy_module)
+        except Exception:
+            return {'keywords': [], 'cities': [], 'delay': DEFAULT_DELAY}
+        return {
+            'keywords': list(getattr(legacy, 'KEYWORDS', [])),
+            'cities': list(getattr(legacy, 'CITIES', [])),
+            'delay': float(getattr(legacy, 'SEARCH_DELAY', DEFAULT_DELAY))
+        }
+
+    def _read(self) -> Dict:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        return {
+            'keywords': [str(k) for k in raw.get('keywords', [])],
+            'cities': [str(c) for c in raw.get('cities', [])],
+            'delay': float(raw.get('delay', DEFAULT_DELAY))
+        }
+
+    def _write(self, data: Dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.search_config_', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._data = data
+        self._mtime_ns = os.stat(self.path).st_mtime_ns
+
+    def _current(self) -> Dict:
+        """Актуальные данные (вызывать под блокировкой)"""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            if self._data is None:
+                self._write(self._load_legacy())
+            return self._data
+
+        if self._data is None or mtime_ns != self._mtime_ns:
+            self._data = self._read()
+            self._mtime_ns = mtime_ns
+        return self._data
+
+    def get(self) -> Dict:
+        """
+        Получить текущие настройки
+
+        Returns:
+            Словарь {'keywords': [...], 'cities': [...], 'delay': float} (копия)
+        """
+        with self._lock:
+            data = self._current()
+            return {
+                'keywords': list(data['keywords']),
+                'cities': list(data['cities']),
+                'delay': data['delay']
+            }
+
+    def update(self, keywords: List[str] = None, cities: List[str] = None, delay: float = None) -> Dict:
+        """
+        Заменить одно или несколько полей и сохранить
+
+        Returns:
+            Новые настройки (копия)
+        """
+        with self._lock:
+            data = dict(self._current())
+            if keywords is not None:
+                data['keywords'] = list(keywords)
+            if cities is not None:
+                data['cities'] = list(cities)
+            if delay is not None:
+                data['delay'] = float(delay)
+            self._write(data)
+            return self.get()
+
+    def add(self, field: str, value: str) -> bool:
+        """
+        Добавить значение в список keywords/cities
+
+        Returns:
+            False если значение уже есть в списке
+        """
+        with self._lock:
+            items = self._current()[field]
+            if value in items:
+                return False
+            self.update(**{field: items + [value]})
+            return True
+
+    def remove(self, field: str, value: str) -> bool:
+        """
+        Удалить значение из списка keywords/cities
+
+        Returns:
+            False если значения нет в списке
+        """
+        with self._lock:
+            items = self._current()[field]
+            if value not in items:
+                return False
+            self.update(**{field: [item for item in items if item != value]})
+            return True
+
+    def apply_batch(self, changes: Dict) -> Dict:
+        """
+        Применить пакет добавлений и удалений атомарно, с одной записью на диск
+
+        Args:
+            changes: {'keywords': {'add': [...], 'remove': [...]},
+                      'cities': {'add': [...], 'remove': [...]}}
+                Списки могут быть строками с разделителями (см. normalize_items).
+                Сначала применяются удаления, затем добавления.
+
+        Returns:
+            {'keywords': [...], 'cities': [...], 'added': {...}, 'removed': {...}}
+
+        Raises:
+            ValueError: Пакет или изменение поля не объект, add/remove не список и не строка
+        """
+        if not isinstance(changes, dict):
+            raise ValueError('Тело запроса должно быть объектом')
+        for field in self.FIELDS:
+            change = changes.get(field)
+            if change is None:
+                continue
+            if not isinstance(change, dict):
+                raise ValueError(f'{field}: ожидается объект {{"add": [...], "remove": [...]}}')
+            for key in ('add', 'remove'):
+                if not isinstance(change.get(key), (list, str, type(None))):
+                    raise ValueError(f'{field}.{key}: ожидается список или строка')
+
+        added = {}
+        removed = {}
+        with self._lock:
+            data = self._current()
+            new_lists = {}
+            for field in self.FIELDS:
+                change = changes.get(field) or {}
+                to_remove = set(normalize_items(change.get('remove')))
+                to_add = normalize_items(change.get('add'))
+
+                items = [item for item in data[field] if item not in to_remove]
+                present = set(items)
+                new_items = [item for item in to_add if item not in present]
+
+                removed[field] = len(data[field]) - len(items)
+                added[field] = len(new_items)
+                if removed[field] or added[field]:
+                    new_lists[field] = items + new_items
+
+            if new_lists:
+                self.update(**new_lists)
+            result = self.get()
+        result['added'] = added
+        result['removed'] = removed
+        return result
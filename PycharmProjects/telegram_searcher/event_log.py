@@ -0,0 +1,194 @@
+"""
+Структурированный журнал событий
+События пишутся в JSON lines (по строке на событие: время, уровень, событие,
+сообщение и поля) и дублируются текстом в stdout. Запись идет через очередь
+(QueueHandler + QueueListener): вызывающий код только кладет запись в очередь,
+файл и консоль пишет отдельный поток.
+
+Для событий по каждому элементу (найденный чат, шаг проверки участника)
+есть режимы EVENT_LOG_ITEMS:
+    all     - каждое событие
+    sample  - первое и каждое EVENT_LOG_SAMPLE-е событие каждого типа (по умолчанию)
+    summary - только счетчики, которые выводятся одной записью через summary()
+События уровня WARNING и выше пишутся всегда.
+
+Настройки: EVENT_LOG_PATH (logs/events.jsonl), EVENT_LOG_LEVEL (INFO),
+EVENT_LOG_ITEMS (sample), EVENT_LOG_SAMPLE (100), EVENT_LOG_CONSOLE (1)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict
+
+ITEM_MODES = ('all', 'sample', 'summary')
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Запись журнала -> одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': getattr(record, 'event', record.name),
+            'msg': record.getMessage().strip()
+        }
+        data.update(getattr(record, 'fields', None) or {})
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class EventLog:
+    """Журнал событий процесса (файл JSON lines + консоль через общую очередь)"""
+
+    def __init__(self, name: str = 'telegram_searcher.events', path: str = None, level: str = 'INFO',
+                 item_mode: str = 'sample', sample_every: int = 100, console: bool = True):
+        """
+        Args:
+            name: Имя logger
+            path: Файл JSON lines (None - не писать в файл)
+            level: Минимальный уровень (DEBUG/INFO/WARNING/ERROR)
+            item_mode: Режим событий по элементам: all / sample / summary
+            sample_every: В режиме sample писать каждое N-е событие каждого типа
+            console: Дублировать сообщения в stdout
+        """
+        if item_mode not in ITEM_MODES:
+            raise ValueError(f'Неизвестный режим EVENT_LOG_ITEMS: {item_mode} (доступны: {", ".join(ITEM_MODES)})')
+        self.path = path
+        self.item_mode = item_mode
+        self.sample_every = max(1, sample_every)
+        self.console = console
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        self.logger.propagate = False
+        self._listener = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'EventLog':
+        env = os.environ
+        return cls(
+            path=env.get('EVENT_LOG_PATH', os.path.join('logs', 'events.jsonl')) or None,
+            level=env.get('EVENT_LOG_LEVEL', 'INFO'),
+            item_mode=env.get('EVENT_LOG_ITEMS', 'sample'),
+            sample_every=int(env.get('EVENT_LOG_SAMPLE', 100)),
+            console=env.get('EVENT_LOG_CONSOLE', '1') != '0'
+        )
+
+    def start(self):
+        """Подключить очередь и поток записи (вызывается автоматически при первом событии)"""
+        with self._lock:
+            if self._listener is not None:
+                return
+            handlers = []
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                file_handler = logging.FileHandler(self.path, encoding='utf-8')
+                file_handler.setFormatter(JsonLinesFormatter())
+                handlers.append(file_handler)
+            if self.console:
+                console_handler = logging.StreamHandler(sys.stdout)
+                console_handler.setFormatter(logging.Formatter('%(message)s'))
+                handlers.append(console_handler)
+            records = queue.SimpleQueue()
+            self.logger.addHandler(logging.handlers.QueueHandler(records))
+            self._listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=False)
+            self._listener.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Дописать очередь и остановить поток записи"""
+        with self._lock:
+            if self._listener is None:
+                return
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self.logger.handlers.clear()
+            self._listener = None
+
+    def emit(self, level: int, event: str, message: str, fields: Dict):
+        if not self.logger.isEnabledFor(level):
+            return
+        if self._listener is None:
+            self.start()
+        # Аргументы не передаются: сообщение уже готово, getMessage не должен его форматировать
+        self.logger.log(level, message, extra={'event': event, 'fields': fields})
+
+    def bind(self, **context) -> 'BoundEventLog':
+        """Журнал с полями, добавляемыми к каждому событию (например, job_id)"""
+        return BoundEventLog(self, context)
+
+
+class BoundEventLog:
+    """
+    Журнал одной задачи: общие поля и свои счетчики событий по элементам
+
+    Сообщение - шаблон str.format, поля события подставляются в него только
+    если событие действительно пишется (в режиме summary шаблон не форматируется).
+    """
+
+    def __init__(self, log: EventLog, context: Dict):
+        self.log = log
+        self.context = {key: value for key, value in context.items() if value is not None}
+        self.counts = Counter()  # {(событие, result): количество}
+        self._seen = Counter()   # {событие: количество} для выборки
+
+    def _emit(self, level: int, event: str, message: str, fields: Dict):
+        if fields:
+            try:
+                message = message.format(**fields)
+            except (KeyError, IndexError, ValueError):
+                pass
+        self.log.emit(level, event, message, {**self.context, **fields})
+
+    def debug(self, event: str, message: str = '', **fields):
+        self._emit(logging.DEBUG, event, message, fields)
+
+    def info(self, event: str, message: str = '', **fields):
+        self._emit(logging.INFO, event, message, fields)
+
+    def warning(self, event: str, message: str = '', **fields):
+        self._emit(logging.WARNING, event, message, fields)
+
+    def error(self, event: str, message: str = '', **fields):
+        self._emit(logging.ERROR, event, message, fields)
+
+    def item(self, event: str, message: str = '', level: int = logging.INFO, **fields):
+        """Событие по одному элементу: всегда учитывается в счетчиках, пишется по режиму журнала"""
+        self.counts[(event, fields.get('result'))] += 1
+        if level < logging.WARNING:
+            mode = self.log.item_mode
+            if mode == 'summary':
+                return
+            if mode == 'sample':
+                self._seen[event] += 1
+                seen = self._seen[event]
+                if seen % self.log.sample_every != 1 and self.log.sample_every > 1:
+                    return
+                fields['sampled'] = seen
+        self._emit(level, event, message, fields)
+
+    def summary(self, event: str = 'summary', message: str = '', **fields):
+        """Записать накопленные счетчики событий по элементам и обнулить их"""
+        counts = {}
+        for (name, result), count in sorted(self.counts.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            counts[f'{name}.{result}' if result is not None else name] = count
+        self.counts.clear()
+        self._seen.clear()
+        if not message:
+            message = '📊 ' + ', '.join(f'{name}: {count}' for name, count in counts.items())
+        self._emit(logging.INFO, event, message, {**fields, 'counts': counts})
+
+
+# Общий журнал процесса
+events = EventLog.from_env()
@@ -0,0 +1,99 @@
+"""
+Локальная заглушка Redis для хранилища сессий
+Реализует в памяти процесса те команды redis.Redis, которые использует
+RedisSessionStore (get, set с ex, setex, expire, ttl, exists, delete), чтобы
+SESSION_BACKEND = 'redis' можно было запустить и проверить без сервера и пакета
+redis: SESSION_REDIS_URL = 'fake://'.
+
+Как и redis-py без decode_responses, значения возвращаются в bytes. Просроченные
+ключи удаляются при обращении, время берется из clock (по умолчанию time.monotonic).
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class FakeRedis:
+    """Подмножество команд redis.Redis над словарем {ключ: (значение, срок)}"""
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Args:
+            clock: Источник времени в секундах (в тестах - управляемые часы)
+        """
+        self._clock = clock
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'FakeRedis':
+        return cls()
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        # redis-py так же переводит str и числа в bytes
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, (int, float)):
+            value = repr(value)
+        return str(value).encode('utf-8')
+
+    @staticmethod
+    def _seconds(value) -> int:
+        seconds = int(value)
+        if seconds <= 0:
+            raise ValueError('invalid expire time')  # Redis отвечает ошибкой на EX <= 0
+        return seconds
+
+    def _live(self, name: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        item = self._data.get(name)
+        if item is not None and item[1] is not None and item[1] <= self._clock():
+            del self._data[name]
+            return None
+        return item
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._live(name)
+            return item[0] if item else None
+
+    def set(self, name: str, value, ex=None) -> bool:
+        expires_at = self._clock() + self._seconds(ex) if ex is not None else None
+        with self._lock:
+            self._data[name] = (self._encode(value), expires_at)
+        return True
+
+    def setex(self, name: str, time, value) -> bool:
+        return self.set(name, value, ex=time)
+
+    def expire(self, name: str, time) -> bool:
+        seconds = self._seconds(time)
+        with self._lock:
+            item = self._live(name)
+            if item is None:
+                return False
+            self._data[name] = (item[0], self._clock() + seconds)
+            return True
+
+    def ttl(self, name: str) -> int:
+        """Оставшийся срок в секундах: -2 - ключа нет, -1 - без срока"""
+        with self._lock:
+            item = self._live(name)
+            if item is None:
+                return -2
+            if item[1] is None:
+                return -1
+            return max(0, round(item[1] - self._clock()))
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._live(name) is not None)
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def dbsize(self) -> int:
+        """Количество ключей, включая просроченные, до которых еще не дошло обращение"""
+        return len(self._data)
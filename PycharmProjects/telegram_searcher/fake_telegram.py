@@ -0,0 +1,291 @@
+"""
+Локальная имитация Telegram для офлайн-замеров и проверок без аккаунта
+
+FakeTelegramClient реализует ту часть интерфейса TelegramClient, которой
+пользуется TelegramSearcher:
+    await client(SearchRequest | GetFullChannelRequest | GetFullChatRequest |
+                 GetParticipantRequest | JoinChannelRequest | GetForumTopicsRequest)
+    await client.start() / connect() / disconnect() / get_me() / get_entity(...)
+    await client.send_message(...) / send_file(...)
+    async for ... in client.iter_dialogs(...) / iter_participants(...)
+
+Группы и каналы - настоящие объекты telethon Channel/Chat, поэтому все проверки
+isinstance в коде работают без изменений. Набор сущностей, результаты поиска,
+задержки и ошибки детерминированы и зависят только от seed.
+
+Включается переменной окружения TELEGRAM_BACKEND=fake (см. create_client в
+telegram_searcher.py), параметры - переменные TELEGRAM_FAKE_* (см. from_env).
+"""
+
+import asyncio
+import os
+import random
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Union
+
+from telethon.errors import (
+    ChatWriteForbiddenError, FloodWaitError, InviteRequestSentError,
+    UserNotParticipantError, UsernameNotOccupiedError
+)
+from telethon.tl.types import Channel, Chat, ChannelParticipantSelf, User
+from telethon.tl.types.contacts import Found
+
+
+FAKE_ME_ID = 777000001
+
+# Участников на страницу iter_participants (как GetParticipantsRequest в telethon)
+PARTICIPANTS_PAGE = 200
+
+
+class FakeTelegramClient:
+    """Клиент Telegram, работающий в памяти процесса"""
+
+    def __init__(self, entities: int = 5000, results_per_query: int = 20, seed: int = 0,
+                 latency: Union[float, Dict[str, float]] = 0.0, latency_jitter: float = 0.0,
+                 error_rate: float = 0.0, flood_rate: float = 0.0, flood_seconds: int = 5,
+                 error_requests: Iterable[str] = None, member_ratio: float = 0.5,
+                 approval_ratio: float = 0.3, read_only_ratio: float = 0.1):
+        """
+        Args:
+            entities: Количество групп и каналов в имитируемом Telegram
+            results_per_query: Сколько чатов возвращает один SearchRequest (не больше limit запроса)
+            seed: Зерно генератора (одинаковый seed - одинаковые данные и ошибки)
+            latency: Задержка ответа в секундах, общая или по имени запроса
+                ({'SearchRequest': 0.2, 'get_entity': 0.05, ...})
+            latency_jitter: Случайная добавка к задержке (0..latency_jitter)
+            error_rate: Доля запросов, завершающихся сетевой ошибкой (ConnectionError)
+            flood_rate: Доля запросов, завершающихся FloodWaitError
+            flood_seconds: Значение seconds у FloodWaitError
+            error_requests: Имена запросов, к которым применяются ошибки (None - ко всем)
+            member_ratio: Доля чатов, в которых аккаунт уже состоит
+            approval_ratio: Доля каналов, где вступление требует одобрения
+            read_only_ratio: Доля каналов, где участникам запрещено писать
+        """
+        self.seed = seed
+        self.results_per_query = results_per_query
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.error_requests = set(error_requests) if error_requests else None
+
+        self.calls = Counter()  # {имя запроса: количество}
+        self.me = User(id=FAKE_ME_ID, is_self=True, first_name='Fake', username='fake_me')
+        self._rng = random.Random(f'{seed}:runtime')
+        self._message_id = 0
+        self._connected = False
+
+        self._entities: List = []
+        self._by_id: Dict[int, object] = {}
+        self._by_username: Dict[str, object] = {}
+        self._members = set()
+        self._needs_approval = set()
+        self._read_only = set()
+        self._generate(entities, member_ratio, approval_ratio, read_only_ratio)
+
+    @classmethod
+    def from_env(cls) -> 'FakeTelegramClient':
+        """Создать клиент по переменным окружения TELEGRAM_FAKE_*"""
+        env = os.environ
+        return cls(
+            entities=int(env.get('TELEGRAM_FAKE_ENTITIES', 5000)),
+            results_per_query=int(env.get('TELEGRAM_FAKE_RESULTS', 20)),
+            seed=int(env.get('TELEGRAM_FAKE_SEED', 0)),
+            latency=float(env.get('TELEGRAM_FAKE_LATENCY', 0.0)),
+            latency_jitter=float(env.get('TELEGRAM_FAKE_JITTER', 0.0)),
+            error_rate=float(env.get('TELEGRAM_FAKE_ERROR_RATE', 0.0)),
+            flood_rate=float(env.get('TELEGRAM_FAKE_FLOOD_RATE', 0.0)),
+            flood_seconds=int(env.get('TELEGRAM_FAKE_FLOOD_SECONDS', 5))
+        )
+
+    def _generate(self, count: int, member_ratio: float, approval_ratio: float, read_only_ratio: float):
+        rng = random.Random(f'{self.seed}:entities')
+        date = datetime(2024, 1, 1)
+        for i in range(count):
+            entity_id = 1000000 + i
+            kind = rng.random()
+            username = f'fake_chat_{i}' if rng.random() < 0.7 else None
+            participants = int(rng.paretovariate(1.2) * 50)
+
+            if kind < 0.15:
+                entity = Chat(id=entity_id, title=f'Чат {i}', photo=None, participants_count=participants,
+                              date=date, version=1)
+                username = None  # У обычных чатов нет username
+            else:
+                broadcast = kind < 0.45
+                entity = Channel(id=entity_id, title=f'{"Канал" if broadcast else "Группа"} {i}', photo=None,
+                                 date=date, broadcast=broadcast, megagroup=not broadcast,
+                                 access_hash=rng.getrandbits(63), username=username,
+                                 participants_count=participants)
+                if rng.random() < approval_ratio:
+                    self._needs_approval.add(entity_id)
+                if rng.random() < read_only_ratio:
+                    self._read_only.add(entity_id)
+
+            if rng.random() < member_ratio:
+                self._members.add(entity_id)
+            self._entities.append(entity)
+            self._by_id[entity_id] = entity
+            if username:
+                self._by_username[username.lower()] = entity
+
+    async def _simulate(self, name: str, request=None):
+        """Учет вызова, задержка и внедрение ошибок"""
+        self.calls[name] += 1
+
+        latency = self.latency.get(name, 0.0) if isinstance(self.latency, dict) else self.latency
+        if self.latency_jitter:
+            latency += self._rng.uniform(0, self.latency_jitter)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+        if self.error_requests is None or name in self.error_requests:
+            roll = self._rng.random()
+            if roll < self.flood_rate:
+                raise FloodWaitError(request, capture=self.flood_seconds)
+            if roll < self.flood_rate + self.error_rate:
+                raise ConnectionError(f'Имитация сетевой ошибки ({name})')
+
+    def _resolve(self, entity) -> Optional[object]:
+        if isinstance(entity, (Channel, Chat)):
+            return self._by_id.get(entity.id)
+        if isinstance(entity, int):
+            return self._by_id.get(entity)
+        entity_id = getattr(entity, 'id', None)
+        return self._by_id.get(entity_id) if entity_id is not None else None
+
+    # --- Интерфейс TelegramClient ---
+
+    async def start(self, *args, **kwargs):
+        await self._simulate('start')
+        self._connected = True
+        return self
+
+    async def connect(self):
+        self._connected = True
+
+    async def disconnect(self):
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def get_me(self):
+        await self._simulate('get_me')
+        return self.me
+
+    async def get_entity(self, entity):
+        await self._simulate('get_entity')
+        if isinstance(entity, str):
+            username = entity.strip().split('/')[-1].lstrip('@').lower()
+            found = self._by_username.get(username)
+            if found is None:
+                raise UsernameNotOccupiedError(request=None)
+            return found
+        found = self._resolve(entity)
+        if found is None:
+            raise ValueError(f'Could not find the input entity for {entity!r}')
+        return found
+
+    async def iter_dialogs(self, limit: int = None, **kwargs):
+        self.calls['iter_dialogs'] += 1
+        joined = [entity for entity in self._entities if entity.id in self._members]
+        for entity in joined[:limit]:
+            await self._simulate('iter_dialogs.item')
+            yield SimpleNamespace(id=entity.id, entity=entity, name=entity.title)
+
+    async def iter_participants(self, entity, limit: int = None, **kwargs):
+        # Как в telethon: участники приходят страницами, задержка и ошибки - на каждую страницу
+        entity = self._resolve(entity)
+        count = (entity.participants_count or 0) if entity is not None else 0
+        if limit is not None:
+            count = min(count, limit)
+        users = []
+        if entity is not None and entity.id in self._members and count:
+            users.append(self.me)
+        users.extend(User(id=entity.id * 1000 + i, first_name=f'User {i}') for i in range(count - len(users)))
+        offset = 0
+        while True:
+            await self._simulate('iter_participants')
+            page = users[offset:offset + PARTICIPANTS_PAGE]
+            for user in page:
+                yield user
+            offset += len(page)
+            if len(page) < PARTICIPANTS_PAGE:
+                return
+
+    async def send_message(self, entity, message, **kwargs):
+        await self._simulate('send_message')
+        return self._send(entity)
+
+    async def send_file(self, entity, file, caption=None, **kwargs):
+        await self._simulate('send_file')
+        return self._send(entity)
+
+    def _send(self, entity):
+        entity = self._resolve(entity)
+        if entity is None or entity.id not in self._members or entity.id in self._read_only:
+            raise ChatWriteForbiddenError(request=None)
+        self._message_id += 1
+        return SimpleNamespace(id=self._message_id, peer_id=entity.id, date=datetime.now())
+
+    async def __call__(self, request):
+        name = type(request).__name__
+        await self._simulate(name, request)
+        handler = getattr(self, f'_handle_{name}', None)
+        if handler is None:
+            raise NotImplementedError(f'FakeTelegramClient не поддерживает {name}')
+        return handler(request)
+
+    # --- Обработчики запросов ---
+
+    def _handle_SearchRequest(self, request):
+        rng = random.Random(f'{self.seed}:search:{request.q}')
+        count = min(self.results_per_query, request.limit or self.results_per_query, len(self._entities))
+        chats = rng.sample(self._entities, count)
+        return Found(my_results=[], results=[], chats=chats, users=[])
+
+    def _full_info(self, entity):
+        banned = SimpleNamespace(send_messages=entity.id in self._read_only)
+        full_chat = SimpleNamespace(
+            id=entity.id,
+            participants_count=entity.participants_count,
+            default_banned_rights=banned
+        )
+        return SimpleNamespace(full_chat=full_chat, chats=[entity], users=[])
+
+    def _handle_GetFullChannelRequest(self, request):
+        entity = self._resolve(request.channel)
+        if entity is None:
+            raise ValueError('Channel not found')
+        return self._full_info(entity)
+
+    def _handle_GetFullChatRequest(self, request):
+        entity = self._by_id.get(request.chat_id)
+        if entity is None:
+            raise ValueError('Chat not found')
+        return self._full_info(entity)
+
+    def _handle_GetParticipantRequest(self, request):
+        entity = self._resolve(request.channel)
+        if entity is None or entity.id not in self._members:
+            raise UserNotParticipantError(request=request)
+        return SimpleNamespace(
+            participant=ChannelParticipantSelf(user_id=self.me.id, inviter_id=0, date=datetime(2024, 1, 1)),
+            chats=[entity], users=[self.me]
+        )
+
+    def _handle_JoinChannelRequest(self, request):
+        entity = self._resolve(request.channel)
+        if entity is None:
+            raise ValueError('Channel not found')
+        if entity.id in self._needs_approval:
+            raise InviteRequestSentError(request=request)
+        self._members.add(entity.id)
+        return SimpleNamespace(chats=[entity], users=[])
+
+    def _handle_GetForumTopicsRequest(self, request):
+        return SimpleNamespace(topics=[], count=0)
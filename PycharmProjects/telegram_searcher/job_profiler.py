@@ -0,0 +1,279 @@
+"""
+Профилирование задач по запросу
+Включается для отдельной задачи параметром profile при запуске
+('cprofile' или 'sampling') и работает в потоке event loop этой задачи:
+
+    cprofile - cProfile потока задачи: .pstats (pstats / snakeviz) и текстовая сводка
+    sampling - периодический снимок стека потока задачи (sys._current_frames):
+               .folded (flamegraph.pl, speedscope), .svg (флеймграф) и текстовая сводка
+
+В обоих режимах фоновый поток периодически снимает стеки asyncio-задач цикла,
+последние снимки попадают в текстовую сводку; текущий снимок доступен через
+task_dump(). Файлы сохраняются в results/ рядом с результатами задачи
+"""
+
+import asyncio
+import cProfile
+import html
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+MODES = ('cprofile', 'sampling')
+
+# Интервал между снимками стека в режиме sampling, секунды
+SAMPLE_INTERVAL = 0.005
+# Как часто снимать стеки asyncio-задач и сколько последних снимков хранить
+TASK_DUMP_INTERVAL = 30.0
+TASK_DUMPS_KEPT = 5
+# Сколько строк выводить в текстовой сводке
+SUMMARY_LINES = 40
+
+
+def format_tasks(loop) -> str:
+    """Стеки всех незавершенных asyncio-задач цикла (можно вызывать из другого потока)"""
+    try:
+        tasks = asyncio.all_tasks(loop)
+    except RuntimeError as e:
+        return f'Не удалось получить задачи: {e}'
+    lines = [f'{datetime.now().isoformat(timespec="seconds")} - задач: {len(tasks)}']
+    for task in tasks:
+        coro = task.get_coro()
+        lines.append(f'  {task.get_name()}: {getattr(coro, "__qualname__", coro)}')
+        for frame in task.get_stack(limit=20):
+            code = frame.f_code
+            lines.append(f'      {os.path.basename(code.co_filename)}:{frame.f_lineno} в {code.co_name}')
+    return '\n'.join(lines)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class JobProfiler:
+    """Профилировщик одной задачи (start/stop вызываются в потоке задачи)"""
+
+    def __init__(self, job_id: str, mode: str, loop=None, output_dir: str = 'results',
+                 interval: float = SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f'Неизвестный режим профилирования: {mode} (доступны: {", ".join(MODES)})')
+        self.job_id = job_id
+        self.mode = mode
+        self.loop = loop
+        self.output_dir = output_dir
+        self.interval = interval
+        self.files: List[str] = []
+        self.running = False
+        self.samples = Counter()  # {'a:f;b:g': количество снимков}
+        self.task_dumps: List[str] = []
+        self._thread_id = None
+        self._profile = None
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError as e:
+                # В Python 3.12+ одновременно может работать только один cProfile
+                print(f"⚠️ cProfile недоступен ({e}), профилирую снимками стека")
+                self._profile = None
+                self.mode = 'sampling'
+        self.running = True
+        self._sampler = threading.Thread(target=self._background, name=f'profiler-{self.job_id}', daemon=True)
+        self._sampler.start()
+
+    def _background(self):
+        """Снимки стека (sampling) и периодические снимки asyncio-задач"""
+        next_dump = time.monotonic() + TASK_DUMP_INTERVAL
+        wait = self.interval if self.mode == 'sampling' else 0.5
+        while not self._stop.wait(wait):
+            if self.mode == 'sampling':
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is not None:
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    self.samples[';'.join(reversed(stack))] += 1
+            if self.loop is not None and time.monotonic() >= next_dump:
+                next_dump = time.monotonic() + TASK_DUMP_INTERVAL
+                self.task_dumps.append(format_tasks(self.loop))
+                del self.task_dumps[:-TASK_DUMPS_KEPT]
+
+    def task_dump(self) -> str:
+        if self.loop is None:
+            return 'Цикл задачи неизвестен'
+        return format_tasks(self.loop)
+
+    def stop(self) -> List[str]:
+        """Остановить профилирование и сохранить файлы, вернуть их имена"""
+        if self._profile is not None:
+            self._profile.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=2)
+        self.running = False
+        elapsed = time.perf_counter() - self._started
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = f'profile_{self.job_id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        summary = [f'Профиль задачи {self.job_id}: режим {self.mode}, {elapsed:.1f} с', '']
+
+        if self._profile is not None:
+            self._profile.dump_stats(self._path(f'{base}.pstats'))
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+            summary.append(stream.getvalue())
+        else:
+            folded = '\n'.join(f'{stack} {count}' for stack, count in sorted(self.samples.items()))
+            with open(self._path(f'{base}.folded'), 'w', encoding='utf-8') as f:
+                f.write(folded + '\n')
+            with open(self._path(f'{base}.svg'), 'w', encoding='utf-8') as f:
+                f.write(render_flamegraph(self.samples, f'Задача {self.job_id}'))
+            summary += self._sampling_summary()
+
+        if self.task_dumps:
+            summary += ['', 'Снимки asyncio-задач:', ''] + self.task_dumps
+        with open(self._path(f'{base}.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(summary) + '\n')
+        return self.files
+
+    def _path(self, filename: str) -> str:
+        self.files.append(filename)
+        return os.path.join(self.output_dir, filename)
+
+    def _sampling_summary(self) -> List[str]:
+        total = sum(self.samples.values())
+        if not total:
+            return ['Снимков нет']
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        lines = [f'Снимков: {total} (каждые {self.interval * 1000:.0f} мс)', '',
+                 f'{"собств. %":>10}{"всего %":>10}  функция']
+        for label, count in own.most_common(SUMMARY_LINES):
+            lines.append(f'{count / total * 100:>10.1f}{inclusive[label] / total * 100:>10.1f}  {label}')
+        return lines
+
+
+def render_flamegraph(samples: Counter, title: str = '', width: int = 1200) -> str:
+    """Флеймграф в SVG из свернутых стеков {'a;b;c': количество}"""
+    root = {'count': 0, 'children': {}}
+    for stack, count in samples.items():
+        node = root
+        node['count'] += count
+        for label in stack.split(';'):
+            node = node['children'].setdefault(label, {'count': 0, 'children': {}})
+            node['count'] += count
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node['children'].values()), default=0)
+
+    row = 16
+    levels = depth(root)
+    height = (levels + 2) * row
+    total = root['count'] or 1
+    scale = width / total
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+        f'<text x="4" y="{row - 4}">{html.escape(title)} ({root["count"]} снимков)</text>'
+    ]
+
+    def draw(node, label, x, level):
+        node_width = node['count'] * scale
+        if node_width < 0.5:
+            return
+        y = height - (level + 1) * row
+        hue = zlib.crc32(label.encode('utf-8')) % 60
+        percent = node['count'] / total * 100
+        parts.append(
+            f'<g><title>{html.escape(label)} - {node["count"]} ({percent:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" height="{row - 1}" fill="hsl({hue},85%,60%)"/>'
+        )
+        if node_width > 40:
+            chars = int(node_width / 7)
+            text = label if len(label) <= chars else label[:max(chars - 2, 1)] + '..'
+            parts.append(f'<text x="{x + 2:.1f}" y="{y + row - 4}">{html.escape(text)}</text>')
+        parts.append('</g>')
+        offset = x
+        for child_label, child in sorted(node['children'].items()):
+            draw(child, child_label, offset, level + 1)
+            offset += child['count'] * scale
+
+    draw(root, 'all', 0.0, 0)
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+# Профилировщики работающих задач и файлы завершенных
+_active: Dict[str, JobProfiler] = {}
+_finished: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+MAX_FINISHED = 100
+
+
+@contextmanager
+def profile_job(job_id: str, mode: Optional[str], loop=None, output_dir: str = 'results'):
+    """
+    Профилировать блок кода в потоке задачи (при пустом mode ничего не делает)
+
+        with profile_job(job_id, profile, loop):
+            loop.run_until_complete(main())
+    """
+    if not mode:
+        yield None
+        return
+    profiler = JobProfiler(job_id, mode, loop, output_dir)
+    with _lock:
+        _active[job_id] = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        result = {'mode': profiler.mode, 'running': False, 'files': []}
+        try:
+            result['files'] = profiler.stop()
+        except Exception as e:
+            result['error'] = f'Не удалось сохранить профиль: {e}'
+        with _lock:
+            _active.pop(job_id, None)
+            _finished[job_id] = result
+            while len(_finished) > MAX_FINISHED:
+                _finished.popitem(last=False)
+
+
+def status(job_id: str) -> Optional[Dict]:
+    """Состояние профилирования задачи для статуса (None - не профилировалась)"""
+    if not job_id:
+        return None
+    with _lock:
+        profiler = _active.get(job_id)
+        if profiler is not None:
+            return {'mode': profiler.mode, 'running': True, 'files': []}
+        return _finished.get(job_id)
+
+
+def task_dump(job_id: str) -> Optional[str]:
+    """Текущие стеки asyncio-задач профилируемой задачи (None - задача не профилируется)"""
+    with _lock:
+        profiler = _active.get(job_id)
+    return profiler.task_dump() if profiler is not None else None
@@ -0,0 +1,205 @@
+"""
+Глобальный планировщик задач, работающих с Telegram
+Ограничивает число одновременных задач на аккаунт и распределяет очередь честно между сессиями
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+
+class Job:
+    """Задача в очереди планировщика"""
+
+    def __init__(self, job_id: str, job_type: str, session_id: str, target: Callable, args: tuple):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.session_id = session_id
+        self.target = target
+        self.args = args
+        self.status = 'queued'  # queued / running / done / cancelled
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+
+class JobScheduler:
+    """
+    Планировщик задач с ограничением параллельности
+
+    - не более max_concurrent задач выполняются одновременно (все они используют
+      один аккаунт Telegram);
+    - не более per_session_limit задач одной сессии выполняются одновременно;
+    - у каждого типа задач своя очередь, типы обслуживаются по кругу;
+    - внутри типа сессии обслуживаются по кругу (round-robin), поэтому одна сессия
+      с десятком задач не блокирует остальных.
+    """
+
+    def __init__(self, job_types: List[str], max_concurrent: int = 2, per_session_limit: int = 1):
+        """
+        Args:
+            job_types: Типы задач (для каждого создается отдельная очередь)
+            max_concurrent: Максимум одновременно выполняемых задач
+            per_session_limit: Максимум одновременно выполняемых задач одной сессии
+        """
+        self.job_types = list(job_types)
+        self.max_concurrent = max_concurrent
+        self.per_session_limit = per_session_limit
+
+        self._queues = {job_type: OrderedDict() for job_type in self.job_types}  # {type: {session_id: deque[Job]}}
+        self._type_cursor = 0
+        self._jobs: Dict[str, Job] = {}
+        self._running_by_session: Dict[str, int] = {}
+        self._running = 0
+        self._cond = threading.Condition()
+
+        for i in range(max_concurrent):
+            worker = threading.Thread(target=self._worker, name=f'job-worker-{i + 1}')
+            worker.daemon = True
+            worker.start()
+
+    def new_job_id(self, job_type: str) -> str:
+        """
+        ID для будущей задачи
+
+        Выдается до submit(), чтобы вызывающий код сохранил его в статусе задачи
+        и передал в функцию задачи раньше, чем ее может запустить свободный воркер.
+        ID уникален между перезапусками и процессами: по нему строки индекса
+        результатов (results_index.sqlite3) разных запусков не смешиваются.
+        """
+        return f'{job_type}_{time.strftime("%Y%m%d_%H%M%S")}_{uuid.uuid4().hex[:8]}'
+
+    def submit(self, job_type: str, session_id: str, target: Callable, *args, job_id: str = None) -> Job:
+        """
+        Поставить задачу в очередь
+
+        Args:
+            job_type: Тип задачи (один из job_types)
+            session_id: Сессия, запустившая задачу
+            target: Функция, которая будет выполнена в потоке воркера
+            *args: Аргументы функции
+            job_id: ID из new_job_id() (по умолчанию выдается новый)
+
+        Returns:
+            Объект Job (job_id используется для статуса и отмены)
+        """
+        with self._cond:
+            job = Job(job_id or self.new_job_id(job_type), job_type, session_id, target, args)
+            self._jobs[job.job_id] = job
+            self._queues[job_type].setdefault(session_id, deque()).append(job)
+            self._cond.notify_all()
+            return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Убрать задачу из очереди (только если она еще не запущена)
+
+        Returns:
+            True если задача была отменена
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status != 'queued':
+                return False
+            sessions = self._queues[job.job_type]
+            sessions[job.session_id].remove(job)
+            if not sessions[job.session_id]:
+                del sessions[job.session_id]
+            job.status = 'cancelled'
+            del self._jobs[job_id]
+            return True
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """
+        Позиция задачи в очереди (1 - следующая к запуску)
+
+        Returns:
+            Номер позиции или None, если задача уже запущена или неизвестна
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.status != 'queued':
+                return None
+            for position, queued in enumerate(self._dispatch_order(), start=1):
+                if queued is job:
+                    return position
+            return None
+
+    def stats(self) -> Dict:
+        """Сводка по очередям (для отладки и метрик)"""
+        with self._cond:
+            return {
+                'running': self._running,
+                'max_concurrent': self.max_concurrent,
+                'queued': {
+                    job_type: sum(len(jobs) for jobs in sessions.values())
+                    for job_type, sessions in self._queues.items()
+                }
+            }
+
+    def _dispatch_order(self) -> List[Job]:
+        """Порядок, в котором будут запущены задачи из очереди (без учета лимитов сессий)"""
+        queues = {
+            job_type: [list(jobs) for jobs in sessions.values()]
+            for job_type, sessions in self._queues.items()
+        }
+        order = []
+        type_index = self._type_cursor
+        remaining = sum(len(jobs) for sessions in queues.values() for jobs in sessions)
+        while remaining:
+            job_type = self.job_types[type_index % len(self.job_types)]
+            type_index += 1
+            sessions = queues[job_type]
+            if not sessions:
+                continue
+            jobs = sessions.pop(0)
+            order.append(jobs.pop(0))
+            remaining -= 1
+            if jobs:
+                sessions.append(jobs)
+        return order
+
+    def _next_job(self) -> Optional[Job]:
+        """Выбрать следующую задачу (вызывать под блокировкой)"""
+        for offset in range(len(self.job_types)):
+            type_index = (self._type_cursor + offset) % len(self.job_types)
+            sessions = self._queues[self.job_types[type_index]]
+            for session_id in list(sessions):
+                if self._running_by_session.get(session_id, 0) >= self.per_session_limit:
+                    continue
+                jobs = sessions.pop(session_id)
+                job = jobs.popleft()
+                if jobs:
+                    sessions[session_id] = jobs  # Сессия уходит в конец очереди своего типа
+                self._type_cursor = type_index + 1
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                job.status = 'running'
+                job.started_at = time.time()
+                self._running += 1
+                self._running_by_session[job.session_id] = self._running_by_session.get(job.session_id, 0) + 1
+
+            try:
+                job.target(*job.args)
+            except Exception as e:
+                print(f"❌ Задача {job.job_id} завершилась с ошибкой: {e}")
+            finally:
+                with self._cond:
+                    job.status = 'done'
+                    job.finished_at = time.time()
+                    self._running -= 1
+                    self._running_by_session[job.session_id] -= 1
+                    if not self._running_by_session[job.session_id]:
+                        del self._running_by_session[job.session_id]
+                    self._jobs.pop(job.job_id, None)
+                    self._cond.notify_all()
@@ -0,0 +1,69 @@
+"""
+Матрица поисковых запросов ключевые слова x города
+Каждое ключевое слово и город нормализуется и транслитерируется один раз,
+формы интернируются. Все варианты написания слов сочетаются со всеми
+вариантами городов, поэтому комбинации строятся одним itertools.product по
+плоским спискам форм вместо вложенных циклов по парам. Количество запросов
+известно до построения (для оценки длительности поиска).
+"""
+
+import sys
+from itertools import product
+from typing import Iterator, List
+
+from transliteration import DEFAULT_SCHEME, variants
+
+
+def _normalize(items) -> List[str]:
+    """Обрезать пробелы, убрать пустые и повторы с сохранением порядка"""
+    return list(dict.fromkeys(item.strip() for item in (items or []) if item and item.strip()))
+
+
+def _forms(items: List[str], schemes) -> List[str]:
+    """Все формы (исходные и транслитерации) без повторов, интернированные"""
+    forms = dict.fromkeys(sys.intern(form) for item in items for form in variants(item, schemes))
+    return list(forms)
+
+
+class QueryMatrix:
+    """
+    Набор поисковых запросов: формы ключевых слов, а также "слово город" и
+    "город слово" для каждой формы слова и каждой формы города
+    """
+
+    def __init__(self, keywords: List[str], cities: List[str] = None, schemes=(DEFAULT_SCHEME,)):
+        """
+        Args:
+            keywords: Ключевые слова
+            cities: Города (опционально)
+            schemes: Схемы транслитерации (см. transliteration.py)
+        """
+        self.keywords = _normalize(keywords)
+        self.cities = _normalize(cities)
+        self.schemes = tuple(schemes)
+        self.keyword_forms = _forms(self.keywords, self.schemes)
+        self.city_forms = _forms(self.cities, self.schemes)
+
+    def count(self) -> int:
+        """
+        Количество запросов без построения строк
+
+        Совпадения "слово город" == "город слово" (формы, которые есть в обоих
+        списках) учитываются; случайные совпадения строк из разных пар
+        (например, "a b" + "c" и "a" + "b c") - нет, поэтому это верхняя оценка.
+        """
+        keywords = len(self.keyword_forms)
+        cities = len(self.city_forms)
+        shared = len(set(self.keyword_forms) & set(self.city_forms))
+        return keywords + 2 * keywords * cities - shared * shared
+
+    def __iter__(self) -> Iterator[str]:
+        """Запросы без сортировки (возможны повторы из разных пар, см. count)"""
+        yield from self.keyword_forms
+        if self.city_forms:
+            yield from map(' '.join, product(self.keyword_forms, self.city_forms))
+            yield from map(' '.join, product(self.city_forms, self.keyword_forms))
+
+    def build(self) -> List[str]:
+        """Все запросы без повторов в алфавитном порядке"""
+        return sorted(set(self))
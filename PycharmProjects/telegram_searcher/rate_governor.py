@@ -0,0 +1,275 @@
+"""
+Общий регулятор частоты запросов к Telegram для одного аккаунта
+Все вызовы TelegramSearcher (через InstrumentedClient) берут разрешение у
+регулятора. Для каждого класса запросов (поиск, чтение, поиск по username,
+вступление, отправка) свой token bucket. FloodWait в Telegram действует на
+метод, поэтому он ставит на паузу только свой класс (во всех задачах этого
+аккаунта) и вдвое снижает его частоту. После паузы частота восстанавливается
+постепенно (AIMD), но не выше заданной. Если пауза класса длиннее max_pause,
+запрос завершается FloodPause - задача останавливается, а не пропускает все
+оставшиеся элементы
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from telegram_errors import is_flood
+
+
+# Классы запросов и интервалы между запросами по умолчанию, секунды
+# (0 - без ограничения, пока сервер не ответит FloodWait).
+# resolve - поиск чата по username (ResolveUsername), у Telegram самый строгий лимит
+DEFAULT_INTERVALS = {
+    'search': 1.0,
+    'read': 0.3,
+    'resolve': 2.0,
+    'join': 15.0,
+    'send': 3.0
+}
+# Сколько запросов класса можно выполнить подряд без ожидания
+DEFAULT_BURST = {
+    'search': 1,
+    'read': 5,
+    'resolve': 2,
+    'join': 1,
+    'send': 1
+}
+
+# Имя запроса (тип TL-запроса или метод клиента) -> класс
+REQUEST_CLASSES = {
+    'SearchRequest': 'search',
+    'JoinChannelRequest': 'join',
+    'ImportChatInviteRequest': 'join',
+    'ResolveUsernameRequest': 'resolve',
+    'send_message': 'send',
+    'send_file': 'send',
+    'SendMessageRequest': 'send',
+    'SendMediaRequest': 'send'
+}
+# Вызовы, которые не ограничиваются (подключение к серверу)
+UNTHROTTLED = ('start', 'connect', 'disconnect')
+
+# FloodWait не дольше этого (секунды) обертка клиента повторяет сама, выждав паузу регулятора
+# (как flood_sleep_threshold в telethon); более долгие доходят до вызывающего кода
+SHORT_FLOOD_WAIT = 60.0
+# Сколько раз подряд повторять вызов после короткого FloodWait
+SHORT_FLOOD_RETRIES = 2
+
+# Интервал после FloodWait, если до него ограничения не было
+FLOOD_START_INTERVAL = 1.0
+# Доля частоты (от частоты до FloodWait), на которую она растет после каждого успешного запроса
+RECOVERY_STEP = 0.05
+
+
+def request_class(name: str, target=None) -> Optional[str]:
+    """
+    Класс запроса по имени (None - запрос не ограничивается)
+
+    Args:
+        name: Тип TL-запроса или метод клиента
+        target: Первый аргумент метода клиента (get_entity по строке - поиск по username)
+    """
+    if name in UNTHROTTLED:
+        return None
+    if name == 'get_entity' and isinstance(target, str):
+        return 'resolve'
+    return REQUEST_CLASSES.get(name, 'read')
+
+
+class FloodPause(BaseException):
+    """
+    Пауза FloodWait класса запросов длиннее max_pause: задачу нужно остановить
+
+    Наследуется от BaseException, как asyncio.CancelledError: обработчики ошибок
+    отдельной группы или запроса (except Exception) не должны принять ее за ошибку
+    элемента и перейти к следующему - до конца паузы все они завершатся так же.
+    Ее перехватывает цикл задачи и останавливает задачу с сохранением результатов.
+    """
+
+    def __init__(self, request_cls: str, seconds: float):
+        super().__init__(f'Telegram ограничил запросы {request_cls} еще на {seconds:.0f} с (~{seconds / 60:.0f} мин)')
+        self.request_cls = request_cls
+        self.seconds = seconds
+
+
+class TokenBucket:
+    """Token bucket с резервированием: токен можно взять заранее, тогда вызывающий ждет"""
+
+    __slots__ = ('ceiling', 'rate', 'burst', 'tokens', 'updated', 'recovery', 'floods', 'paused_until')
+
+    def __init__(self, interval: float, burst: int = 1):
+        self.ceiling = 1.0 / interval if interval > 0 else float('inf')  # Максимальная частота, запросов/сек
+        self.rate = self.ceiling
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.recovery = 0.0  # Прибавка частоты за успешный запрос
+        self.floods = 0
+        self.paused_until = 0.0  # Конец паузы FloodWait класса (time.monotonic)
+
+    def reserve(self, now: float) -> float:
+        """Взять токен, вернуть сколько нужно подождать"""
+        if self.rate == float('inf'):
+            return 0.0
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def set_interval(self, interval: float):
+        self.ceiling = 1.0 / interval if interval > 0 else float('inf')
+        self.rate = min(self.rate, self.ceiling) if self.floods else self.ceiling
+
+    def on_flood(self, until: float):
+        """Пауза до until и мультипликативное снижение частоты"""
+        self.floods += 1
+        self.paused_until = max(self.paused_until, until)
+        previous = self.rate if self.rate != float('inf') else 1.0 / FLOOD_START_INTERVAL
+        self.rate = previous / 2
+        self.recovery = previous * RECOVERY_STEP
+        self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        """Аддитивное восстановление частоты до заданной"""
+        if self.rate < self.ceiling:
+            self.rate = min(self.ceiling, self.rate + self.recovery)
+
+    def interval(self) -> float:
+        return 1.0 / self.rate if self.rate != float('inf') else 0.0
+
+    def pause(self, now: float) -> float:
+        return max(0.0, self.paused_until - now)
+
+
+class RateGovernor:
+    """
+    Регулятор частоты запросов одного аккаунта
+
+    Потокобезопасен: задачи выполняются в разных потоках со своими event loop,
+    поэтому регулятор только считает время ожидания, а ждет сам вызывающий.
+    """
+
+    def __init__(self, intervals: Dict[str, float] = None, burst: Dict[str, int] = None,
+                 max_pause: float = 300):
+        """
+        Args:
+            intervals: Интервалы между запросами по классам, секунды (по умолчанию DEFAULT_INTERVALS)
+            burst: Запросов подряд без ожидания по классам (по умолчанию DEFAULT_BURST)
+            max_pause: Если до конца паузы FloodWait класса больше max_pause секунд, запрос сразу
+                завершается FloodPause (задача останавливается)
+        """
+        intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        burst = {**DEFAULT_BURST, **(burst or {})}
+        self.max_pause = max_pause
+        self._lock = threading.Lock()
+        self._buckets = {name: TokenBucket(interval, burst.get(name, 1)) for name, interval in intervals.items()}
+        self.flood_waits = 0
+
+    def set_interval(self, request_cls: str, interval: float):
+        """Задать интервал между запросами класса (например, search из задержки поиска)"""
+        with self._lock:
+            bucket = self._buckets.get(request_cls)
+            if bucket is None:
+                bucket = self._buckets[request_cls] = TokenBucket(interval)
+            else:
+                bucket.set_interval(interval)
+
+    def acquire(self, name: str, target=None) -> tuple:
+        """
+        Разрешение на запрос
+
+        Args:
+            name: Тип TL-запроса или метод клиента
+            target: Первый аргумент метода клиента (см. request_class)
+
+        Returns:
+            (секунд ожидания, причина): причина 'server_wait' - пауза после FloodWait,
+            'delay' - ограничение частоты класса
+
+        Raises:
+            FloodPause: пауза FloodWait класса продлится дольше max_pause
+        """
+        request_cls = request_class(name, target)
+        if request_cls is None:
+            return 0.0, 'delay'
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(request_cls)
+            if bucket is None:
+                bucket = self._buckets[request_cls] = TokenBucket(DEFAULT_INTERVALS['read'], DEFAULT_BURST['read'])
+            pause = bucket.pause(now)
+            if pause > self.max_pause:
+                raise FloodPause(request_cls, pause)
+            wait = bucket.reserve(now + pause)
+        if pause > 0:
+            return pause + wait, 'server_wait'
+        return wait, 'delay'
+
+    def report(self, name: str, error: BaseException = None, target=None):
+        """Результат запроса: успех ускоряет класс, FloodWait ставит класс на паузу"""
+        request_cls = request_class(name, target)
+        if request_cls is None:
+            return
+        with self._lock:
+            bucket = self._buckets.get(request_cls)
+            if error is None:
+                if bucket:
+                    bucket.on_success()
+            elif is_flood(error):
+                self.flood_waits += 1
+                if bucket:
+                    bucket.on_flood(time.monotonic() + error.seconds)
+
+    def snapshot(self) -> Dict:
+        """Текущее состояние: паузы и интервалы по классам"""
+        now = time.monotonic()
+        with self._lock:
+            classes = {
+                name: {
+                    'interval_s': round(bucket.interval(), 3),
+                    'min_interval_s': round(1.0 / bucket.ceiling, 3) if bucket.ceiling != float('inf') else 0.0,
+                    'paused_for_s': round(bucket.pause(now), 1),
+                    'floods': bucket.floods
+                }
+                for name, bucket in self._buckets.items()
+            }
+            return {
+                'paused_for_s': max((state['paused_for_s'] for state in classes.values()), default=0.0),
+                'flood_waits': self.flood_waits,
+                'classes': classes
+            }
+
+
+def _env_intervals() -> Dict[str, float]:
+    """Интервалы из переменных окружения TELEGRAM_RATE_<КЛАСС> (секунды между запросами)"""
+    intervals = {}
+    for name in DEFAULT_INTERVALS:
+        value = os.environ.get(f'TELEGRAM_RATE_{name.upper()}')
+        if value:
+            intervals[name] = float(value)
+    return intervals
+
+
+_governors: Dict[str, RateGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def governor_for(account) -> RateGovernor:
+    """Регулятор аккаунта (один на процесс для каждого аккаунта)"""
+    key = str(account)
+    with _governors_lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = _governors[key] = RateGovernor(
+                _env_intervals(),
+                max_pause=float(os.environ.get('TELEGRAM_MAX_FLOOD_PAUSE', 300))
+            )
+        return governor
+
+
+def all_governors() -> Dict[str, RateGovernor]:
+    with _governors_lock:
+        return dict(_governors)
@@ -0,0 +1,381 @@
+"""
+Индекс результатов поиска и проверки групп в SQLite
+Позволяет постранично читать результаты с фильтрами и сортировкой без повторного
+разбора xlsx файлов при каждом запросе
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from openpyxl import load_workbook
+
+
+# Колонки xlsx -> поля индекса (заголовки из save_to_excel, save_check_results и отчетов)
+HEADER_FIELDS = {
+    'ID': 'entity_id',
+    'Название': 'title',
+    'Username': 'username',
+    'Количество участников': 'members_count',
+    'Количество подписчиков': 'members_count',
+    'Участников': 'members_count',
+    'Ключевое слово': 'keyword',
+    'Статус': 'status',
+    'Сообщение': 'message',
+    'Родительская группа': 'parent_group',
+}
+
+# Текст статуса в файлах проверки -> код статуса
+STATUS_CODES = {
+    '✅ Готово к рассылке': 'ready',
+    '⏳ Требует действий': 'pending',
+    '❌ Недоступно': 'unavailable',
+    '⚠️ Ошибка': 'error',
+    '⏹ Остановлено': 'stopped',
+}
+
+SORT_FIELDS = ('row_num', 'entity_id', 'title', 'username', 'members_count', 'keyword', 'status')
+MAX_PER_PAGE = 500
+
+# Как часто фоновый поток сверяет индекс со всей папкой результатов (секунды)
+SYNC_INTERVAL = 60.0
+
+
+def parse_members(value) -> Optional[int]:
+    """Количество участников из ячейки ('12 345', 12345, 'N/A') в число"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = re.sub(r'[\s ,]', '', str(value))
+    return int(digits) if digits.isdigit() else None
+
+
+def parse_entity_id(value) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, '', 'N/A') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def entity_type_for(filename: str) -> str:
+    """Тип записей в файле по его имени (каналы сохраняются в telegram_channels_*.xlsx)"""
+    return 'channel' if os.path.basename(filename).startswith('telegram_channels') else 'group'
+
+
+class ResultsIndex:
+    """
+    Индекс строк из файлов results/*.xlsx
+
+    Файлы, сохраненные приложением, индексируются сразу из данных в памяти
+    (add_records). Остальные файлы (загруженные, объединенные, созданные до
+    появления индекса) индексирует фоновый поток: сразу после записи через
+    schedule_sync() и раз в SYNC_INTERVAL по всей папке. Файл разбирается
+    заново только если изменились его размер или mtime; чтение (query, files)
+    папку не сканирует и xlsx не разбирает.
+    """
+
+    def __init__(self, path: str = 'results/results_index.sqlite3', results_dir: str = 'results'):
+        """
+        Args:
+            path: Путь к файлу базы данных индекса
+            results_dir: Папка с xlsx файлами результатов
+        """
+        self.path = path
+        self.results_dir = results_dir
+        self._local = threading.local()
+        # Запись строк файла (sync и add_records): иначе фоновый sync может заменить
+        # только что записанные add_records строки и потерять их job_id
+        self._sync_lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._sync_thread = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                job_id TEXT,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rows (
+                file TEXT NOT NULL,
+                row_num INTEGER NOT NULL,
+                job_id TEXT,
+                type TEXT NOT NULL,
+                entity_id INTEGER,
+                title TEXT,
+                username TEXT,
+                members_count INTEGER,
+                keyword TEXT,
+                status TEXT,
+                message TEXT,
+                parent_group TEXT,
+                PRIMARY KEY (file, row_num)
+            );
+            CREATE INDEX IF NOT EXISTS rows_job ON rows (job_id);
+            CREATE INDEX IF NOT EXISTS rows_members ON rows (members_count);
+            CREATE INDEX IF NOT EXISTS rows_status ON rows (status);
+        ''')
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Отдельное соединение на поток - sqlite3 не разрешает делить его между потоками
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _replace_file(self, name: str, rows: List[tuple], job_id: Optional[str], stat: os.stat_result):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM rows WHERE file = ?', (name,))
+            conn.executemany(
+                'INSERT INTO rows (file, row_num, job_id, type, entity_id, title, username, '
+                'members_count, keyword, status, message, parent_group) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO files (name, mtime_ns, size, job_id, row_count, indexed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (name, stat.st_mtime_ns, stat.st_size, job_id, len(rows), time.time())
+            )
+
+    def add_records(self, path: str, records: List[Dict], job_id: str = None, entity_type: str = None):
+        """
+        Проиндексировать только что сохраненный файл по данным из памяти
+
+        Args:
+            path: Путь к сохраненному xlsx файлу
+            records: Записи в том же порядке, что и строки файла
+                (словари с id, title, username, members_count, keyword, check_status, ...)
+            job_id: Задача, создавшая файл
+            entity_type: 'group' или 'channel' (по умолчанию определяется по имени файла)
+        """
+        if not os.path.exists(path):
+            return
+        name = os.path.basename(path)
+        entity_type = entity_type or entity_type_for(name)
+        rows = [
+            (
+                name, row_num, job_id, entity_type,
+                parse_entity_id(record.get('id')),
+                record.get('title'),
+                record.get('username'),
+                parse_members(record.get('members_count')),
+                record.get('keyword'),
+                record.get('check_status'),
+                record.get('check_message'),
+                record.get('parent_group')
+            )
+            for row_num, record in enumerate(records, start=1)
+        ]
+        with self._sync_lock:
+            self._replace_file(name, rows, job_id, os.stat(path))
+
+    def index_file(self, path: str, job_id: str = None):
+        """Разобрать xlsx файл и проиндексировать его строки"""
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        entity_type = entity_type_for(name)
+        rows = []
+
+        wb = load_workbook(path, read_only=True)
+        try:
+            ws = wb.active
+            columns = None
+            for values in ws.iter_rows(values_only=True):
+                if columns is None:
+                    columns = {
+                        HEADER_FIELDS[header]: i
+                        for i, header in enumerate(values) if header in HEADER_FIELDS
+                    }
+                    continue
+                if not any(value not in (None, '') for value in values):
+                    break  # Пустая строка - дальше идет статистика (отчет рассылки)
+
+                def get(field):
+                    i = columns.get(field)
+                    value = values[i] if i is not None and i < len(values) else None
+                    return None if value in ('', 'N/A') else value
+
+                status = get('status')
+                rows.append((
+                    name, len(rows) + 1, job_id, entity_type,
+                    parse_entity_id(get('entity_id')),
+                    str(get('title')) if get('title') is not None else None,
+                    str(get('username')) if get('username') is not None else None,
+                    parse_members(get('members_count')),
+                    str(get('keyword')) if get('keyword') is not None else None,
+                    STATUS_CODES.get(status, status),
+                    str(get('message')) if get('message') is not None else None,
+                    str(get('parent_group')) if get('parent_group') is not None else None
+                ))
+        finally:
+            wb.close()
+
+        self._replace_file(name, rows, job_id, stat)
+
+    def sync(self, filename: str = None):
+        """
+        Привести индекс в соответствие с папкой результатов
+
+        Args:
+            filename: Синхронизировать только этот файл (иначе - всю папку)
+        """
+        with self._sync_lock:
+            conn = self._conn()
+            known = {
+                row['name']: (row['mtime_ns'], row['size'], row['job_id'])
+                for row in conn.execute('SELECT name, mtime_ns, size, job_id FROM files')
+            }
+            if filename:
+                names = [filename]
+            elif os.path.isdir(self.results_dir):
+                names = [name for name in os.listdir(self.results_dir) if name.endswith('.xlsx')]
+            else:
+                names = []
+
+            for name in names:
+                path = os.path.join(self.results_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entry = known.get(name)
+                if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                    continue
+                try:
+                    self.index_file(path, job_id=entry[2] if entry else None)
+                except Exception as e:
+                    print(f"⚠️ Не удалось проиндексировать {name}: {e}")
+
+            # Удаляем из индекса файлы, которых больше нет
+            for name in known:
+                if (filename is None or name == filename) and not os.path.exists(os.path.join(self.results_dir, name)):
+                    with conn:
+                        conn.execute('DELETE FROM rows WHERE file = ?', (name,))
+                        conn.execute('DELETE FROM files WHERE name = ?', (name,))
+
+    def start(self, interval: float = SYNC_INTERVAL):
+        """Запустить фоновую синхронизацию (сначала - вся папка)"""
+        if self._sync_thread is None:
+            self._sync_thread = threading.Thread(target=self._sync_loop, args=(interval,),
+                                                 name='results-index-sync', daemon=True)
+            self._sync_thread.start()
+
+    def schedule_sync(self, filename: str = None):
+        """Переиндексировать файл (или всю папку) в фоновом потоке"""
+        self._pending.put(os.path.basename(filename) if filename else None)
+
+    def _sync_loop(self, interval: float):
+        filename = None
+        while True:
+            try:
+                self.sync(filename)
+            except Exception as e:
+                print(f"⚠️ Ошибка синхронизации индекса результатов: {e}")
+            try:
+                filename = self._pending.get(timeout=interval)
+            except queue.Empty:
+                filename = None
+
+    def query(self, file: str = None, job_id: str = None, entity_type: str = None,
+              min_members: int = None, max_members: int = None, keyword: str = None,
+              status: str = None, sort: str = 'row_num', order: str = 'asc',
+              page: int = 1, per_page: int = 50) -> Dict:
+        """
+        Страница результатов с фильтрами
+
+        Args:
+            file: Имя файла в папке результатов
+            job_id: Задача, создавшая файлы
+            entity_type: 'group' или 'channel'
+            min_members / max_members: Границы количества участников
+            keyword: Подстрока ключевого слова
+            status: Статус проверки (ready, pending, unavailable, error, stopped)
+            sort: Поле сортировки (одно из SORT_FIELDS)
+            order: 'asc' или 'desc'
+            page: Номер страницы (с 1)
+            per_page: Размер страницы (не больше MAX_PER_PAGE)
+
+        Returns:
+            {'items': [...], 'total': int, 'page': int, 'per_page': int, 'pages': int}
+        """
+        conditions = []
+        params = []
+        for column, value in (('file', file), ('job_id', job_id), ('type', entity_type), ('status', status)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if min_members is not None:
+            conditions.append('members_count >= ?')
+            params.append(min_members)
+        if max_members is not None:
+            conditions.append('members_count <= ?')
+            params.append(max_members)
+        if keyword:
+            conditions.append("keyword LIKE ? ESCAPE '\\'")
+            escaped = keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        if sort not in SORT_FIELDS:
+            sort = 'row_num'
+        direction = 'DESC' if str(order).lower() == 'desc' else 'ASC'
+        # Пустые значения всегда в конце, порядок между файлами стабилен
+        order_by = f'{sort} IS NULL, {sort} {direction}, file, row_num'
+
+        per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+        page = max(1, int(page))
+
+        conn = self._conn()
+        total = conn.execute(f'SELECT COUNT(*) FROM rows {where}', params).fetchone()[0]
+        items = [
+            {
+                'file': row['file'],
+                'row': row['row_num'],
+                'job_id': row['job_id'],
+                'type': row['type'],
+                'id': row['entity_id'],
+                'title': row['title'],
+                'username': row['username'],
+                'members_count': row['members_count'],
+                'keyword': row['keyword'],
+                'status': row['status'],
+                'message': row['message'],
+                'parent_group': row['parent_group']
+            }
+            for row in conn.execute(
+                f'SELECT * FROM rows {where} ORDER BY {order_by} LIMIT ? OFFSET ?',
+                params + [per_page, (page - 1) * per_page]
+            )
+        ]
+        return {
+            'items': items,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }
+
+    def files(self, job_id: str = None) -> List[Dict]:
+        """Список проиндексированных файлов (с количеством строк)"""
+        sql = 'SELECT name, job_id, row_count, indexed_at FROM files'
+        params = []
+        if job_id:
+            sql += ' WHERE job_id = ?'
+            params.append(job_id)
+        return [dict(row) for row in self._conn().execute(sql + ' ORDER BY name DESC', params)]
@@ -0,0 +1,300 @@
+"""
+Серверные сессии Flask с низкими накладными расходами
+Заменяет Flask-Session с SESSION_TYPE = 'filesystem': сессии хранятся в памяти
+(LRU с TTL) или, опционально, в SQLite / Redis-совместимом хранилище
+"""
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Словарь сессии, который отмечает себя измененным при любой записи"""
+
+    def __init__(self, initial: Dict = None, sid: str = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class MemorySessionStore:
+    """
+    Хранилище сессий в памяти процесса: LRU с TTL
+
+    Каждое обращение переносит сессию в конец OrderedDict и продлевает срок жизни,
+    поэтому порядок LRU совпадает с порядком истечения срока - очистка просроченных
+    сессий идет с начала словаря и стоит O(количество просроченных).
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        """
+        Args:
+            ttl: Время жизни неактивной сессии в секундах
+            max_entries: Максимальное количество сессий (старые вытесняются)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # {sid: (expires_at, dict)}
+        self._lock = threading.Lock()
+
+    def get(self, sid: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            expires_at, data = item
+            if expires_at <= now:
+                del self._data[sid]
+                return None
+            # Продлеваем срок жизни без копирования данных
+            self._data[sid] = (now + self.ttl, data)
+            self._data.move_to_end(sid)
+            return dict(data)
+
+    def set(self, sid: str, data: Dict):
+        with self._lock:
+            self._data[sid] = (time.monotonic() + self.ttl, dict(data))
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, sid: str):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def prune(self) -> int:
+        """Удалить просроченные сессии. Возвращает количество удаленных"""
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._data:
+                sid, (expires_at, _) = next(iter(self._data.items()))
+                if expires_at > now:
+                    break
+                del self._data[sid]
+                removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteSessionStore:
+    """
+    Хранилище сессий в SQLite (переживает перезапуск сервера)
+
+    Срок жизни продлевается не на каждом запросе, а только когда прошло больше
+    половины TTL - опрос статуса раз в секунду не порождает запись в БД.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        """
+        Args:
+            path: Путь к файлу базы данных
+            ttl: Время жизни неактивной сессии в секундах
+        """
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)')
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Отдельное соединение на поток - sqlite3 не разрешает делить его между потоками
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid: str) -> Optional[Dict]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute('SELECT data, expires_at FROM sessions WHERE sid = ?', (sid,)).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        if expires_at <= now:
+            self.delete(sid)
+            return None
+        if expires_at - now < self.ttl / 2:
+            conn.execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (now + self.ttl, sid))
+            conn.commit()
+        return json.loads(data)
+
+    def set(self, sid: str, data: Dict):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)',
+            (sid, json.dumps(data, ensure_ascii=False), time.time() + self.ttl)
+        )
+        conn.commit()
+
+    def delete(self, sid: str):
+        conn = self._conn()
+        conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+        conn.commit()
+
+    def prune(self) -> int:
+        conn = self._conn()
+        cursor = conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),))
+        conn.commit()
+        return cursor.rowcount
+
+
+class RedisSessionStore:
+    """
+    Хранилище сессий в Redis-совместимом сервере
+
+    Принимает любой клиент с методами get/set(ex=...)/expire/delete
+    (redis.Redis или локальная заглушка fake_redis.FakeRedis). Просроченные ключи
+    удаляет сам сервер.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = 'tgsearcher:session:'):
+        self.client = client
+        self.ttl = max(1, int(ttl))  # Redis принимает срок только в целых секундах больше нуля
+        self.prefix = prefix
+
+    def get(self, sid: str) -> Optional[Dict]:
+        raw = self.client.get(self.prefix + sid)
+        if raw is None:
+            return None
+        self.client.expire(self.prefix + sid, self.ttl)
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        return json.loads(raw)
+
+    def set(self, sid: str, data: Dict):
+        self.client.set(self.prefix + sid, json.dumps(data, ensure_ascii=False), ex=self.ttl)
+
+    def delete(self, sid: str):
+        self.client.delete(self.prefix + sid)
+
+    def prune(self) -> int:
+        return 0
+
+
+class StoreSessionInterface(SessionInterface):
+    """
+    SessionInterface поверх любого из хранилищ выше
+
+    В cookie хранится только случайный идентификатор сессии. Данные пишутся в
+    хранилище и cookie отправляется только если сессия изменилась.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            return
+
+        self.store.set(session.sid, dict(session))
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def _start_pruner(store, interval: float) -> threading.Thread:
+    """Фоновый поток, периодически удаляющий просроченные сессии"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.prune()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name='session-pruner')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def create_session_store(config):
+    """
+    Создать хранилище сессий по настройкам приложения
+
+    Настройки:
+        SESSION_BACKEND: 'memory' (по умолчанию), 'sqlite' или 'redis'
+        SESSION_TTL: время жизни неактивной сессии в секундах
+        SESSION_MAX_ENTRIES: лимит сессий для 'memory'
+        SESSION_SQLITE_PATH: путь к БД для 'sqlite'
+        SESSION_REDIS_URL / SESSION_REDIS_CLIENT: адрес или готовый клиент для 'redis'
+            (fake:// - локальная заглушка fake_redis.FakeRedis в памяти процесса)
+    """
+    backend = config.get('SESSION_BACKEND', 'memory')
+    ttl = float(config.get('SESSION_TTL', 7 * 24 * 3600))
+
+    if backend == 'memory':
+        return MemorySessionStore(ttl, int(config.get('SESSION_MAX_ENTRIES', 10000)))
+    if backend == 'sqlite':
+        return SqliteSessionStore(config.get('SESSION_SQLITE_PATH', 'sessions.sqlite3'), ttl)
+    if backend == 'redis':
+        client = config.get('SESSION_REDIS_CLIENT')
+        url = config.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+        if client is None and url.startswith('fake://'):
+            from fake_redis import FakeRedis
+            client = FakeRedis.from_url(url)
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("Для SESSION_BACKEND = 'redis' установите пакет redis")
+            client = redis.Redis.from_url(url)
+        return RedisSessionStore(client, ttl)
+    raise ValueError(f"Неизвестный SESSION_BACKEND: {backend}")
+
+
+def init_app(app):
+    """Подключить серверные сессии к Flask-приложению и запустить фоновую очистку"""
+    store = create_session_store(app.config)
+    app.session_interface = StoreSessionInterface(store)
+    _start_pruner(store, float(app.config.get('SESSION_PRUNE_INTERVAL', 300)))
+    return store
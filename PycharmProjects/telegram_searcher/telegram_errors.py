@@ -0,0 +1,94 @@
+"""
+Классификация ошибок Telegram
+Сопоставляет типы исключений Telethon с небольшим набором видов ошибок
+(ErrorKind), по которым вызывающий код решает: пропустить, повторить или
+перейти к запасному способу. Разбор текста исключений не нужен - вид
+определяется по типу (результат кэшируется для каждого типа)
+"""
+
+import asyncio
+from enum import Enum
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from telethon.errors import (
+    ChannelInvalidError, ChannelPrivateError, ChannelsTooMuchError, ChatAdminRequiredError,
+    ChatForbiddenError, ChatRestrictedError, ChatSendMediaForbiddenError, ChatWriteForbiddenError,
+    FloodPremiumWaitError, FloodWaitError, InviteHashExpiredError, InviteHashInvalidError,
+    InviteRequestSentError, PeerIdInvalidError, ServerError, SlowModeWaitError, TimedOutError,
+    UserBannedInChannelError, UserChannelsTooMuchError, UserKickedError, UserNotParticipantError,
+    UsernameInvalidError, UsernameNotOccupiedError
+)
+
+
+class ErrorKind(Enum):
+    FLOOD = 'flood'                      # FloodWait: пауза для всего аккаунта
+    SLOW_MODE = 'slow_mode'              # Медленный режим в конкретном чате
+    NOT_PARTICIPANT = 'not_participant'  # Аккаунт не состоит в чате
+    INVALID_USERNAME = 'invalid_username'
+    PRIVATE = 'private'                  # Приватный/недоступный чат, недействительная ссылка
+    APPROVAL_REQUIRED = 'approval_required'  # Заявка на вступление отправлена, ждет одобрения
+    BANNED = 'banned'                    # Аккаунт забанен или исключен
+    WRITE_FORBIDDEN = 'write_forbidden'  # Нет прав на отправку сообщений
+    LIMIT = 'limit'                      # Исчерпан лимит аккаунта (например, число каналов)
+    TRANSIENT = 'transient'              # Сетевая или временная ошибка сервера
+    OTHER = 'other'
+
+
+# Задержка перед повтором после временной ошибки, секунды
+TRANSIENT_RETRY_AFTER = 1.0
+
+_KINDS = (
+    ((FloodWaitError, FloodPremiumWaitError), ErrorKind.FLOOD),
+    ((SlowModeWaitError,), ErrorKind.SLOW_MODE),
+    ((UserNotParticipantError,), ErrorKind.NOT_PARTICIPANT),
+    ((UsernameInvalidError, UsernameNotOccupiedError, PeerIdInvalidError), ErrorKind.INVALID_USERNAME),
+    ((ChannelPrivateError, ChannelInvalidError, ChatForbiddenError,
+      InviteHashExpiredError, InviteHashInvalidError), ErrorKind.PRIVATE),
+    ((InviteRequestSentError,), ErrorKind.APPROVAL_REQUIRED),
+    ((UserBannedInChannelError, UserKickedError), ErrorKind.BANNED),
+    ((ChatWriteForbiddenError, ChatSendMediaForbiddenError, ChatRestrictedError,
+      ChatAdminRequiredError), ErrorKind.WRITE_FORBIDDEN),
+    ((ChannelsTooMuchError, UserChannelsTooMuchError), ErrorKind.LIMIT),
+    ((ServerError, TimedOutError, ConnectionError, asyncio.TimeoutError, TimeoutError), ErrorKind.TRANSIENT),
+)
+
+
+class ErrorInfo(NamedTuple):
+    kind: ErrorKind
+    retry_after: Optional[float]  # Через сколько секунд можно повторить (None - повтор бесполезен)
+    error: BaseException
+
+    @property
+    def retryable(self) -> bool:
+        return self.retry_after is not None
+
+    def describe(self) -> str:
+        """Короткое описание для логов и статусов"""
+        if self.kind in (ErrorKind.FLOOD, ErrorKind.SLOW_MODE):
+            return f'{self.kind.value}: нужно подождать {self.retry_after:.0f} секунд'
+        return f'{self.kind.value}: {self.error}'
+
+
+@lru_cache(maxsize=None)
+def _kind_of(error_type: type) -> ErrorKind:
+    for types, kind in _KINDS:
+        if issubclass(error_type, types):
+            return kind
+    return ErrorKind.OTHER
+
+
+def classify(error: BaseException) -> ErrorInfo:
+    """Вид ошибки и время, через которое имеет смысл повторить запрос"""
+    kind = _kind_of(type(error))
+    if kind in (ErrorKind.FLOOD, ErrorKind.SLOW_MODE):
+        retry_after = float(getattr(error, 'seconds', 0) or 0)
+    elif kind is ErrorKind.TRANSIENT:
+        retry_after = TRANSIENT_RETRY_AFTER
+    else:
+        retry_after = None
+    return ErrorInfo(kind, retry_after, error)
+
+
+def is_flood(error: BaseException) -> bool:
+    return _kind_of(type(error)) is ErrorKind.FLOOD
@@ -4,23 +4,55 @@
 """
 
 import asyncio
+import logging
+import os
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import List, Dict
 
 from telethon import TelegramClient
+from telethon.errors import ChatWriteForbiddenError
 from telethon.tl.types import Channel, Chat
 from telethon.tl.functions.contacts import SearchRequest
 from telethon.tl.functions.channels import GetFullChannelRequest, JoinChannelRequest, GetParticipantRequest, GetForumTopicsRequest
 from telethon.tl.functions.messages import GetFullChatRequest, ImportChatInviteRequest
 from telethon.tl.types import ChannelParticipantSelf, Channel, Chat
-from telethon.errors import UsernameInvalidError, UsernameNotOccupiedError, InviteHashExpiredError, UserBannedInChannelError, FloodWaitError, UserNotParticipantError
 
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill
 
+from api_metrics import InstrumentedClient
+from event_log import events
+from query_matrix import QueryMatrix
+from rate_governor import FloodPause, governor_for
+from telegram_errors import ErrorKind, classify
+from time_budget import TimeBudget
+from transliteration import DEFAULT_SCHEME, transliterate
+
+# Паузы перед проверками участия после JoinChannelRequest, секунды: участие появляется
+# на сервере не сразу, и проверка сразу после вступления может ответить "не участник"
+JOIN_CONFIRM_DELAYS = (1.0, 2.0, 4.0, 8.0)
+
+
+def create_client(session_name: str, api_id: int, api_hash: str):
+    """
+    Создание клиента Telegram
+    
+    TELEGRAM_BACKEND=fake - локальная имитация (fake_telegram.py) для офлайн-замеров,
+    иначе обычный TelegramClient
+    """
+    if os.environ.get('TELEGRAM_BACKEND', 'telethon') == 'fake':
+        from fake_telegram import FakeTelegramClient
+        return FakeTelegramClient.from_env()
+    client = TelegramClient(session_name, api_id, api_hash)
+    # FloodWait не проглатывается внутри telethon, а доходит до регулятора частоты (rate_governor.py):
+    # короткие паузы выдерживает и повторяет вызов InstrumentedClient, долгие - вызывающий код
+    client.flood_sleep_threshold = 0
+    return client
+
 
 class TelegramSearcher:
-    def __init__(self, api_id: int, api_hash: str, session_name: str = 'telegram_session', search_delay: float = 1.0):
+    def __init__(self, api_id: int, api_hash: str, session_name: str = 'telegram_session', search_delay: float = 1.0,
+                 client=None, job_id: str = None, governor=None):
         """
         Инициализация клиента Telegram
         
@@ -28,47 +60,55 @@ class TelegramSearcher:
             api_id: API ID из my.telegram.org
             api_hash: API Hash из my.telegram.org
             session_name: Имя файла сессии (для сохранения авторизации)
-            search_delay: Задержка между поисковыми запросами в секундах (0 = без задержки)
+            search_delay: Минимальный интервал между поисковыми запросами этой задачи в секундах
+                (0 - только ограничения общего регулятора частоты)
+            client: Готовый клиент с интерфейсом TelegramClient (например, FakeTelegramClient);
+                по умолчанию создается через create_client
+            job_id: Задача, к которой относятся вызовы API (для метрик, см. api_metrics.py)
+            governor: Регулятор частоты запросов (по умолчанию общий для аккаунта, см. rate_governor.py)
         """
         self.api_id = api_id
         self.api_hash = api_hash
         self.session_name = session_name
         self.search_delay = search_delay
-        self.client = TelegramClient(session_name, api_id, api_hash)
+        self.job_id = job_id
+        # Учет времени задачи: сеть / обработка / задержки / FloodWait
+        self.budget = TimeBudget()
+        # Общий для всех задач аккаунта регулятор частоты запросов
+        self.governor = governor if governor is not None else governor_for(api_id)
+        # Все вызовы клиента проходят через обертку с метриками и регулятором
+        self.client = InstrumentedClient(
+            client if client is not None else create_client(session_name, api_id, api_hash),
+            job_id=job_id,
+            budget=self.budget,
+            governor=self.governor
+        )
+        # Задержка поиска - интервал только этой задачи: другие задачи аккаунта ее не меняют
+        self.client.pace('search', search_delay)
+        # Журнал событий задачи (события по каждому чату пишутся выборочно, см. event_log.py)
+        self.events = events.bind(job_id=job_id)
         # Хранилище для результатов (для сохранения при прерывании)
         self.current_results = {'groups': [], 'channels': []}
+        # Долгая пауза FloodWait, из-за которой задача остановлена (None - не останавливалась)
+        self.flood_pause = None
     
     @staticmethod
-    def transliterate(text: str) -> str:
+    def transliterate(text: str, scheme: str = DEFAULT_SCHEME) -> str:
         """
         Транслитерация русских букв в английские
         
         Args:
             text: Текст для транслитерации
+            scheme: Схема транслитерации (см. transliteration.py)
             
         Returns:
             Транслитерированный текст
         """
-        translit_map = {
-            'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
-            'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
-            'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
-            'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
-            'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
-            'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'Yo',
-            'Ж': 'Zh', 'З': 'Z', 'И': 'I', 'Й': 'Y', 'К': 'K', 'Л': 'L', 'М': 'M',
-            'Н': 'N', 'О': 'O', 'П': 'P', 'Р': 'R', 'С': 'S', 'Т': 'T', 'У': 'U',
-            'Ф': 'F', 'Х': 'H', 'Ц': 'Ts', 'Ч': 'Ch', 'Ш': 'Sh', 'Щ': 'Sch',
-            'Ъ': '', 'Ы': 'Y', 'Ь': '', 'Э': 'E', 'Ю': 'Yu', 'Я': 'Ya'
-        }
-        
-        result = []
-        for char in text:
-            result.append(translit_map.get(char, char))
-        return ''.join(result)
+        return transliterate(text, scheme)
     
     @staticmethod
-    def generate_search_queries(keywords: List[str], cities: List[str] = None) -> List[str]:
+    def generate_search_queries(keywords: List[str], cities: List[str] = None,
+                                schemes=(DEFAULT_SCHEME,)) -> List[str]:
         """
         Генерирует комбинации поисковых запросов:
         - Оригинальные ключевые слова
@@ -79,56 +119,12 @@ class TelegramSearcher:
         Args:
             keywords: Список ключевых слов
             cities: Список городов (опционально)
+            schemes: Схемы транслитерации (каждая дает свой вариант написания)
             
         Returns:
             Список всех комбинаций для поиска
         """
-        queries: Set[str] = set()
-        
-        # Добавляем оригинальные ключевые слова
-        for keyword in keywords:
-            if keyword.strip():
-                queries.add(keyword.strip())
-        
-        # Добавляем транслитерированные ключевые слова
-        for keyword in keywords:
-            if keyword.strip():
-                translit = TelegramSearcher.transliterate(keyword.strip())
-                if translit != keyword.strip():  # Добавляем только если изменилось
-                    queries.add(translit)
-        
-        # Добавляем комбинации с городами
-        if cities:
-            for keyword in keywords:
-                if not keyword.strip():
-                    continue
-                
-                for city in cities:
-                    if not city.strip():
-                        continue
-                    
-                    # Оригинальное слово + город
-                    queries.add(f"{keyword.strip()} {city.strip()}")
-                    queries.add(f"{city.strip()} {keyword.strip()}")
-                    
-                    # Транслит слова + город
-                    translit_keyword = TelegramSearcher.transliterate(keyword.strip())
-                    if translit_keyword != keyword.strip():
-                        queries.add(f"{translit_keyword} {city.strip()}")
-                        queries.add(f"{city.strip()} {translit_keyword}")
-                    
-                    # Слово + транслит города
-                    translit_city = TelegramSearcher.transliterate(city.strip())
-                    if translit_city != city.strip():
-                        queries.add(f"{keyword.strip()} {translit_city}")
-                        queries.add(f"{translit_city} {keyword.strip()}")
-                    
-                    # Транслит слова + транслит города
-                    if translit_keyword != keyword.strip() and translit_city != city.strip():
-                        queries.add(f"{translit_keyword} {translit_city}")
-                        queries.add(f"{translit_city} {translit_keyword}")
-        
-        return sorted(list(queries))
+        return QueryMatrix(keywords, cities, schemes).build()
         
     async def connect(self):
         """Подключение к Telegram"""
@@ -192,6 +188,20 @@ class TelegramSearcher:
         
         return 0
         
+    def _log_found(self, entity_info: Dict, kind: str):
+        """Событие о найденном чате (kind: 'channel' или 'group')"""
+        if kind == 'channel':
+            template = '  📢 Канал: {title}'
+            members = ' [{members_count:,} подписчиков]'
+        else:
+            template = '  👥 Группа: {title}'
+            members = ' [{members_count:,} участников]'
+        if entity_info.get('username'):
+            template += ' (@{username})'
+        if entity_info.get('members_count', 0) > 0:
+            template += members
+        self.events.item('search.found', template, result=kind, **entity_info)
+    
     async def search_channels_and_groups(self, keywords: List[str], limit_per_keyword: int = 50) -> Dict:
         """
         Поиск групп и каналов по ключевым словам
@@ -210,15 +220,15 @@ class TelegramSearcher:
         # Обновляем текущие результаты в классе (для возможности сохранения при прерывании)
         self.current_results = {'groups': [], 'channels': []}
         
-        print(f"\n🔍 Начинаю поиск по {len(keywords)} ключевым словам...")
+        self.events.info('search.start', '\n🔍 Начинаю поиск по {queries} ключевым словам...', queries=len(keywords))
         
         for keyword in keywords:
-            print(f"\n📝 Ищу: '{keyword}'...")
+            self.events.item('search.query', "\n📝 Ищу: '{keyword}'...", keyword=keyword)
             try:
                 # Метод 1: Поиск через глобальный поиск Telegram
                 try:
                     # Используем SearchRequest для поиска контактов/чатов
-                    results = await self.client(SearchRequest(
+                    results = await self.request_with_retry(SearchRequest(
                         q=keyword,
                         limit=limit_per_keyword
                     ))
@@ -249,43 +259,34 @@ class TelegramSearcher:
                             if result.broadcast:
                                 all_channels.append(entity_info)
                                 self.current_results['channels'].append(entity_info)  # Сохраняем в классе
-                                username_str = f" (@{entity_info['username']})" if entity_info['username'] else ""
-                                members_str = f" [{members_count:,} подписчиков]" if members_count > 0 else ""
-                                print(f"  📢 Канал: {result.title}{username_str}{members_str}")
+                                self._log_found(entity_info, 'channel')
                             else:
                                 all_groups.append(entity_info)
                                 self.current_results['groups'].append(entity_info)  # Сохраняем в классе
-                                username_str = f" (@{entity_info['username']})" if entity_info['username'] else ""
-                                members_str = f" [{members_count:,} участников]" if members_count > 0 else ""
-                                print(f"  👥 Группа: {result.title}{username_str}{members_str}")
+                                self._log_found(entity_info, 'group')
                         elif isinstance(result, Chat):
                             all_groups.append(entity_info)
                             self.current_results['groups'].append(entity_info)  # Сохраняем в классе
-                            members_str = f" [{members_count:,} участников]" if members_count > 0 else ""
-                            print(f"  👥 Группа: {result.title}{members_str}")
+                            self._log_found(entity_info, 'group')
                             
                 except Exception as e:
-                    error_msg = str(e)
-                    # Проверяем, это flood wait?
-                    if "wait of" in error_msg and "seconds" in error_msg:
-                        # Извлекаем время ожидания
-                        try:
-                            wait_seconds = int(error_msg.split("wait of")[1].split("seconds")[0].strip())
-                            wait_minutes = wait_seconds / 60
-                            wait_hours = wait_minutes / 60
-                            print(f"  ⚠️ Flood Wait: Telegram требует подождать {wait_seconds} секунд (~{wait_minutes:.0f} минут, ~{wait_hours:.1f} часов)")
-                            print(f"  💡 Рекомендация: Увеличьте SEARCH_DELAY в config.py до 2.0-3.0 секунд")
-                            print(f"  💡 Или уменьшите количество городов/ключевых слов")
-                            if wait_seconds > 3600:  # Больше часа
-                                print(f"  ⏸️ Пропускаю этот запрос и продолжаю с другими...")
-                                continue
-                        except:
-                            pass
-                    else:
-                        print(f"  ⚠️ Ошибка при поиске через SearchRequest: {e}")
+                    error = classify(e)
+                    if error.kind is ErrorKind.FLOOD:
+                        # Повтор уже был (см. request_with_retry) - поиск по диалогам тоже упрется в паузу
+                        self.events.warning(
+                            'search.flood_wait',
+                            "  ⚠️ Flood Wait: Telegram требует подождать {wait_seconds:.0f} секунд (~{wait_minutes:.0f} минут)\n"
+                            "  💡 Рекомендация: Увеличьте SEARCH_DELAY в config.py до 2.0-3.0 секунд\n"
+                            "  💡 Или уменьшите количество городов/ключевых слов\n"
+                            "  ⏸️ Пропускаю этот запрос и продолжаю с другими...",
+                            keyword=keyword, wait_seconds=error.retry_after, wait_minutes=error.retry_after / 60
+                        )
+                        continue
+                    self.events.item('search.request_error', '  ⚠️ Ошибка при поиске через SearchRequest: {error}',
+                                     keyword=keyword, result=error.kind.value, error=str(e))
                     
                     # Метод 2: Поиск по уже известным диалогам
-                    print(f"  🔄 Пробую альтернативный метод поиска...")
+                    self.events.item('search.fallback', '  🔄 Пробую альтернативный метод поиска...', keyword=keyword)
                     try:
                         async for dialog in self.client.iter_dialogs(limit=200):
                             if not isinstance(dialog.entity, (Channel, Chat)):
@@ -315,35 +316,30 @@ class TelegramSearcher:
                                 if dialog.entity.broadcast:
                                     all_channels.append(entity_info)
                                     self.current_results['channels'].append(entity_info)  # Сохраняем в классе
-                                    username_str = f" (@{entity_info['username']})" if entity_info['username'] else ""
-                                    members_str = f" [{members_count:,} подписчиков]" if members_count > 0 else ""
-                                    print(f"  📢 Канал: {dialog.entity.title}{username_str}{members_str}")
+                                    self._log_found(entity_info, 'channel')
                                 else:
                                     all_groups.append(entity_info)
                                     self.current_results['groups'].append(entity_info)  # Сохраняем в классе
-                                    username_str = f" (@{entity_info['username']})" if entity_info['username'] else ""
-                                    members_str = f" [{members_count:,} участников]" if members_count > 0 else ""
-                                    print(f"  👥 Группа: {dialog.entity.title}{username_str}{members_str}")
+                                    self._log_found(entity_info, 'group')
                             elif isinstance(dialog.entity, Chat):
                                 all_groups.append(entity_info)
                                 self.current_results['groups'].append(entity_info)  # Сохраняем в классе
-                                members_str = f" [{members_count:,} участников]" if members_count > 0 else ""
-                                print(f"  👥 Группа: {dialog.entity.title}{members_str}")
+                                self._log_found(entity_info, 'group')
                     except Exception as e2:
-                        print(f"  ❌ Ошибка при альтернативном поиске: {e2}")
+                        self.events.error('search.fallback_error', '  ❌ Ошибка при альтернативном поиске: {error}',
+                                          keyword=keyword, error=str(e2))
                     
+            except FloodPause as pause:
+                # Остальные запросы до конца паузы завершились бы так же - останавливаем поиск
+                self.flood_pause = pause
+                self.events.warning('search.flood_pause', '  ⏸️ {error}: поиск остановлен, найденное сохраняется',
+                                    keyword=keyword, error=str(pause), wait_seconds=pause.seconds)
+                break
             except Exception as e:
-                print(f"  ❌ Ошибка при поиске '{keyword}': {e}")
-            
-            # Небольшая задержка между запросами (чтобы не получить flood wait)
-            # Можно уменьшить до 0.5-1 секунды, но есть риск получить flood wait
-            delay = getattr(self, 'search_delay', 1.0)
-            if delay > 0:
-                await asyncio.sleep(delay)
+                self.events.error('search.error', "  ❌ Ошибка при поиске '{keyword}': {error}", keyword=keyword, error=str(e))
         
-        print(f"\n✅ Поиск завершен!")
-        print(f"   Найдено групп: {len(all_groups)}")
-        print(f"   Найдено каналов: {len(all_channels)}")
+        self.events.summary('search.summary', '\n✅ Поиск завершен!\n   Найдено групп: {groups}\n   Найдено каналов: {channels}',
+                            groups=len(all_groups), channels=len(all_channels))
         
         # Обновляем финальные результаты в классе
         self.current_results = {
@@ -579,7 +575,9 @@ class TelegramSearcher:
             if username:
                 try:
                     entity = await self.client.get_entity(username)
-                except (UsernameInvalidError, UsernameNotOccupiedError):
+                except Exception as e:
+                    if classify(e).kind is not ErrorKind.INVALID_USERNAME:
+                        raise
                     # Username недействителен или не существует
                     return {
                         'status': 'unavailable',
@@ -590,6 +588,8 @@ class TelegramSearcher:
                 try:
                     entity = await self.client.get_entity(group_id)
                 except Exception as e:
+                    if classify(e).retryable:
+                        raise  # FloodWait и временные ошибки - не признак недоступной группы
                     return {
                         'status': 'unavailable',
                         'message': f'Группа недоступна: {str(e)}',
@@ -617,15 +617,14 @@ class TelegramSearcher:
             
             # Если не участник - ВСЕГДА пытаемся вступить
             if not is_member:
-                print(f"🔍 [{title}] Пользователь НЕ является участником, пытаюсь вступить...")
+                self.events.item('check.join', "🔍 [{title}] Пользователь НЕ является участником, пытаюсь вступить...", title=title, result='attempt')
                 action_taken = await self._join_group(entity, username, title)
-                print(f"📝 [{title}] Результат вступления: {action_taken}")
+                self.events.item('check.join', "📝 [{title}] Результат вступления: {action}", title=title, result='done', action=action_taken)
                 
                 if action_taken == 'joined':
                     # Проверяем еще раз после вступления строгим методом
-                    await asyncio.sleep(3)  # Увеличиваем задержку для синхронизации
                     is_member = await self._check_membership_strict(entity, title)
-                    print(f"✅ [{title}] Проверка после вступления: is_member={is_member}")
+                    self.events.item('check.join', "✅ [{title}] Проверка после вступления: is_member={is_member}", title=title, result='verified', is_member=is_member)
                 
                 # Если все еще не участник после попытки вступления
                 if not is_member:
@@ -635,7 +634,7 @@ class TelegramSearcher:
                         'action_taken': action_taken
                     }
             else:
-                print(f"✅ [{title}] Пользователь УЖЕ является участником группы")
+                self.events.item('check.join', "✅ [{title}] Пользователь УЖЕ является участником группы", title=title, result='member')
             
             # Проверяем возможность отправки сообщений
             if is_member:
@@ -663,6 +662,14 @@ class TelegramSearcher:
                             'action_taken': action_taken
                         }
                 except Exception as e:
+                    # Запрет писать показывает только сам запрет или бан; ошибка чтения
+                    # (например, ChatAdminRequiredError у GetFull*) о правах на отправку не говорит
+                    if isinstance(e, ChatWriteForbiddenError) or classify(e).kind is ErrorKind.BANNED:
+                        return {
+                            'status': 'pending',
+                            'message': 'В группе, но нет прав на отправку сообщений',
+                            'action_taken': action_taken
+                        }
                     # Если не можем проверить права, но мы в группе, считаем готовой
                     return {
                         'status': 'ready',
@@ -670,17 +677,15 @@ class TelegramSearcher:
                         'action_taken': action_taken
                     }
             
-        except FloodWaitError as e:
-            wait_time = e.seconds
-            return {
-                'status': 'error',
-                'message': f'Flood wait: нужно подождать {wait_time} секунд',
-                'action_taken': 'none'
-            }
         except Exception as e:
+            error = classify(e)
+            if error.kind is ErrorKind.FLOOD:
+                message = f'Flood wait: нужно подождать {error.retry_after:.0f} секунд'
+            else:
+                message = f'Ошибка: {str(e)}'
             return {
                 'status': 'error',
-                'message': f'Ошибка: {str(e)}',
+                'message': message,
                 'action_taken': 'none'
             }
         
@@ -690,6 +695,34 @@ class TelegramSearcher:
             'action_taken': 'none'
         }
     
+    async def request_with_retry(self, request, retries: int = 1, max_wait: float = None):
+        """
+        Запрос с повтором после FloodWait и временных ошибок
+        
+        Паузу FloodWait выдерживает регулятор частоты (следующий вызов ждет сам),
+        перед повтором после медленного режима и временной ошибки ждем retry_after.
+        Остальные ошибки пробрасываются сразу.
+        
+        Args:
+            request: TL-запрос
+            retries: Сколько раз повторять
+            max_wait: Не повторять, если ждать нужно дольше (секунды); по умолчанию max_pause
+                регулятора - более долгую паузу он все равно не выдержит, а остановит задачу
+        """
+        if max_wait is None:
+            max_wait = self.governor.max_pause
+        for attempt in range(retries + 1):
+            try:
+                return await self.client(request)
+            except Exception as e:
+                error = classify(e)
+                if attempt == retries or not error.retryable or error.retry_after > max_wait:
+                    raise
+                if error.kind is ErrorKind.SLOW_MODE:
+                    await self.budget.sleep(error.retry_after, 'server_wait')
+                elif error.kind is ErrorKind.TRANSIENT:
+                    await self.budget.sleep(error.retry_after)
+    
     async def _check_membership_strict(self, entity, title="") -> bool:
         """
         СТРОГАЯ проверка, является ли пользователь участником группы/канала
@@ -704,24 +737,21 @@ class TelegramSearcher:
             # Метод 1: Для каналов - проверяем через GetParticipantRequest (самый надежный)
             if isinstance(entity, Channel):
                 try:
-                    participant = await self.client(GetParticipantRequest(entity, me))
+                    participant = await self.request_with_retry(GetParticipantRequest(entity, me))
                     # Если получили информацию о себе как участнике - мы участники
                     if isinstance(participant.participant, ChannelParticipantSelf):
-                        print(f"✅ [{title}] Проверка через GetParticipantRequest: УЧАСТНИК")
+                        self.events.item('membership.check', "✅ [{title}] Проверка через GetParticipantRequest: УЧАСТНИК", title=title, method='GetParticipantRequest', result='member')
                         return True
                     else:
-                        print(f"❌ [{title}] Проверка через GetParticipantRequest: НЕ участник")
+                        self.events.item('membership.check', "❌ [{title}] Проверка через GetParticipantRequest: НЕ участник", title=title, method='GetParticipantRequest', result='not_member')
                         return False
-                except UserNotParticipantError:
-                    print(f"❌ [{title}] UserNotParticipantError: НЕ участник")
-                    return False
                 except Exception as e:
-                    error_msg = str(e).lower()
-                    if 'not a member' in error_msg or 'not participant' in error_msg or 'user not found' in error_msg:
-                        print(f"❌ [{title}] Ошибка указывает на отсутствие: НЕ участник")
+                    kind = classify(e).kind
+                    if kind in (ErrorKind.NOT_PARTICIPANT, ErrorKind.PRIVATE):
+                        self.events.item('membership.check', "❌ [{title}] {error_type}: НЕ участник", title=title, method='GetParticipantRequest', result='not_member', error_type=type(e).__name__)
                         return False
                     # Если другая ошибка, пробуем другие методы
-                    print(f"⚠️ [{title}] GetParticipantRequest ошибка: {e}, пробую другие методы...")
+                    self.events.item('membership.check', "⚠️ [{title}] GetParticipantRequest ошибка: {error}, пробую другие методы...", title=title, method='GetParticipantRequest', result='error', error=str(e))
             
             # Метод 2: Проверяем через iter_participants (ищем себя в списке) с таймаутом
             try:
@@ -737,25 +767,22 @@ class TelegramSearcher:
                     
                     await asyncio.wait_for(check_participants(), timeout=30.0)
                 except asyncio.TimeoutError:
-                    print(f"⏱️ [{title}] Таймаут при проверке участников (группа слишком большая или медленная), пропускаю этот метод")
+                    self.events.item('membership.check', "⏱️ [{title}] Таймаут при проверке участников (группа слишком большая или медленная), пропускаю этот метод", title=title, method='iter_participants', result='timeout')
                     # Пропускаем этот метод, переходим к следующему
                     pass
                 except Exception as e:
                     raise e
                 
                 if found_self:
-                    print(f"✅ [{title}] Найден в списке участников через iter_participants: УЧАСТНИК")
+                    self.events.item('membership.check', "✅ [{title}] Найден в списке участников через iter_participants: УЧАСТНИК", title=title, method='iter_participants', result='member')
                     return True
                 # Если не нашли и не было таймаута - продолжаем к следующему методу
-                print(f"❌ [{title}] НЕ найден в списке участников через iter_participants, пробую следующий метод...")
+                self.events.item('membership.check', "❌ [{title}] НЕ найден в списке участников через iter_participants, пробую следующий метод...", title=title, method='iter_participants', result='not_found')
             except Exception as e:
-                error_msg = str(e).lower()
-                if 'not a member' in error_msg or 'not participant' in error_msg:
-                    print(f"❌ [{title}] iter_participants ошибка: НЕ участник, пробую следующий метод...")
-                    # Продолжаем к следующему методу
-                    pass
-                else:
-                    print(f"⚠️ [{title}] iter_participants ошибка: {e}, пробую следующий метод...")
+                if classify(e).kind in (ErrorKind.NOT_PARTICIPANT, ErrorKind.PRIVATE):
+                    self.events.item('membership.check', "❌ [{title}] iter_participants ошибка: НЕ участник", title=title, method='iter_participants', result='not_member')
+                    return False
+                self.events.item('membership.check', "⚠️ [{title}] iter_participants ошибка: {error}, пробую следующий метод...", title=title, method='iter_participants', result='error', error=str(e))
             
             # Метод 3: Для каналов - проверяем через GetFullChannelRequest (может не работать для не-участников)
             if isinstance(entity, Channel):
@@ -767,22 +794,21 @@ class TelegramSearcher:
                         async def check_dialogs():
                             async for dialog in self.client.iter_dialogs(limit=500):  # Ограничиваем для скорости
                                 if dialog.entity.id == entity.id:
-                                    print(f"✅ [{title}] Найдена в диалогах: УЧАСТНИК")
+                                    self.events.item('membership.check', "✅ [{title}] Найдена в диалогах: УЧАСТНИК", title=title, method='iter_dialogs', result='member')
                                     return True
                             return False
                         
                         found = await asyncio.wait_for(check_dialogs(), timeout=20.0)
                         if found:
                             return True
-                        print(f"❌ [{title}] НЕ найдена в диалогах: НЕ участник")
+                        self.events.item('membership.check', "❌ [{title}] НЕ найдена в диалогах: НЕ участник", title=title, method='iter_dialogs', result='not_member')
                         return False
                     except asyncio.TimeoutError:
-                        print(f"⏱️ [{title}] Таймаут при проверке диалогов, пропускаю этот метод")
+                        self.events.item('membership.check', "⏱️ [{title}] Таймаут при проверке диалогов, пропускаю этот метод", title=title, method='iter_dialogs', result='timeout')
                         return False
                 except Exception as e:
-                    error_msg = str(e).lower()
-                    if 'not a member' in error_msg or 'not participant' in error_msg:
-                        print(f"❌ [{title}] GetFullChannelRequest ошибка: НЕ участник")
+                    if classify(e).kind in (ErrorKind.NOT_PARTICIPANT, ErrorKind.PRIVATE):
+                        self.events.item('membership.check', "❌ [{title}] GetFullChannelRequest ошибка: НЕ участник", title=title, method='GetFullChannelRequest', result='not_member')
                         return False
             
             # Метод 4: Для обычных чатов
@@ -794,33 +820,40 @@ class TelegramSearcher:
                         async def check_dialogs():
                             async for dialog in self.client.iter_dialogs(limit=500):  # Ограничиваем для скорости
                                 if dialog.entity.id == entity.id:
-                                    print(f"✅ [{title}] Найдена в диалогах: УЧАСТНИК")
+                                    self.events.item('membership.check', "✅ [{title}] Найдена в диалогах: УЧАСТНИК", title=title, method='iter_dialogs', result='member')
                                     return True
                             return False
                         
                         found = await asyncio.wait_for(check_dialogs(), timeout=20.0)
                         if found:
                             return True
-                        print(f"❌ [{title}] НЕ найдена в диалогах: НЕ участник")
+                        self.events.item('membership.check', "❌ [{title}] НЕ найдена в диалогах: НЕ участник", title=title, method='iter_dialogs', result='not_member')
                         return False
                     except asyncio.TimeoutError:
-                        print(f"⏱️ [{title}] Таймаут при проверке диалогов, пропускаю этот метод")
+                        self.events.item('membership.check', "⏱️ [{title}] Таймаут при проверке диалогов, пропускаю этот метод", title=title, method='iter_dialogs', result='timeout')
                         return False
                 except Exception as e:
-                    error_msg = str(e).lower()
-                    if 'not a member' in error_msg or 'not participant' in error_msg:
-                        print(f"❌ [{title}] GetFullChatRequest ошибка: НЕ участник")
+                    if classify(e).kind in (ErrorKind.NOT_PARTICIPANT, ErrorKind.PRIVATE):
+                        self.events.item('membership.check', "❌ [{title}] GetFullChatRequest ошибка: НЕ участник", title=title, method='GetFullChatRequest', result='not_member')
                         return False
             
             # Если все методы не сработали - считаем, что НЕ участник (безопаснее)
-            print(f"⚠️ [{title}] Все методы проверки не дали результата, считаю НЕ участником")
+            self.events.item('membership.check', "⚠️ [{title}] Все методы проверки не дали результата, считаю НЕ участником", title=title, method='all', result='not_member')
             return False
             
         except Exception as e:
             # В случае ошибки считаем, что НЕ участник (безопаснее)
-            print(f"⚠️ [{title}] Критическая ошибка при проверке участника: {e}, считаю НЕ участником")
+            self.events.item('membership.check', "⚠️ [{title}] Критическая ошибка при проверке участника: {error}, считаю НЕ участником", level=logging.WARNING, title=title, method='all', result='error', error=str(e))
             return False
     
+    async def _confirm_membership(self, entity, title="") -> bool:
+        """Проверка участия после вступления: повторяется с растущей паузой (JOIN_CONFIRM_DELAYS)"""
+        for delay in JOIN_CONFIRM_DELAYS:
+            await self.budget.sleep(delay)
+            if await self._check_membership_strict(entity, title):
+                return True
+        return False
+    
     async def _join_group(self, entity, username=None, title="") -> str:
         """
         Попытка вступить в группу (нажимает кнопку "Присоединиться" или "Подать заявку")
@@ -834,89 +867,47 @@ class TelegramSearcher:
             if isinstance(entity, Channel):
                 # Для каналов и супергрупп
                 try:
-                    print(f"🔄 [{title}] Отправляю JoinChannelRequest (нажимаю кнопку 'Присоединиться'/'Подать заявку')...")
-                    await self.client(JoinChannelRequest(entity))
-                    await asyncio.sleep(max(self.search_delay, 15.0))  # Минимум 5 секунд между вступлениями
+                    self.events.item('join.request', "🔄 [{title}] Отправляю JoinChannelRequest (нажимаю кнопку 'Присоединиться'/'Подать заявку')...", title=title, result='sent')
+                    # FloodWait до max_pause и временные ошибки - один повтор (паузу выдерживает регулятор)
+                    await self.request_with_retry(JoinChannelRequest(entity))
                     
-                    # Проверяем строгим методом, вступили ли мы
-                    is_member = await self._check_membership_strict(entity, title)
+                    # Проверяем строгим методом, вступили ли мы (ждем, пока участие появится на сервере)
+                    is_member = await self._confirm_membership(entity, title)
                     if is_member:
-                        print(f"✅ [{title}] Успешно вступил в группу (кнопка 'Присоединиться' сработала)")
+                        self.events.item('join.result', "✅ [{title}] Успешно вступил в группу (кнопка 'Присоединиться' сработала)", title=title, result='joined')
                         return 'joined'
                     else:
                         # Если не вступили, но запрос прошел - значит отправлен запрос на одобрение
                         # Это означает, что кнопка "Подать заявку" была обработана
-                        print(f"⏳ [{title}] Запрос на вступление отправлен (кнопка 'Подать заявку' обработана, ожидается одобрение)")
+                        self.events.item('join.result', "⏳ [{title}] Запрос на вступление отправлен (кнопка 'Подать заявку' обработана, ожидается одобрение)", title=title, result='request_sent')
                         return 'request_sent'
-                except FloodWaitError as e:
-                    wait_time = e.seconds
-                    wait_minutes = wait_time / 60
-                    print(f"⏸️ [{title}] ⚠️ Flood Wait: Telegram требует подождать {wait_time} секунд (~{wait_minutes:.1f} минут)")
-                    
-                    if wait_time > 300:  # Больше 5 минут
-                        print(f"⏸️ [{title}] Слишком долгое ожидание ({wait_time} сек), пропускаю эту группу")
-                        return 'none'
-                    else:
-                        print(f"⏳ [{title}] Жду {wait_time} секунд перед следующей попыткой...")
-                        await asyncio.sleep(wait_time)
-                        # Пробуем еще раз после ожидания
-                        try:
-                            await self.client(JoinChannelRequest(entity))
-                            await asyncio.sleep(3)
-                            is_member = await self._check_membership_strict(entity, title)
-                            if is_member:
-                                return 'joined'
-                            else:
-                                return 'request_sent'
-                        except:
-                            return 'request_sent'
-                except UserBannedInChannelError:
-                    print(f"❌ [{title}] Забанен в канале")
-                    return 'none'
                 except Exception as e:
-                    error_msg = str(e).lower()
-                    print(f"⚠️ [{title}] Ошибка при вступлении: {e}")
-                    
-                    # Проверяем flood wait в тексте ошибки
-                    if "wait of" in error_msg and "seconds" in error_msg:
-                        try:
-                            wait_seconds = int(error_msg.split("wait of")[1].split("seconds")[0].strip())
-                            wait_minutes = wait_seconds / 60
-                            print(f"⏸️ [{title}] ⚠️ Flood Wait в тексте ошибки: {wait_seconds} секунд (~{wait_minutes:.1f} минут)")
-                            
-                            if wait_seconds > 300:  # Больше 5 минут
-                                print(f"⏸️ [{title}] Слишком долгое ожидание, пропускаю")
-                                return 'none'
-                            else:
-                                print(f"⏳ [{title}] Жду {wait_seconds} секунд...")
-                                await asyncio.sleep(wait_seconds)
-                                return 'request_sent'  # После ожидания считаем, что запрос отправлен
-                        except:
-                            pass
-                    
-                    # Проверяем, это ошибка о необходимости одобрения?
-                    if any(keyword in error_msg for keyword in ['request', 'approval', 'invite', 'pending', 'moderation']):
-                        print(f"⏳ [{title}] Требуется одобрение администратора (кнопка 'Подать заявку' обработана)")
+                    error = classify(e)
+                    if error.kind is ErrorKind.FLOOD:
+                        self.events.item('join.result', "⏸️ [{title}] ⚠️ Flood Wait: Telegram требует подождать {seconds:.0f} секунд, пропускаю эту группу", level=logging.WARNING, title=title, result='flood', seconds=error.retry_after)
+                        return 'none'
+                    if error.kind is ErrorKind.BANNED:
+                        self.events.item('join.result', "❌ [{title}] Забанен в канале", level=logging.WARNING, title=title, result='banned')
+                        return 'none'
+                    if error.kind is ErrorKind.APPROVAL_REQUIRED:
+                        self.events.item('join.result', "⏳ [{title}] Требуется одобрение администратора (кнопка 'Подать заявку' обработана)", title=title, result='request_sent')
                         return 'request_sent'
-                    
-                    # Если ошибка "CHANNEL_PRIVATE" - группа приватная, нужен invite
-                    if 'private' in error_msg or 'invite' in error_msg:
-                        print(f"⏳ [{title}] Приватная группа, требуется invite-ссылка")
+                    if error.kind is ErrorKind.PRIVATE:
+                        self.events.item('join.result', "⏳ [{title}] Приватная группа, требуется invite-ссылка", title=title, result='private')
                         return 'request_sent'
                     
                     # Другие ошибки
+                    self.events.item('join.result', "⚠️ [{title}] Ошибка при вступлении: {error}", level=logging.WARNING, title=title, result='error', error=str(e))
                     return 'none'
             else:
                 # Обычный чат - обычно нельзя вступить автоматически
-                print(f"⚠️ [{title}] Обычный чат - автоматическое вступление невозможно")
+                self.events.item('join.result', "⚠️ [{title}] Обычный чат - автоматическое вступление невозможно", title=title, result='basic_chat')
                 return 'none'
         except Exception as e:
-            error_msg = str(e).lower()
-            print(f"⚠️ [{title}] Исключение при вступлении: {e}")
+            self.events.item('join.result', "⚠️ [{title}] Исключение при вступлении: {error}", level=logging.WARNING, title=title, result='exception', error=str(e))
             
-            # Проверяем, это ошибка о необходимости одобрения?
-            if any(keyword in error_msg for keyword in ['request', 'approval', 'pending', 'wait', 'moderation']):
-                print(f"⏳ [{title}] Требуется одобрение (кнопка 'Подать заявку' обработана)")
+            if classify(e).kind is ErrorKind.APPROVAL_REQUIRED:
+                self.events.item('join.result', "⏳ [{title}] Требуется одобрение (кнопка 'Подать заявку' обработана)", title=title, result='request_sent')
                 return 'request_sent'
             
             return 'none'
@@ -1004,18 +995,20 @@ class TelegramSearcher:
         still_pending = []
         errors = []
         
-        print(f"\n🔄 Начинаю обработку {len(pending_groups)} pending групп...")
+        self.events.info('pending.start', '\n🔄 Начинаю обработку {groups} pending групп...', groups=len(pending_groups))
         
         for i, group in enumerate(pending_groups):
             if stop_event and stop_event.is_set():
-                print("⏹ Обработка остановлена пользователем")
+                self.events.info('pending.stopped', '⏹ Обработка остановлена пользователем', processed=i)
                 break
             
             group_id = group.get('id')
             username = group.get('username')
             title = group.get('title', f"ID: {group_id}")
+            settled = len(ready_groups) + len(still_pending) + len(errors)
             
-            print(f"\n[{i+1}/{len(pending_groups)}] Обрабатываю: {title}")
+            self.events.item('pending.group', "\n[{number}/{total}] Обрабатываю: {title}", title=title, result='start',
+                             number=i + 1, total=len(pending_groups))
             
             # Обновляем прогресс
             if progress_callback:
@@ -1027,7 +1020,9 @@ class TelegramSearcher:
                 if username:
                     try:
                         entity = await self.client.get_entity(username)
-                    except (UsernameInvalidError, UsernameNotOccupiedError):
+                    except Exception as e:
+                        if classify(e).kind is not ErrorKind.INVALID_USERNAME:
+                            raise
                         errors.append({
                             **group,
                             'check_status': 'error',
@@ -1039,6 +1034,8 @@ class TelegramSearcher:
                     try:
                         entity = await self.client.get_entity(group_id)
                     except Exception as e:
+                        if classify(e).retryable:
+                            raise
                         errors.append({
                             **group,
                             'check_status': 'error',
@@ -1074,7 +1071,7 @@ class TelegramSearcher:
                         is_forum = getattr(full_info.full_chat, 'forum', False)
                         
                         if is_forum:
-                            print(f"📚 [{title}] Обнаружен форум с темами, получаю список тем...")
+                            self.events.item('pending.forum', "📚 [{title}] Обнаружен форум с темами, получаю список тем...", title=title, result='forum')
                             try:
                                 # Получаем темы форума
                                 topics_result = await self.client(GetForumTopicsRequest(
@@ -1094,18 +1091,18 @@ class TelegramSearcher:
                                             'parent_group_id': group_id,
                                             'parent_username': username
                                         })
-                                    print(f"📚 [{title}] Найдено {len(forum_topics)} тем в форуме")
+                                    self.events.item('pending.forum', "📚 [{title}] Найдено {topics} тем в форуме", title=title, result='topics', topics=len(forum_topics))
                             except Exception as e:
-                                print(f"⚠️ [{title}] Не удалось получить темы форума: {e}")
+                                self.events.item('pending.forum', "⚠️ [{title}] Не удалось получить темы форума: {error}", level=logging.WARNING, title=title, result='topics_error', error=str(e))
                     except Exception as e:
-                        print(f"⚠️ [{title}] Ошибка при проверке форума: {e}")
+                        self.events.item('pending.forum', "⚠️ [{title}] Ошибка при проверке форума: {error}", level=logging.WARNING, title=title, result='error', error=str(e))
                 
                 # Обрабатываем основную группу
                 is_member = await self._check_membership_strict(entity, title)
                 
                 if is_member:
                     # Уже участник - переносим в ready
-                    print(f"✅ [{title}] Уже участник, переношу в ready")
+                    self.events.item('pending.group', "✅ [{title}] Уже участник, переношу в ready", title=title, result='member')
                     ready_groups.append({
                         **group,
                         'check_status': 'ready',
@@ -1115,10 +1112,10 @@ class TelegramSearcher:
                     
                     # Если это форум и мы участники - проверяем каждую тему отдельно
                     if is_forum and forum_topics:
-                        print(f"📚 [{title}] Обрабатываю {len(forum_topics)} тем форума...")
+                        self.events.item('pending.forum', "📚 [{title}] Обрабатываю {topics} тем форума...", title=title, result='topics_check', topics=len(forum_topics))
                         for topic in forum_topics:
                             topic_title = f"{title} > {topic['title']}"
-                            print(f"  📝 Проверяю тему: {topic_title}")
+                            self.events.item('pending.forum', "  📝 Проверяю тему: {topic}", title=title, result='topic_check', topic=topic_title)
                             
                             # Проверяем каждую тему форума отдельно на возможность отправки сообщений
                             topic_check_result = await self._check_forum_topic_access(
@@ -1139,23 +1136,23 @@ class TelegramSearcher:
                             }
                             
                             if topic_check_result['status'] == 'ready':
-                                print(f"  ✅ Тема {topic['title']} готова к рассылке")
+                                self.events.item('pending.forum', "  ✅ Тема {topic} готова к рассылке", title=title, result='topic_ready', topic=topic['title'])
                                 ready_groups.append(topic_info)
                             else:
-                                print(f"  ⏳ Тема {topic['title']} в статусе: {topic_check_result['status']}")
+                                self.events.item('pending.forum', "  ⏳ Тема {topic} в статусе: {status}", title=title, result='topic_pending',
+                                                 topic=topic['title'], status=topic_check_result['status'])
                                 still_pending.append(topic_info)
                 else:
                     # Не участник - пытаемся вступить (нажимаем кнопку "Присоединиться" или "Подать заявку")
-                    print(f"🔄 [{title}] Пытаюсь вступить (нажимаю кнопку 'Присоединиться'/'Подать заявку')...")
+                    self.events.item('pending.group', "🔄 [{title}] Пытаюсь вступить (нажимаю кнопку 'Присоединиться'/'Подать заявку')...", title=title, result='join_attempt')
                     action_taken = await self._join_group(entity, username, title)
                     
                     if action_taken == 'joined':
                         # Проверяем еще раз после вступления
-                        await asyncio.sleep(3)
                         is_member = await self._check_membership_strict(entity, title)
                         
                         if is_member:
-                            print(f"✅ [{title}] Успешно вступил, переношу в ready")
+                            self.events.item('pending.group', "✅ [{title}] Успешно вступил, переношу в ready", title=title, result='joined')
                             ready_groups.append({
                                 **group,
                                 'check_status': 'ready',
@@ -1165,10 +1162,10 @@ class TelegramSearcher:
                             
                             # Если это форум и мы вступили - проверяем каждую тему отдельно
                             if is_forum and forum_topics:
-                                print(f"📚 [{title}] Обрабатываю {len(forum_topics)} тем форума...")
+                                self.events.item('pending.forum', "📚 [{title}] Обрабатываю {topics} тем форума...", title=title, result='topics_check', topics=len(forum_topics))
                                 for topic in forum_topics:
                                     topic_title = f"{title} > {topic['title']}"
-                                    print(f"  📝 Проверяю тему: {topic_title}")
+                                    self.events.item('pending.forum', "  📝 Проверяю тему: {topic}", title=title, result='topic_check', topic=topic_title)
                                     
                                     # Проверяем каждую тему форума отдельно на возможность отправки сообщений
                                     topic_check_result = await self._check_forum_topic_access(
@@ -1189,13 +1186,14 @@ class TelegramSearcher:
                                     }
                                     
                                     if topic_check_result['status'] == 'ready':
-                                        print(f"  ✅ Тема {topic['title']} готова к рассылке")
+                                        self.events.item('pending.forum', "  ✅ Тема {topic} готова к рассылке", title=title, result='topic_ready', topic=topic['title'])
                                         ready_groups.append(topic_info)
                                     else:
-                                        print(f"  ⏳ Тема {topic['title']} в статусе: {topic_check_result['status']}")
+                                        self.events.item('pending.forum', "  ⏳ Тема {topic} в статусе: {status}", title=title, result='topic_pending',
+                                                         topic=topic['title'], status=topic_check_result['status'])
                                         still_pending.append(topic_info)
                         else:
-                            print(f"⏳ [{title}] Вступление не подтверждено, оставляю в pending")
+                            self.events.item('pending.group', "⏳ [{title}] Вступление не подтверждено, оставляю в pending", title=title, result='unconfirmed')
                             still_pending.append({
                                 **group,
                                 'check_status': 'pending',
@@ -1203,7 +1201,7 @@ class TelegramSearcher:
                                 'check_action': action_taken
                             })
                     elif action_taken == 'request_sent':
-                        print(f"⏳ [{title}] Запрос на вступление отправлен (кнопка 'Подать заявку' обработана), оставляю в pending")
+                        self.events.item('pending.group', "⏳ [{title}] Запрос на вступление отправлен (кнопка 'Подать заявку' обработана), оставляю в pending", title=title, result='request_sent')
                         still_pending.append({
                             **group,
                             'check_status': 'pending',
@@ -1211,20 +1209,25 @@ class TelegramSearcher:
                             'check_action': 'request_sent'
                         })
                     else:
-                        print(f"❌ [{title}] Не удалось вступить, оставляю в pending")
+                        self.events.item('pending.group', "❌ [{title}] Не удалось вступить, оставляю в pending", level=logging.WARNING, title=title, result='join_failed')
                         still_pending.append({
                             **group,
                             'check_status': 'pending',
                             'check_message': 'Не удалось вступить автоматически',
                             'check_action': action_taken
                         })
-                
-                # Задержка между группами (увеличена для избежания flood wait)
-                if i < len(pending_groups) - 1:
-                    await asyncio.sleep(10.0)  # Увеличено до 10 секунд между группами
                     
+            except FloodPause as pause:
+                # Остальные группы до конца паузы завершились бы так же - они остаются в pending как были
+                self.flood_pause = pause
+                if len(ready_groups) + len(still_pending) + len(errors) > settled:
+                    i += 1  # Текущая группа уже разобрана (пауза пришлась на темы форума)
+                self.events.warning('pending.flood_pause', '⏸️ {error}: обработка остановлена, {left} групп остаются в pending',
+                                    error=str(pause), left=len(pending_groups) - i, wait_seconds=pause.seconds)
+                still_pending.extend(pending_groups[i:])
+                break
             except Exception as e:
-                print(f"❌ [{title}] Ошибка при обработке: {e}")
+                self.events.item('pending.group', "❌ [{title}] Ошибка при обработке: {error}", level=logging.WARNING, title=title, result='error', error=str(e))
                 errors.append({
                     **group,
                     'check_status': 'error',
@@ -1232,10 +1235,11 @@ class TelegramSearcher:
                     'check_action': 'none'
                 })
         
-        print(f"\n✅ Обработка завершена:")
-        print(f"   ✅ Готовых: {len(ready_groups)}")
-        print(f"   ⏳ Все еще pending: {len(still_pending)}")
-        print(f"   ❌ Ошибок: {len(errors)}")
+        self.events.summary(
+            'pending.summary',
+            '\n✅ Обработка завершена:\n   ✅ Готовых: {ready}\n   ⏳ Все еще pending: {pending}\n   ❌ Ошибок: {errors}',
+            ready=len(ready_groups), pending=len(still_pending), errors=len(errors)
+        )
         
         return {
             'ready_groups': ready_groups,
@@ -1412,7 +1416,9 @@ class TelegramSearcher:
                 clean_username = username.lstrip('@')
                 try:
                     entity = await self.client.get_entity(clean_username)
-                except (UsernameInvalidError, UsernameNotOccupiedError):
+                except Exception as e:
+                    if classify(e).kind is not ErrorKind.INVALID_USERNAME:
+                        raise
                     return {
                         'success': False,
                         'message': 'Неверный username',
@@ -1467,27 +1473,28 @@ class TelegramSearcher:
                     'blocked': False
                 }
                 
-            except UserBannedInChannelError:
-                return {
-                    'success': False,
-                    'message': 'Забанен в канале',
-                    'blocked': True
-                }
-            except FloodWaitError as e:
-                wait_time = e.seconds
-                return {
-                    'success': False,
-                    'message': f'Flood wait: нужно подождать {wait_time} секунд',
-                    'blocked': False
-                }
             except Exception as e:
-                error_msg = str(e).lower()
-                if 'blocked' in error_msg or 'ban' in error_msg:
+                # Здесь отправка не повторяется, чтобы не продублировать сообщение после сетевой ошибки
+                # (короткий FloodWait уже повторила обертка клиента - сервер такой запрос отклоняет)
+                error = classify(e)
+                if error.kind is ErrorKind.BANNED:
                     return {
                         'success': False,
-                        'message': f'Заблокирован: {str(e)}',
+                        'message': 'Забанен в канале',
                         'blocked': True
                     }
+                if error.kind is ErrorKind.WRITE_FORBIDDEN:
+                    return {
+                        'success': False,
+                        'message': f'Заблокирован: нет прав на отправку ({type(e).__name__})',
+                        'blocked': True
+                    }
+                if error.kind in (ErrorKind.FLOOD, ErrorKind.SLOW_MODE):
+                    return {
+                        'success': False,
+                        'message': f'Flood wait: нужно подождать {error.retry_after:.0f} секунд',
+                        'blocked': False
+                    }
                 return {
                     'success': False,
                     'message': f'Ошибка отправки: {str(e)}',
@@ -1495,13 +1502,21 @@ class TelegramSearcher:
                 }
                 
         except Exception as e:
+            error = classify(e)
+            if error.kind is ErrorKind.FLOOD:
+                return {
+                    'success': False,
+                    'message': f'Flood wait: нужно подождать {error.retry_after:.0f} секунд',
+                    'blocked': False
+                }
             return {
                 'success': False,
                 'message': f'Исключение: {str(e)}',
                 'blocked': False
             }
     
-    def save_sending_report(self, results: List[Dict], report_file: str, sent_count: int, error_count: int, blocked_count: int, skipped_count: int):
+    def save_sending_report(self, results: List[Dict], report_file: str, sent_count: int, error_count: int, blocked_count: int, skipped_count: int,
+                            time_budget: Dict = None):
         """
         Сохранение отчета о рассылке в Excel
         
@@ -1512,6 +1527,7 @@ class TelegramSearcher:
             error_count: Количество ошибок
             blocked_count: Количество заблокированных
             skipped_count: Количество пропущенных
+            time_budget: Разбивка времени рассылки (TimeBudget.snapshot()), если есть
         """
         wb = Workbook()
         ws = wb.active
@@ -1535,6 +1551,12 @@ class TelegramSearcher:
         ws.append(['❌ Ошибки:', error_count, '', '', '', '', '', ''])
         ws.append(['🚫 Заблокировано:', blocked_count, '', '', '', '', '', ''])
         ws.append(['⏭️ Пропущено:', skipped_count, '', '', '', '', '', ''])
+        if time_budget:
+            ws.append(['⏱️ Всего, сек:', time_budget['wall_s'], '', '', '', '', '', ''])
+            ws.append(['⏱️ Сеть, сек:', time_budget['network_s'], '', '', '', '', '', ''])
+            ws.append(['⏱️ Обработка, сек:', time_budget['processing_s'], '', '', '', '', '', ''])
+            ws.append(['⏱️ Задержки, сек:', time_budget['delay_s'], '', '', '', '', '', ''])
+            ws.append(['⏱️ FloodWait, сек:', time_budget['server_wait_s'], '', '', '', '', '', ''])
         ws.append(['', '', '', '', '', '', '', ''])
         ws.append(['ДЕТАЛЬНЫЕ РЕЗУЛЬТАТЫ', '', '', '', '', '', '', ''])
         ws.append(headers)  # Повторяем заголовки
@@ -1584,14 +1606,17 @@ async def main():
     # Попытка загрузить конфигурацию из config.py
     try:
         import config
+        from config_store import ConfigStore
         API_ID = config.API_ID
         API_HASH = config.API_HASH
-        KEYWORDS = getattr(config, 'KEYWORDS', [])
-        CITIES = getattr(config, 'CITIES', [])
+        # Ключевые слова, города и задержка хранятся в search_config.json (общие с веб-интерфейсом)
+        search_config = ConfigStore('search_config.json').get()
+        KEYWORDS = search_config['keywords']
+        CITIES = search_config['cities']
         LIMIT_PER_KEYWORD = getattr(config, 'LIMIT_PER_KEYWORD', 50)
         USE_TRANSLITERATION = getattr(config, 'USE_TRANSLITERATION', True)
         USE_CITY_COMBINATIONS = getattr(config, 'USE_CITY_COMBINATIONS', True)
-        SEARCH_DELAY = getattr(config, 'SEARCH_DELAY', 1.0)  # Задержка между запросами в секундах
+        SEARCH_DELAY = search_config['delay']  # Задержка между запросами в секундах
         
         print("✅ Конфигурация загружена из config.py")
         
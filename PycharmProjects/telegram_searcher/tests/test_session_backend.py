@@ -0,0 +1,152 @@
+"""
+Проверка хранилищ сессий session_backend.py: память, SQLite и Redis (через fake_redis.FakeRedis)
+
+Время подменяется управляемыми часами, поэтому истечение срока проверяется без ожидания.
+
+Запуск:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import session_backend
+from fake_redis import FakeRedis
+
+TTL = 60
+
+
+class Clock:
+    """Управляемые часы вместо модуля time в session_backend"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class StoreChecks:
+    """Общие проверки для каждого хранилища (make_store задается в наследнике)"""
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(session_backend, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = self.make_store()
+
+    def expired_removed(self, sid: str) -> bool:
+        """Удалена ли просроченная сессия из хранилища (а не только скрыта при чтении)"""
+        raise NotImplementedError
+
+    def test_save_and_load(self):
+        self.store.set('sid1', {'session_id': 'abc', 'keywords': ['кафе', 'бар']})
+        self.assertEqual(self.store.get('sid1'), {'session_id': 'abc', 'keywords': ['кафе', 'бар']})
+        self.assertIsNone(self.store.get('missing'))
+
+    def test_overwrite_and_delete(self):
+        self.store.set('sid1', {'a': 1})
+        self.store.set('sid1', {'a': 2})
+        self.assertEqual(self.store.get('sid1'), {'a': 2})
+        self.store.delete('sid1')
+        self.assertIsNone(self.store.get('sid1'))
+
+    def test_expiry(self):
+        self.store.set('sid1', {'a': 1})
+        self.clock.advance(TTL + 1)
+        self.assertIsNone(self.store.get('sid1'))
+
+    def test_access_extends_ttl(self):
+        self.store.set('sid1', {'a': 1})
+        self.clock.advance(TTL * 0.6)
+        self.assertIsNotNone(self.store.get('sid1'))
+        self.clock.advance(TTL * 0.6)
+        self.assertEqual(self.store.get('sid1'), {'a': 1})
+
+    def test_prune(self):
+        self.store.set('old', {'a': 1})
+        self.clock.advance(TTL * 0.6)
+        self.store.set('fresh', {'b': 2})
+        self.clock.advance(TTL * 0.6)
+        self.store.prune()
+        self.assertTrue(self.expired_removed('old'))
+        self.assertEqual(self.store.get('fresh'), {'b': 2})
+
+
+class MemorySessionStoreTest(StoreChecks, unittest.TestCase):
+    def make_store(self):
+        return session_backend.MemorySessionStore(TTL, max_entries=3)
+
+    def expired_removed(self, sid: str) -> bool:
+        return sid not in self.store._data
+
+    def test_prune_count(self):
+        for i in range(3):
+            self.store.set(f'sid{i}', {'i': i})
+        self.clock.advance(TTL + 1)
+        self.assertEqual(self.store.prune(), 3)
+        self.assertEqual(len(self.store), 0)
+
+    def test_lru_eviction(self):
+        for i in range(3):
+            self.store.set(f'sid{i}', {'i': i})
+        self.store.get('sid0')  # sid0 становится самой свежей
+        self.store.set('sid3', {'i': 3})
+        self.assertIsNone(self.store.get('sid1'))
+        self.assertIsNotNone(self.store.get('sid0'))
+
+
+class SqliteSessionStoreTest(StoreChecks, unittest.TestCase):
+    def make_store(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+        return session_backend.SqliteSessionStore(os.path.join(workdir.name, 'sessions.sqlite3'), TTL)
+
+    def expired_removed(self, sid: str) -> bool:
+        return self.store._conn().execute('SELECT 1 FROM sessions WHERE sid = ?', (sid,)).fetchone() is None
+
+    def test_prune_count(self):
+        self.store.set('sid1', {'a': 1})
+        self.store.set('sid2', {'a': 2})
+        self.clock.advance(TTL + 1)
+        self.assertEqual(self.store.prune(), 2)
+
+
+class RedisSessionStoreTest(StoreChecks, unittest.TestCase):
+    def make_store(self):
+        self.client = FakeRedis(clock=self.clock.monotonic)
+        return session_backend.RedisSessionStore(self.client, TTL)
+
+    def expired_removed(self, sid: str) -> bool:
+        # Просроченные ключи удаляет сам Redis, prune ничего не делает
+        return not self.client.exists(self.store.prefix + sid)
+
+    def test_keys_have_ttl(self):
+        self.store.set('sid1', {'a': 1})
+        self.assertEqual(self.client.ttl(self.store.prefix + 'sid1'), TTL)
+        self.assertIsInstance(self.client.get(self.store.prefix + 'sid1'), bytes)
+
+    def test_fractional_ttl(self):
+        store = session_backend.RedisSessionStore(self.client, 0.5)
+        store.set('sid1', {'a': 1})  # Redis не принимает EX 0
+        self.assertEqual(store.get('sid1'), {'a': 1})
+
+    def test_create_from_fake_url(self):
+        store = session_backend.create_session_store({'SESSION_BACKEND': 'redis', 'SESSION_REDIS_URL': 'fake://'})
+        self.assertIsInstance(store.client, FakeRedis)
+
+
+if __name__ == '__main__':
+    unittest.main()
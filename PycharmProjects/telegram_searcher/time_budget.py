@@ -0,0 +1,109 @@
+"""
+Учет времени задачи по категориям
+Разделяет время работы задачи на сетевые вызовы, локальную обработку,
+добровольные задержки (search_delay, паузы между группами) и ожидание,
+навязанное сервером (FloodWait)
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class TimeBudget:
+    """
+    Счетчик времени задачи
+
+    network, delay и server_wait учитываются явно (обертка клиента и sleep),
+    processing - остаток от общего времени.
+    """
+
+    MEASURED = ('network', 'delay', 'server_wait')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._finished = None
+        self._totals = {kind: 0.0 for kind in self.MEASURED}
+        self._counts = {kind: 0 for kind in self.MEASURED}
+
+    def add(self, kind: str, seconds: float):
+        """Добавить время в категорию network / delay / server_wait"""
+        with self._lock:
+            self._totals[kind] += seconds
+            self._counts[kind] += 1
+
+    @contextmanager
+    def measure(self, kind: str):
+        """Засечь время блока кода в категорию kind"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(kind, time.perf_counter() - started)
+
+    async def sleep(self, seconds: float, kind: str = 'delay'):
+        """
+        asyncio.sleep с учетом времени
+
+        Args:
+            seconds: Длительность паузы
+            kind: 'delay' - добровольная задержка, 'server_wait' - ожидание по требованию сервера
+        """
+        if seconds <= 0:
+            return
+        started = time.perf_counter()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.add(kind, time.perf_counter() - started)
+
+    def finish(self):
+        """Зафиксировать конец задачи (дальше общее время не растет)"""
+        if self._finished is None:
+            self._finished = time.perf_counter()
+
+    def snapshot(self) -> Dict:
+        """
+        Текущая разбивка времени
+
+        Returns:
+            {'wall_s', 'network_s', 'processing_s', 'delay_s', 'server_wait_s',
+             'delays', 'server_waits', 'shares': {категория: доля от wall}}
+        """
+        with self._lock:
+            totals = dict(self._totals)
+            counts = dict(self._counts)
+        wall = (self._finished or time.perf_counter()) - self._started
+        processing = max(0.0, wall - sum(totals.values()))
+        breakdown = {
+            'network': totals['network'],
+            'processing': processing,
+            'delay': totals['delay'],
+            'server_wait': totals['server_wait']
+        }
+        result = {f'{kind}_s': round(seconds, 3) for kind, seconds in breakdown.items()}
+        result['wall_s'] = round(wall, 3)
+        result['delays'] = counts['delay']
+        result['server_waits'] = counts['server_wait']
+        result['shares'] = {
+            kind: round(seconds / wall, 3) if wall > 0 else 0.0
+            for kind, seconds in breakdown.items()
+        }
+        return result
+
+    def summary_line(self) -> str:
+        """Короткая строка для логов и отчетов"""
+        data = self.snapshot()
+        return (f"всего {data['wall_s']:.1f}с: сеть {data['network_s']:.1f}с, "
+                f"обработка {data['processing_s']:.1f}с, задержки {data['delay_s']:.1f}с, "
+                f"FloodWait {data['server_wait_s']:.1f}с")
+
+
+def budget_snapshot(value):
+    """Разбивка времени из поля задачи (TimeBudget или уже готовый словарь)"""
+    if isinstance(value, TimeBudget):
+        return value.snapshot()
+    return value
@@ -0,0 +1,91 @@
+"""
+Транслитерация русского текста латиницей
+Таблицы схем собираются один раз при импорте (str.maketrans, значения могут
+быть из нескольких букв), сама транслитерация - один вызов str.translate.
+Результаты кэшируются: ключевые слова и города повторяются в каждой
+комбинации поисковых запросов.
+
+Схемы:
+    telegram    - как пишут в названиях чатов (по умолчанию): х=h, ц=ts, щ=sch, й=y
+    telegram_kh - распространенный вариант: х=kh, щ=shch, й=i, ю=iu, я=ia
+    gost        - ГОСТ Р 52535.1-2006 (загранпаспорта): х=kh, ц=tc, щ=shch, ъ=ie
+    iso9        - ISO 9:1995 (ГОСТ 7.79-2000, система А), с диакритикой: ж=ž, х=h, щ=ŝ
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+DEFAULT_SCHEME = 'telegram'
+
+_BASE = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'з': 'z', 'и': 'i',
+    'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'u', 'ф': 'f'
+}
+
+# Строчные буквы; заглавные получаются из них (Ж -> Zh)
+SCHEMES: Dict[str, Dict[str, str]] = {
+    'telegram': {
+        **_BASE, 'ё': 'yo', 'ж': 'zh', 'й': 'y', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+        'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
+    },
+    'telegram_kh': {
+        **_BASE, 'ё': 'e', 'ж': 'zh', 'й': 'i', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+        'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'iu', 'я': 'ia'
+    },
+    'gost': {
+        **_BASE, 'ё': 'e', 'ж': 'zh', 'й': 'i', 'х': 'kh', 'ц': 'tc', 'ч': 'ch', 'ш': 'sh',
+        'щ': 'shch', 'ъ': 'ie', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'iu', 'я': 'ia'
+    },
+    'iso9': {
+        **_BASE, 'ё': 'ë', 'ж': 'ž', 'й': 'j', 'х': 'h', 'ц': 'c', 'ч': 'č', 'ш': 'š',
+        'щ': 'ŝ', 'ъ': 'ʺ', 'ы': 'y', 'ь': 'ʹ', 'э': 'è', 'ю': 'û', 'я': 'â'
+    }
+}
+
+
+def _compile(mapping: Dict[str, str]) -> Dict[int, str]:
+    table = {}
+    for char, latin in mapping.items():
+        table[char] = latin
+        table[char.upper()] = latin[:1].upper() + latin[1:]
+    return str.maketrans(table)
+
+
+_TABLES: Dict[str, Dict[int, str]] = {name: _compile(mapping) for name, mapping in SCHEMES.items()}
+
+
+def register_scheme(name: str, mapping: Dict[str, str]):
+    """
+    Добавить или заменить схему
+
+    Args:
+        name: Имя схемы
+        mapping: Строчная кириллическая буква -> латиница (заглавные строятся автоматически)
+    """
+    SCHEMES[name] = dict(mapping)
+    _TABLES[name] = _compile(mapping)
+    transliterate.cache_clear()
+
+
+def available_schemes() -> List[str]:
+    return list(SCHEMES)
+
+
+@lru_cache(maxsize=8192)
+def transliterate(text: str, scheme: str = DEFAULT_SCHEME) -> str:
+    """
+    Транслитерация текста по схеме
+
+    Raises:
+        ValueError: неизвестная схема
+    """
+    table = _TABLES.get(scheme)
+    if table is None:
+        raise ValueError(f'Неизвестная схема транслитерации: {scheme} (доступны: {", ".join(SCHEMES)})')
+    return text.translate(table)
+
+
+def variants(text: str, schemes=(DEFAULT_SCHEME,)) -> List[str]:
+    """Текст и его транслитерации по схемам без повторов (исходный текст первым)"""
+    return list(dict.fromkeys([text] + [transliterate(text, scheme) for scheme in schemes]))